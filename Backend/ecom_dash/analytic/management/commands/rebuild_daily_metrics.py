@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analytic.rollups import rebuild_daily_metrics
+
+
+class Command(BaseCommand):
+    help = "Recompute the DailyMetrics rollup (revenue, orders, new customers, wishlist and cart adds) from scratch."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_daily_metrics()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt metrics for {count} days."))
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:36
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _local_date(dt):
+    if dt is None:
+        return None
+    return timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+
+
+def populate_daily_metrics(apps, schema_editor):
+    # Frozen copy of analytic.rollups.rebuild_daily_metrics at this migration.
+    DailyMetrics = apps.get_model('analytic', 'DailyMetrics')
+    Order = apps.get_model('api', 'Order')
+    by_day = {}
+
+    def row(day):
+        if day not in by_day:
+            by_day[day] = DailyMetrics(date=day, revenue=Decimal('0'), gross_revenue=Decimal('0'))
+        return by_day[day]
+
+    for created_at, status, amount in Order.objects.values_list('created_at', 'status', 'total_amount').iterator(
+        chunk_size=2000
+    ):
+        entry = row(_local_date(created_at))
+        status = (status or '').lower()
+        amount = amount or Decimal('0')
+        if status == 'cancelled':
+            entry.cancelled_orders += 1
+            continue
+        entry.placed_orders += 1
+        entry.gross_revenue += amount
+        if status in ('completed', 'dispatched'):
+            entry.orders += 1
+            entry.revenue += amount
+
+    for app_label, model_name, field in (
+        ('api', 'Customer', 'new_customers'),
+        ('storefront', 'WishlistItem', 'wishlist_adds'),
+        ('storefront', 'CartItem', 'cart_adds'),
+    ):
+        model = apps.get_model(app_label, model_name)
+        for created_at in model.objects.values_list('created_at', flat=True).iterator(chunk_size=2000):
+            entry = row(_local_date(created_at))
+            setattr(entry, field, getattr(entry, field) + 1)
+
+    DailyMetrics.objects.bulk_create(by_day.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytic', '0002_visitor'),
+        ('api', '0018_order_created_index'),
+        ('storefront', '0003_customeraccount_api_customer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetrics',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('gross_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('placed_orders', models.PositiveIntegerField(default=0)),
+                ('cancelled_orders', models.PositiveIntegerField(default=0)),
+                ('new_customers', models.PositiveIntegerField(default=0)),
+                ('wishlist_adds', models.PositiveIntegerField(default=0)),
+                ('cart_adds', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(populate_daily_metrics, migrations.RunPython.noop),
+    ]
@@ -34,4 +34,28 @@ class CartItem(models.Model):
     added_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.email} → {self.product.name} ({self.quantity})"
\ No newline at end of file
+        return f"{self.user.email} → {self.product.name} ({self.quantity})"
+
+class DailyMetrics(models.Model):
+    """
+    One row per local calendar day with the store totals the admin dashboard
+    shows, kept current by analytic.signals so KPI reads never scan orders.
+    ``revenue``/``orders`` follow the KPI cards (completed and dispatched
+    orders); ``gross_revenue``/``placed_orders`` cover every non-cancelled order.
+    """
+    date = models.DateField(primary_key=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    placed_orders = models.PositiveIntegerField(default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    new_customers = models.PositiveIntegerField(default=0)
+    wishlist_adds = models.PositiveIntegerField(default=0)
+    cart_adds = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.date}: {self.orders} orders"
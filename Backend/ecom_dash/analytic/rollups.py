@@ -0,0 +1,117 @@
+"""
+Maintenance helpers for the DailyMetrics rollup table.
+
+Order figures are recomputed for the touched days (orders change status and
+amount after creation); customer, wishlist and cart figures only ever grow,
+so those are bumped in place.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from analytic.models import DailyMetrics
+from api.models import Customer, Order
+from storefront.models import CartItem, WishlistItem
+
+ORDER_FIELDS = ["revenue", "orders", "gross_revenue", "placed_orders", "cancelled_orders"]
+REALIZED_STATUSES = Q(status__in=[Order.COMPLETED, Order.DISPATCHED])
+CANCELLED = Q(status=Order.CANCELLED)
+
+
+def local_date(dt: datetime | None) -> date | None:
+    if dt is None:
+        return None
+    return timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _order_totals(qs) -> dict:
+    return qs.aggregate(
+        revenue=Sum("total_amount", filter=REALIZED_STATUSES),
+        orders=Count("id", filter=REALIZED_STATUSES),
+        gross_revenue=Sum("total_amount", filter=~CANCELLED),
+        placed_orders=Count("id", filter=~CANCELLED),
+        cancelled_orders=Count("id", filter=CANCELLED),
+    )
+
+
+def refresh_order_metrics(days: Iterable[date | None]) -> int:
+    """Recompute the order columns for each day (one ranged aggregate per day on the created_at index)."""
+    rows = []
+    for day in {d for d in days if d}:
+        start, end = day_bounds(day)
+        totals = _order_totals(Order.objects.filter(created_at__gte=start, created_at__lt=end))
+        rows.append(DailyMetrics(
+            date=day,
+            revenue=totals["revenue"] or Decimal("0"),
+            orders=totals["orders"] or 0,
+            gross_revenue=totals["gross_revenue"] or Decimal("0"),
+            placed_orders=totals["placed_orders"] or 0,
+            cancelled_orders=totals["cancelled_orders"] or 0,
+        ))
+    if rows:
+        DailyMetrics.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["date"],
+            update_fields=ORDER_FIELDS + ["updated_at"],
+        )
+    return len(rows)
+
+
+def bump_metric(day: date | None, field: str, amount: int = 1) -> None:
+    """Add ``amount`` to a counter column on ``day``, creating the row if needed."""
+    if day is None:
+        return
+    DailyMetrics.objects.bulk_create([DailyMetrics(date=day)], ignore_conflicts=True)
+    DailyMetrics.objects.filter(date=day).update(**{field: F(field) + amount}, updated_at=timezone.now())
+
+
+def _counts_by_day(qs) -> dict[date, int]:
+    counts: dict[date, int] = {}
+    for created_at in qs.values_list("created_at", flat=True).iterator(chunk_size=2000):
+        day = local_date(created_at)
+        counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+def rebuild_daily_metrics() -> int:
+    """Rebuild every row from the source tables (the rebuild_daily_metrics command)."""
+    by_day: dict = {}
+
+    def row(day):
+        if day not in by_day:
+            by_day[day] = DailyMetrics(date=day, revenue=Decimal("0"), gross_revenue=Decimal("0"))
+        return by_day[day]
+
+    for created_at, status, amount in (
+        Order.objects.values_list("created_at", "status", "total_amount").iterator(chunk_size=2000)
+    ):
+        entry = row(local_date(created_at))
+        status = (status or "").lower()
+        amount = amount or Decimal("0")
+        if status == "cancelled":
+            entry.cancelled_orders += 1
+            continue
+        entry.placed_orders += 1
+        entry.gross_revenue += amount
+        if status in ("completed", "dispatched"):
+            entry.orders += 1
+            entry.revenue += amount
+
+    for model, field in ((Customer, "new_customers"), (WishlistItem, "wishlist_adds"), (CartItem, "cart_adds")):
+        for day, count in _counts_by_day(model.objects.all()).items():
+            setattr(row(day), field, count)
+
+    DailyMetrics.objects.all().delete()
+    DailyMetrics.objects.bulk_create(by_day.values(), batch_size=500)
+    return len(by_day)
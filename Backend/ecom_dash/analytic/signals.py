@@ -0,0 +1,46 @@
+"""
+Keep the DailyMetrics rollup in step with orders, customers, wishlist and
+cart writes. Connected in AnalyticConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from analytic.rollups import bump_metric, local_date, refresh_order_metrics
+from api.models import Customer, Order
+from storefront.models import CartItem, WishlistItem
+
+
+@receiver(post_init, sender=Order)
+def _remember_order_day(sender, instance, **kwargs):
+    # An edited created_at moves the order to another day; refresh both.
+    instance._metrics_day = local_date(instance.created_at)
+
+
+@receiver(post_save, sender=Order)
+def _order_saved(sender, instance, **kwargs):
+    day = local_date(instance.created_at)
+    refresh_order_metrics({day, getattr(instance, "_metrics_day", None)})
+    instance._metrics_day = day
+
+
+@receiver(post_delete, sender=Order)
+def _order_deleted(sender, instance, **kwargs):
+    refresh_order_metrics({local_date(instance.created_at)})
+
+
+@receiver(post_save, sender=Customer)
+def _customer_saved(sender, instance, created=False, **kwargs):
+    if created:
+        bump_metric(local_date(instance.created_at), "new_customers")
+
+
+@receiver(post_save, sender=WishlistItem)
+def _wishlist_item_saved(sender, instance, created=False, **kwargs):
+    if created:
+        bump_metric(local_date(instance.created_at), "wishlist_adds")
+
+
+@receiver(post_save, sender=CartItem)
+def _cart_item_saved(sender, instance, created=False, **kwargs):
+    if created:
+        bump_metric(local_date(instance.created_at), "cart_adds")
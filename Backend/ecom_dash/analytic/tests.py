@@ -1,3 +1,95 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from analytic.models import DailyMetrics
+from analytic.rollups import ORDER_FIELDS, local_date, rebuild_daily_metrics
+from api.models import Customer, Order, OrderItem
+from api.utils.order_status import bulk_transition
+
+
+class DailyMetricsRollupTests(TestCase):
+    """The signal- and bulk_transition-maintained order columns against a recount of the orders."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Ann", email="ann@example.com", phone="1")
+        self.today = timezone.now()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def _order(self, status, created_at, *lines):
+        order = Order.objects.create(customer=self.customer, status=status, total_amount=0, created_at=created_at)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, name=f"Item {n}", price=Decimal(price), quantity=qty)
+            for n, (price, qty) in enumerate(lines or [("100.00", 1)])
+        ])
+        order.total_amount = sum(item.price * item.quantity for item in order.items.all())
+        order.save()
+        return order
+
+    def assertMetricsMatchOrders(self):
+        expected = {}
+        for order in Order.objects.prefetch_related("items"):
+            day = expected.setdefault(local_date(order.created_at), dict.fromkeys(ORDER_FIELDS, 0))
+            amount = sum(item.price * item.quantity for item in order.items.all())
+            if order.status == Order.CANCELLED:
+                day["cancelled_orders"] += 1
+                continue
+            day["placed_orders"] += 1
+            day["gross_revenue"] += amount
+            if order.status in (Order.COMPLETED, Order.DISPATCHED):
+                day["orders"] += 1
+                day["revenue"] += amount
+
+        empty = dict.fromkeys(ORDER_FIELDS, 0)
+        actual = {row.pop("date"): row for row in DailyMetrics.objects.values("date", *ORDER_FIELDS)}
+        # Days whose orders were all deleted keep a zeroed row.
+        self.assertEqual(actual, {day: expected.get(day, empty) for day in actual})
+        self.assertLessEqual(expected.keys(), actual.keys())
+
+    def test_signals_follow_create_status_change_cancel_move_and_delete(self):
+        first = self._order(Order.PENDING, self.today, ("250.00", 2), ("99.50", 1))
+        second = self._order(Order.ACCEPTED, self.today)
+        third = self._order(Order.COMPLETED, self.yesterday, ("40.00", 3))
+        self.assertMetricsMatchOrders()
+
+        first.status = Order.DISPATCHED
+        first.save()
+        second.status = Order.CANCELLED
+        second.save()
+        self.assertMetricsMatchOrders()
+
+        third.created_at = self.today
+        third.save()
+        self.assertMetricsMatchOrders()
+
+        first.delete()
+        third.delete()
+        self.assertMetricsMatchOrders()
+
+    def test_bulk_transition_keeps_the_metrics(self):
+        orders = [
+            self._order(Order.PENDING, self.today, ("10.00", 1)),
+            self._order(Order.CANCELLED, self.today, ("20.00", 2)),
+            self._order(Order.ACCEPTED, self.yesterday, ("30.00", 3)),
+        ]
+        ids = [order.id for order in orders]
+
+        bulk_transition(ids, Order.COMPLETED, notify=False)
+        self.assertMetricsMatchOrders()
+
+        bulk_transition(ids[:1], Order.CANCELLED, notify=False)
+        orders[2].delete()
+        self.assertMetricsMatchOrders()
+
+    def test_rebuild_agrees_with_the_maintained_rows(self):
+        self._order(Order.COMPLETED, self.today, ("15.00", 2))
+        self._order(Order.CANCELLED, self.yesterday)
+        pending = self._order(Order.PENDING, self.yesterday)
+        bulk_transition([pending.id], Order.DISPATCHED, notify=False)
+        maintained = list(DailyMetrics.objects.values("date", *ORDER_FIELDS))
+
+        rebuild_daily_metrics()
 
-# Create your tests here.
+        self.assertEqual(list(DailyMetrics.objects.values("date", *ORDER_FIELDS)), maintained)
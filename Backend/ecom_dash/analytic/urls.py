@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('analytics/', views.analytics_overview, name='analytics'),
     path("analytics-summary/", views.analytics_overview, name="analytics-summary"),
+    path("dashboard/", views.dashboard_kpis, name="dashboard-kpis"),
     path("analytics-timeseries/", views.wishlist_cart_timeseries, name="analytics-timeseries"),
     path("visitor-region-data/", views.visitor_region_data, name="visitor-region-data"),
     path("visitor-region-timeseries/", views.visitor_region_timeseries, name="visitor-region-timeseries"),
@@ -9,12 +9,16 @@ from django.db.models import Sum, Count, Avg, Max
 from django.db.models.functions import TruncDate, TruncHour
 from datetime import datetime, timedelta
 from django.utils import timezone
-from .models import Visitor
+from .models import Visitor, DailyMetrics
 from api.models import Order
+from api.utils.status_counts import status_counts
 from rest_framework import status
 from api.models import Product
 from storefront.models import WishlistItem, CartItem, ProductReview
 from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from decimal import Decimal
 from io import BytesIO
 
 @api_view(['POST'])
@@ -44,12 +48,12 @@ def analytics_overview(request):
 
     # Sync with API orders: use total_amount and created_at; treat non-cancelled as revenue
     total_revenue = (
-        Order.objects.exclude(status__iexact='cancelled')
+        Order.objects.exclude(status=Order.CANCELLED)
         .aggregate(Sum('total_amount'))
         .get('total_amount__sum')
         or 0
     )
-    total_orders = Order.objects.exclude(status__iexact='cancelled').count()
+    total_orders = Order.objects.exclude(status=Order.CANCELLED).count()
     total_wishlist = WishlistItem.objects.count()
     total_cart = CartItem.objects.count()
 
@@ -103,9 +107,9 @@ def wishlist_cart_timeseries(request):
             w = WishlistItem.objects.filter(created_at__gte=start, created_at__lt=end).count()
             c = CartItem.objects.filter(created_at__gte=start, created_at__lt=end).count()
             oqs = Order.objects.filter(created_at__gte=start, created_at__lt=end)
-            orders_count = oqs.exclude(status__iexact='cancelled').count()
+            orders_count = oqs.exclude(status=Order.CANCELLED).count()
             revenue_sum = (
-                oqs.exclude(status__iexact='cancelled')
+                oqs.exclude(status=Order.CANCELLED)
                 .aggregate(Sum('total_amount'))
                 .get('total_amount__sum')
                 or 0
@@ -136,9 +140,9 @@ def wishlist_cart_timeseries(request):
             w = WishlistItem.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).count()
             c = CartItem.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).count()
             oqs = Order.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end)
-            orders_count = oqs.exclude(status__iexact='cancelled').count()
+            orders_count = oqs.exclude(status=Order.CANCELLED).count()
             revenue_sum = (
-                oqs.exclude(status__iexact='cancelled')
+                oqs.exclude(status=Order.CANCELLED)
                 .aggregate(Sum('total_amount'))
                 .get('total_amount__sum')
                 or 0
@@ -160,9 +164,9 @@ def wishlist_cart_timeseries(request):
             w = WishlistItem.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).count()
             c = CartItem.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).count()
             oqs = Order.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end)
-            orders_count = oqs.exclude(status__iexact='cancelled').count()
+            orders_count = oqs.exclude(status=Order.CANCELLED).count()
             revenue_sum = (
-                oqs.exclude(status__iexact='cancelled')
+                oqs.exclude(status=Order.CANCELLED)
                 .aggregate(Sum('total_amount'))
                 .get('total_amount__sum')
                 or 0
@@ -185,9 +189,9 @@ def wishlist_cart_timeseries(request):
             w = WishlistItem.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).count()
             c = CartItem.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end).count()
             oqs = Order.objects.filter(created_at__gte=bucket_start, created_at__lt=bucket_end)
-            orders_count = oqs.exclude(status__iexact='cancelled').count()
+            orders_count = oqs.exclude(status=Order.CANCELLED).count()
             revenue_sum = (
-                oqs.exclude(status__iexact='cancelled')
+                oqs.exclude(status=Order.CANCELLED)
                 .aggregate(Sum('total_amount'))
                 .get('total_amount__sum')
                 or 0
@@ -210,6 +214,106 @@ def wishlist_cart_timeseries(request):
 
     return Response({"period": period, "data": data, "totals": totals})
 
+DASHBOARD_PERIOD_DAYS = {"24h": 1, "7d": 7, "30d": 30, "90d": 90}
+DASHBOARD_SNAPSHOT_CACHE_KEY = "dashboard:snapshot"
+
+
+def _percent_change(current, previous):
+    # Same rule the KPI cards used client-side.
+    if not previous:
+        return 100.0 if current > 0 else 0.0
+    return round((float(current) - float(previous)) / float(previous) * 100, 1)
+
+
+def _dashboard_snapshot():
+    """Point-in-time counts that are not per-day flows; cached briefly."""
+    snapshot = cache.get(DASHBOARD_SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        threshold = getattr(settings, "LOW_STOCK_THRESHOLD", 5)
+        snapshot = {
+            "pending_orders": status_counts()[Order.PENDING],
+            "low_stock": Product.objects.exclude(status="discontinued").filter(stock__lte=threshold).count(),
+            "wishlisted": WishlistItem.objects.count(),
+            "in_cart": CartItem.objects.count(),
+        }
+        cache.set(DASHBOARD_SNAPSHOT_CACHE_KEY, snapshot, getattr(settings, "DASHBOARD_SNAPSHOT_SECONDS", 30))
+    return snapshot
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def dashboard_kpis(request):
+    """
+    All admin KPI card numbers in one response, read from the DailyMetrics rollup.
+    Query params:
+      - period: one or more of 24h, 7d, 30d, 90d, comma separated (default "30d,7d,24h").
+        Periods are whole local days ending today, so 24h means today.
+    Each period carries its totals, the change against the preceding period of the
+    same length and a per-day trend; ``current`` holds live pending/low-stock/wishlist/cart counts.
+    """
+    requested = (request.query_params.get("period") or "30d,7d,24h").split(",")
+    periods = [p.strip() for p in requested if p.strip()]
+    unknown = [p for p in periods if p not in DASHBOARD_PERIOD_DAYS]
+    if unknown or not periods:
+        return Response(
+            {"detail": f"Unknown period(s): {', '.join(unknown)}. Use {', '.join(DASHBOARD_PERIOD_DAYS)}."},
+            status=400,
+        )
+
+    today = timezone.localdate()
+    span = max(DASHBOARD_PERIOD_DAYS[p] for p in periods)
+    rows = {
+        row.date: row
+        for row in DailyMetrics.objects.filter(date__gt=today - timedelta(days=2 * span), date__lte=today)
+    }
+
+    def totals(first_day, days):
+        picked = [rows.get(first_day + timedelta(days=i)) for i in range(days)]
+        picked = [r for r in picked if r is not None]
+        revenue = sum((r.revenue for r in picked), Decimal("0"))
+        orders = sum(r.orders for r in picked)
+        return {
+            "revenue": revenue,
+            "orders": orders,
+            "aov": (revenue / orders).quantize(Decimal("0.01")) if orders else Decimal("0"),
+            "placed_orders": sum(r.placed_orders for r in picked),
+            "gross_revenue": sum((r.gross_revenue for r in picked), Decimal("0")),
+            "cancelled_orders": sum(r.cancelled_orders for r in picked),
+            "new_customers": sum(r.new_customers for r in picked),
+            "wishlist_adds": sum(r.wishlist_adds for r in picked),
+            "cart_adds": sum(r.cart_adds for r in picked),
+        }
+
+    payload = {}
+    for period in periods:
+        days = DASHBOARD_PERIOD_DAYS[period]
+        start = today - timedelta(days=days - 1)
+        current = totals(start, days)
+        previous = totals(start - timedelta(days=days), days)
+        trend = []
+        for i in range(days):
+            day = start + timedelta(days=i)
+            row = rows.get(day)
+            trend.append({
+                "date": day,
+                "revenue": row.revenue if row else Decimal("0"),
+                "orders": row.orders if row else 0,
+                "placed_orders": row.placed_orders if row else 0,
+            })
+        payload[period] = {
+            **current,
+            "revenue_change": _percent_change(current["revenue"], previous["revenue"]),
+            "orders_change": _percent_change(current["orders"], previous["orders"]),
+            "placed_orders_change": _percent_change(current["placed_orders"], previous["placed_orders"]),
+            "aov_change": _percent_change(current["aov"], previous["aov"]),
+            "new_customers_change": _percent_change(current["new_customers"], previous["new_customers"]),
+            "previous": previous,
+            "trend": trend,
+        }
+
+    return Response({"periods": payload, "current": _dashboard_snapshot(), "as_of": today})
+
+
 # from rest_framework.decorators import api_view, permission_classes
 # from rest_framework.permissions import IsAuthenticatedOrReadOnly
 # from rest_framework.response import Response
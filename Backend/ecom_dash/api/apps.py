@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .utils import image_derivatives, image_utils  # noqa: F401  (register their outbox handlers)
+        from .utils.email_templates import warm_email_templates
+
+        warm_email_templates()
@@ -0,0 +1,62 @@
+import gzip
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import ActivityLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Move ActivityLog rows older than the retention window into gzipped JSON-lines "
+        "files and delete them from the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=getattr(settings, "ACTIVITY_LOG_RETENTION_DAYS", 90))
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--archive-dir",
+            default=getattr(settings, "ACTIVITY_LOG_ARCHIVE_DIR", settings.BASE_DIR / "archives" / "activity_logs"),
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be archived.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        old = ActivityLog.objects.filter(timestamp__lt=cutoff)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{old.count()} log entries older than {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        archive_dir = Path(options["archive_dir"])
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        path = archive_dir / f"activity-logs-before-{cutoff:%Y%m%d-%H%M%S}.jsonl.gz"
+
+        total = 0
+        with gzip.open(path, "at", encoding="utf-8") as fh:
+            while True:
+                batch = list(
+                    old.order_by("id").values("id", "user_id", "user__email", "message", "type", "timestamp")[: options["batch_size"]]
+                )
+                if not batch:
+                    break
+                for row in batch:
+                    row["timestamp"] = row["timestamp"].isoformat()
+                    fh.write(json.dumps(row) + "\n")
+                # Flush before deleting so a crash never drops rows that were not written out.
+                fh.flush()
+                with transaction.atomic():
+                    ActivityLog.objects.filter(id__in=[row["id"] for row in batch]).delete()
+                total += len(batch)
+
+        if not total:
+            path.unlink(missing_ok=True)
+            self.stdout.write("No log entries to archive.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} log entries to {path}."))
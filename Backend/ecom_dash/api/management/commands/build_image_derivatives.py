@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Banner, HomeCollageItem, Product, ProductVariant, ResponsiveImage
+from api.utils.image_derivatives import build_derivatives, queue_derivatives
+from api.utils.image_utils import media_path
+
+
+def stored_image_paths() -> list[str]:
+    """Storage paths of every local image a product, variant, banner or collage tile shows."""
+    paths = []
+    for model in (Product, ProductVariant):
+        for images in model.objects.values_list("images", flat=True).iterator():
+            paths.extend(p for p in map(media_path, images or []) if p and "/raw/" not in p)
+    for model in (Banner, HomeCollageItem):
+        paths.extend(name for name in model.objects.exclude(image="").exclude(image__isnull=True)
+                     .values_list("image", flat=True))
+    return list(dict.fromkeys(paths))
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate responsive AVIF/WebP width ladders and placeholder metadata for stored images "
+        "that do not have them yet "
+        "(new uploads get them automatically through the outbox worker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue", action="store_true", help="Queue for the outbox worker instead of building now.")
+        parser.add_argument("--force", action="store_true", help="Re-encode images that already have derivatives.")
+        parser.add_argument("--batch-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        paths = stored_image_paths()
+        if not options["force"]:
+            done = set(
+                ResponsiveImage.objects.filter(status=ResponsiveImage.DONE)
+                .exclude(placeholder="")
+                .values_list("source", flat=True)
+            )
+            paths = [p for p in paths if p not in done]
+        if options["queue"]:
+            self.stdout.write(f"Queued {queue_derivatives(paths)} image(s).")
+            return
+
+        built = failed = 0
+        size = max(1, options["batch_size"])
+        for start in range(0, len(paths), size):
+            rows = build_derivatives(paths[start:start + size], force=options["force"])
+            built += sum(1 for row in rows.values() if row.status == ResponsiveImage.DONE)
+            failed += sum(1 for row in rows.values() if row.status == ResponsiveImage.FAILED)
+            self.stdout.write(f"{min(start + size, len(paths))}/{len(paths)} processed")
+        self.stdout.write(f"Built {built}, failed {failed}.")
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from api.utils.media_gc import collect
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete (or quarantine) media files that no product, variant, banner, collage tile or "
+        "rich description references any more and that are older than the grace period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=int, default=getattr(settings, "MEDIA_GC_GRACE_HOURS", 72),
+            help="Never touch files modified more recently than this.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed.")
+        parser.add_argument(
+            "--quarantine", action="store_true",
+            help="Move orphans under MEDIA_ROOT/quarantine/<timestamp>/ instead of deleting them.",
+        )
+
+    def handle(self, *args, **options):
+        report = collect(
+            timedelta(hours=options["grace_hours"]), dry_run=options["dry_run"], quarantine=options["quarantine"]
+        )
+        self.stdout.write(
+            f"Scanned {report.scanned} files ({filesizeformat(report.scanned_bytes)}); "
+            f"{report.kept_recent} unreferenced but newer than {options['grace_hours']}h kept."
+        )
+        for folder, (count, size) in sorted(report.by_folder().items()):
+            self.stdout.write(f"  {folder}/: {count} orphaned ({filesizeformat(size)})")
+        if options["verbosity"] > 1:
+            for path, size in report.orphans:
+                self.stdout.write(f"    {path} ({filesizeformat(size)})")
+
+        total = f"{len(report.orphans)} orphaned files ({filesizeformat(report.orphan_bytes)})"
+        if options["dry_run"]:
+            self.stdout.write(f"{total} would be removed.")
+        elif options["quarantine"]:
+            self.stdout.write(self.style.SUCCESS(f"Quarantined {total}; dropped {report.removed_rows} image rows."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {total}; dropped {report.removed_rows} image rows."))
@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.smtp_pool import POOL, send_batch
+
+PLAIN_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure email throughput against an SMTP server (point EMAIL_HOST/EMAIL_PORT at a local "
+        "sink such as `python -m aiosmtpd -n -l localhost:1025`, not the real provider)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--to", default="benchmark@example.com")
+        parser.add_argument("--host", help="Override EMAIL_HOST.")
+        parser.add_argument("--port", type=int, help="Override EMAIL_PORT.")
+        parser.add_argument("--allow-remote", action="store_true", help="Allow a non-local SMTP host.")
+        parser.add_argument(
+            "--compare", action="store_true",
+            help="Also time Django's stock SMTP backend sending each message on its own connection.",
+        )
+
+    def handle(self, *args, **options):
+        count, batch_size = options["count"], max(1, options["batch_size"])
+        overrides = {k: v for k, v in (("host", options["host"]), ("port", options["port"])) if v}
+        host = overrides.get("host", settings.EMAIL_HOST)
+        if host not in LOCAL_HOSTS and not options["allow_remote"]:
+            raise CommandError(f"Refusing to flood {host}; use a local sink (--host localhost --port 1025) or --allow-remote.")
+        messages = [
+            EmailMessage(f"Benchmark {i}", "x" * 512, settings.DEFAULT_FROM_EMAIL, [options["to"]])
+            for i in range(count)
+        ]
+
+        connection = get_connection("api.utils.smtp_pool.PooledEmailBackend", **overrides)
+        started = time.perf_counter()
+        failures = 0
+        for start in range(0, count, batch_size):
+            failures += sum(1 for error in send_batch(messages[start:start + batch_size], connection) if error)
+        self._report("pooled", count, failures, time.perf_counter() - started)
+        POOL.clear()
+
+        if options["compare"]:
+            started = time.perf_counter()
+            failures = 0
+            for message in messages:
+                message.connection = get_connection(PLAIN_BACKEND, **overrides)
+                try:
+                    message.send()
+                except Exception:
+                    failures += 1
+            self._report("stock", count, failures, time.perf_counter() - started)
+
+    def _report(self, label, count, failures, elapsed):
+        rate = (count - failures) / elapsed if elapsed else 0
+        self.stdout.write(f"{label}: {count - failures}/{count} sent in {elapsed:.2f}s ({rate:.0f} msg/s)")
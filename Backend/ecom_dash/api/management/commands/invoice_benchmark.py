@@ -0,0 +1,87 @@
+import os
+import time
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from api.utils.invoice_pdf import DEFAULT_SELLER, LAYOUT_VERSION, _render_many, render_invoice
+
+
+def _sample(order_id: int, items: int) -> dict:
+    return {
+        "layout": LAYOUT_VERSION,
+        "seller": DEFAULT_SELLER,
+        "number": f"{order_id:05d}",
+        "order_id": order_id,
+        "date": "19 Oct 2026",
+        "payment_method": "Cash on Delivery",
+        "customer": {"name": "Benchmark Customer", "email": "benchmark@example.com", "phone": "+91 90000 00000"},
+        "address": ["12, MG Road", "Near City Mall", "Lucknow, Uttar Pradesh 226001"],
+        "items": [
+            {"name": f"Kundan necklace set with matching earrings, style {n}", "sku": f"SKU-{n:04d}",
+             "price": "1499.00", "quantity": 1 + n % 3, "amount": f"{1499 * (1 + n % 3)}.00"}
+            for n in range(items)
+        ],
+        "subtotal": "10000.00", "gst_percent": "3.00", "gst_amount": "300.00",
+        "delivery": "50.00", "total": "10350.00",
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure invoice PDF rendering throughput (pages per second) serially, in a process pool and from cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=500, help="Number of invoices to render.")
+        parser.add_argument("--items", type=int, default=8, help="Line items per invoice (about 30 fit on a page).")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--compare", action="store_true",
+            help="Also time painting the same invoices onto an 800x1100 Pillow raster saved as PDF.",
+        )
+
+    def handle(self, *args, **options):
+        datas = [_sample(n + 1, options["items"]) for n in range(options["count"])]
+        pages = render_invoice(datas[0]).count(b"/Type /Page ")
+        total_pages = pages * len(datas)
+        self.stdout.write(f"{len(datas)} invoices x {pages} page(s), {len(render_invoice(datas[0]))} bytes each")
+
+        started = time.perf_counter()
+        for data in datas:
+            render_invoice(data)
+        self._report("serial", total_pages, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        _render_many(datas, workers=options["workers"])
+        self._report(f"pool x{options['workers']}", total_pages, time.perf_counter() - started)
+
+        cache.set_many({f"bench:{d['order_id']}": render_invoice(d) for d in datas[:50]})
+        started = time.perf_counter()
+        for data in datas[:50]:
+            cache.get(f"bench:{data['order_id']}")
+        self._report("cached", 50 * pages, time.perf_counter() - started)
+        cache.delete_many([f"bench:{d['order_id']}" for d in datas[:50]])
+
+        if options["compare"]:
+            started = time.perf_counter()
+            size = 0
+            for data in datas:
+                size = len(self._raster(data))
+            self._report(f"raster ({size} bytes each)", len(datas), time.perf_counter() - started)
+
+    def _raster(self, data):
+        from PIL import Image, ImageDraw, ImageFont
+
+        img = Image.new("RGB", (800, 1100), color="white")
+        draw, font = ImageDraw.Draw(img), ImageFont.load_default()
+        lines = [f"Invoice {data['number']}", *data["address"]]
+        lines += [f"- {i['name']} x{i['quantity']} @ {i['price']} = {i['amount']}" for i in data["items"]]
+        for n, line in enumerate(lines):
+            draw.text((40, 40 + 24 * n), line, fill="black", font=font)
+        buffer = BytesIO()
+        img.save(buffer, format="PDF")
+        return buffer.getvalue()
+
+    def _report(self, label, pages, elapsed):
+        rate = pages / elapsed if elapsed else 0
+        self.stdout.write(f"{label}: {pages} pages in {elapsed:.2f}s ({rate:.0f} pages/s)")
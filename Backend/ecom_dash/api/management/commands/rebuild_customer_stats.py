@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.utils.customer_stats import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the CustomerStats rollup (order count, lifetime spend, last order, cancellations) for every customer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_customer_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} customers."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.status_counts import rebuild_status_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the OrderStatusCount counters from the orders table."
+
+    def handle(self, *args, **options):
+        rows = rebuild_status_counts()
+        summary = ", ".join(f"{status}={n}" for status, n in sorted(rows.items())) or "no orders"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt order status counts: {summary}."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.utils.outbox import drain, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued outbox messages (order status emails, AVIF image conversions). Safe to run several "
+        "copies at once; each claims its own batch under a lease."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain what is due now and exit.")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--sleep", type=float, default=5.0, help="Seconds to wait when nothing is due.")
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f"Outbox worker {worker} started.")
+        while True:
+            close_old_connections()
+            sent, failed = drain(worker, batch_size=options["batch_size"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def populate_customer_stats(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    CustomerStats = apps.get_model('api', 'CustomerStats')
+    rows = (
+        Order.objects.values('customer_id')
+        .annotate(
+            order_count=Count('id'),
+            lifetime_spend=Sum('total_amount'),
+            last_order_at=Max('created_at'),
+            cancelled_count=Count('id', filter=Q(status__iexact='cancelled')),
+        )
+    )
+    CustomerStats.objects.bulk_create(
+        [
+            CustomerStats(
+                customer_id=row['customer_id'],
+                order_count=row['order_count'] or 0,
+                lifetime_spend=row['lifetime_spend'] or 0,
+                last_order_at=row['last_order_at'],
+                cancelled_count=row['cancelled_count'] or 0,
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_orderstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.customer')),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+                ('cancelled_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_customer_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:22
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def dedupe_and_backfill_occasions(apps, schema_editor):
+    Occasion = apps.get_model('api', 'Occasion')
+    HomeCollageItem = apps.get_model('api', 'HomeCollageItem')
+    seen = set()
+    for occ in Occasion.objects.order_by('id'):
+        key = (occ.name or '').strip().lower()
+        if key in seen:
+            occ.delete()
+            continue
+        seen.add(key)
+    names = HomeCollageItem.objects.filter(item_type='occasion').values_list('name', flat=True)
+    for name in names:
+        name = (name or '').strip()
+        if name and name.lower() not in seen:
+            Occasion.objects.create(name=name)
+            seen.add(name.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_customerstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_and_backfill_occasions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='occasion',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='api_occasion_name_ci_unique'),
+        ),
+    ]
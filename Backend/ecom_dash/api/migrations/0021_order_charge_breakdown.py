@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:44
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+# Frozen copy of the pricing rules at this migration; api.utils.pricing may change.
+CENT = Decimal('0.01')
+ZERO = Decimal('0')
+HUNDRED = Decimal('100')
+GST_LINE_NAMES = {'gst', 'gst charge', 'tax', 'taxes', 'igst', 'cgst', 'sgst'}
+DELIVERY_LINE_NAMES = {
+    'delivery', 'delivery charge', 'delivery charges',
+    'shipping', 'shipping charge', 'shipping charges',
+}
+
+
+def _decimal(value):
+    if value in (None, ''):
+        return ZERO
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value).replace('%', '').strip())
+    except (InvalidOperation, ValueError):
+        return ZERO
+
+
+def _money(value):
+    return _decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _legacy_breakdown(order, items):
+    """(subtotal, gst_percent, gst_amount, delivery) the status email used to derive on every send."""
+    subtotal, gst_lines, delivery_lines = ZERO, ZERO, ZERO
+    for item in items:
+        line_total = _decimal(item.price) * _decimal(item.quantity)
+        name = (item.name or '').strip().lower()
+        if name in GST_LINE_NAMES:
+            gst_lines += line_total
+        elif name in DELIVERY_LINE_NAMES:
+            delivery_lines += line_total
+        else:
+            subtotal += _decimal(item.price) * int(item.quantity or 0)
+    gst_rate = _decimal(order.gst_percent)
+    gst_amount = gst_lines or (subtotal * gst_rate / HUNDRED if subtotal else ZERO)
+    if gst_lines and subtotal and not gst_rate:
+        gst_rate = gst_lines / subtotal * HUNDRED
+    delivery_amount = _decimal(order.delivery_charge) or delivery_lines
+    total = _decimal(order.total_amount) or (subtotal + gst_amount + delivery_amount)
+    gap = total - subtotal - delivery_amount - gst_amount
+    if gap > 0 and not gst_amount:
+        gst_amount, gap = gap, ZERO
+    if gap > 0 and not delivery_amount:
+        delivery_amount = gap
+    return _money(subtotal), gst_rate.quantize(CENT, rounding=ROUND_HALF_UP), _money(gst_amount), _money(delivery_amount)
+
+
+def backfill_charge_breakdown(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    batch = []
+    for order in Order.objects.prefetch_related('items').iterator(chunk_size=500):
+        order.subtotal, order.gst_percent, order.gst_amount, order.delivery_charge = _legacy_breakdown(
+            order, order.items.all()
+        )
+        batch.append(order)
+        if len(batch) >= 500:
+            Order.objects.bulk_update(batch, ['subtotal', 'gst_amount', 'gst_percent', 'delivery_charge'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['subtotal', 'gst_amount', 'gst_percent', 'delivery_charge'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='gst_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_charge_breakdown, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:50
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Frozen copy of api.models.ORDER_STATUS_ALIASES at this migration.
+STATUS_ALIASES = {'canceled': 'cancelled'}
+
+
+def _canonical(value):
+    status = str(value or '').strip().lower()
+    return STATUS_ALIASES.get(status, status)
+
+
+def normalize_statuses(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    OrderStatusEvent = apps.get_model('api', 'OrderStatusEvent')
+    OrderStatusCount = apps.get_model('api', 'OrderStatusCount')
+    # One UPDATE per distinct spelling ("Pending", "Cancelled", "canceled", ...).
+    for model, fields in ((Order, ['status']), (OrderStatusEvent, ['from_status', 'to_status'])):
+        for field in fields:
+            for raw in model.objects.values_list(field, flat=True).distinct():
+                canonical = _canonical(raw) if raw else raw
+                if canonical != raw:
+                    model.objects.filter(**{field: raw}).update(**{field: canonical})
+
+    rows = Order.objects.values_list('status').annotate(n=Count('id')).order_by()
+    OrderStatusCount.objects.bulk_create([OrderStatusCount(status=status, count=n) for status, n in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_order_charge_breakdown'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('status', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('dispatched', 'Dispatched'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='api_order_status_created_idx'),
+        ),
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+    ]
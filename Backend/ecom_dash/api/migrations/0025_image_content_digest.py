@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:07
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def backfill_digests(apps, schema_editor):
+    """Hash existing raw uploads; later duplicates of the same bytes stay blank (still served, just not indexed)."""
+    ImageConversion = apps.get_model('api', 'ImageConversion')
+    seen = set()
+    batch = []
+    for job in ImageConversion.objects.order_by('id').iterator(chunk_size=500):
+        try:
+            with default_storage.open(job.source, 'rb') as fh:
+                digest = hashlib.sha256(fh.read()).hexdigest()
+        except Exception:
+            continue
+        if digest in seen:
+            continue
+        seen.add(digest)
+        job.digest = digest
+        batch.append(job)
+        if len(batch) >= 500:
+            ImageConversion.objects.bulk_update(batch, ['digest'])
+            batch = []
+    if batch:
+        ImageConversion.objects.bulk_update(batch, ['digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_responsive_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageconversion',
+            name='digest',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(backfill_digests, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='imageconversion',
+            constraint=models.UniqueConstraint(condition=models.Q(('digest', ''), _negated=True), fields=('digest',), name='api_imageconversion_digest_unique'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_image_content_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='responsiveimage',
+            name='bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='responsiveimage',
+            name='dominant_color',
+            field=models.CharField(blank=True, default='', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='responsiveimage',
+            name='placeholder',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
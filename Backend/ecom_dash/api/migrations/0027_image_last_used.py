@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageconversion',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.db import models
 
 # Create your models here.
-from django.db import models
+from django.db import models, transaction
 from users.models import User
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.db.models.functions import Lower
+from django.core.serializers.json import DjangoJSONEncoder
 
 
 class TimestampedModel(models.Model):
@@ -119,9 +121,12 @@ class ProductVariant(TimestampedModel):
         if self.images and len(self.images) > 6:
             raise ValidationError("Max 6 images allowed for each variant.")
 
-    def save(self, *args, **kwargs):
+    def check_pricing(self):
         if self.selling_price > self.mrp:
             raise ValidationError("Selling price cannot exceed MRP")
+
+    def save(self, *args, **kwargs):
+        self.check_pricing()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -131,19 +136,38 @@ class ProductVariant(TimestampedModel):
         unique_together = ("product", "sku")
 
 
+ORDER_STATUS_ALIASES = {"canceled": "cancelled"}
+
+
+def normalize_order_status(value):
+    """Canonical stored form of an order status: lower case, "canceled" spelled "cancelled"."""
+    status = str(value or "").strip().lower()
+    return ORDER_STATUS_ALIASES.get(status, status)
+
+
 class Order(TimestampedModel):
     PAYMENT_CHOICES = [
         ('prepaid', 'Pre-Paid'),
         ('cod', 'Cash on Delivery'),
     ]
+    PENDING, ACCEPTED, DISPATCHED, COMPLETED, CANCELLED = "pending", "accepted", "dispatched", "completed", "cancelled"
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (ACCEPTED, 'Accepted'),
+        (DISPATCHED, 'Dispatched'),
+        (COMPLETED, 'Completed'),
+        (CANCELLED, 'Cancelled'),
+    ]
 
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE,related_name="orders")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
-    status = models.CharField(max_length=20, default='pending')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     payment_method = models.CharField(max_length=10, choices=PAYMENT_CHOICES, default='cod')
 
-    # Charges and taxes
+    # Charges and taxes (computed by api.utils.pricing when the order is written)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     gst_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # e.g., 18.00
+    gst_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     delivery_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     # Shipping address
@@ -153,6 +177,49 @@ class Order(TimestampedModel):
     state = models.CharField(max_length=100,blank=True,null=True)
     pincode = models.CharField(max_length=10,blank=True,null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="api_order_created_idx"),
+            models.Index(fields=["status", "created_at"], name="api_order_status_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.status = normalize_order_status(self.status) or self.PENDING
+        # The status counters (api.signals) are adjusted in the same transaction as the row.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class OrderStatusCount(models.Model):
+    """
+    Number of orders currently in each status, adjusted on every create,
+    transition and delete (see api.utils.status_counts) so tab badges and
+    status analytics read a handful of rows instead of counting orders.
+    """
+    status = models.CharField(max_length=20, primary_key=True)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+class CustomerStats(models.Model):
+    """
+    Per-customer order rollup kept in step with Order writes (see api.signals),
+    so admin customer lists read one row by primary key instead of aggregating
+    the whole order table. Counts and spend cover every order, as the admin
+    lists always have; cancelled orders are tracked separately.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.order_count} orders"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)  # optional link
@@ -160,7 +227,23 @@ class OrderItem(models.Model):
     sku = models.CharField(max_length=50, blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
-    
+
+
+class OrderStatusEvent(models.Model):
+    """One row per status transition so order history survives later changes."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="status_events")
+    from_status = models.CharField(max_length=20, blank=True, default="")
+    to_status = models.CharField(max_length=20)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="order_status_events")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["order", "created_at"])]
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
 class Discount(TimestampedModel):
     
     # name = models.CharField(max_length=255,null=True)   # 👈 add this
@@ -276,9 +359,26 @@ class Color(models.Model):
 
 class Occasion(models.Model):
     name = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower("name"), name="api_occasion_name_ci_unique"),
+        ]
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def ensure_names(cls, names):
+        """Insert any missing occasion names in one statement; existing ones (any case) are left alone."""
+        cleaned = {}
+        for name in names:
+            name = (name or "").strip()
+            if name:
+                cleaned.setdefault(name.lower(), name)
+        if cleaned:
+            cls.objects.bulk_create([cls(name=n) for n in cleaned.values()], ignore_conflicts=True)
+
 class HomeCollageItem(TimestampedModel):
     ITEM_TYPES = [
         ("occasion", "Occasion"),
@@ -328,6 +428,12 @@ class Notification(TimestampedModel):
     is_read = models.BooleanField(default=False)   # ✅ add this
     type = models.CharField(max_length=50, default="info")  # ✅ maps to NotificationType
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="api_notif_created_idx"),
+            models.Index(fields=["is_read"], name="api_notif_is_read_idx"),
+        ]
+
 
 class RichProductDescription(models.Model):
     title = models.CharField(max_length=255)
@@ -363,7 +469,150 @@ class ActivityLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="activity_logs")
     message = models.TextField()
     type = models.CharField(max_length=20, choices=LOG_TYPES, default="info")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is queued, not when the buffered writer flushes it
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-timestamp", "-id"], name="api_log_ts_id_idx"),
+            models.Index(fields=["type", "-timestamp"], name="api_log_type_ts_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.type.upper()}] {self.message[:50]}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response for an ``Idempotency-Key`` header, replayed to retries of the
+    same request until ``expires_at``. A row with no ``status_code`` is a request
+    still being processed.
+    """
+    scope = models.CharField(max_length=40)
+    owner = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "owner", "key"], name="api_idempotency_key_unique"),
+        ]
+        indexes = [models.Index(fields=["expires_at"], name="api_idempotency_expiry_idx")]
+
+    def __str__(self):
+        return f"{self.scope}:{self.owner}:{self.key}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Side effect (e.g. a status email) recorded in the same transaction as the
+    change that caused it and delivered later by the run_outbox_worker command.
+    """
+    PENDING = "pending"
+    PROCESSING = "processing"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (PROCESSING, "Processing"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "available_at"], name="api_outbox_due_idx")]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
+
+
+class ImageConversion(models.Model):
+    """
+    An uploaded JPG/PNG waiting for (or done with) AVIF encoding. The raw file
+    is served until the outbox worker stores the AVIF and swaps its URL into
+    every product/variant that references ``source`` (see api.utils.image_utils).
+
+    Rows double as the content index: ``digest`` is the SHA-256 of the decoded
+    upload, so the same image sent again (or for another product) resolves to
+    the existing files instead of being stored and encoded twice.
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    source = models.CharField(max_length=255, unique=True)  # storage path of the raw upload
+    result = models.CharField(max_length=255, blank=True, default="")  # storage path of the AVIF
+    digest = models.CharField(max_length=64, blank=True, default="")  # sha256 of the raw bytes
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Last time the store handed this image out (upload, dedupe hit or upload id);
+    # orphan collection keeps its files for the grace period after that.
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Blank only for uploads whose raw file was gone when digests were backfilled.
+            models.UniqueConstraint(
+                fields=["digest"], condition=~models.Q(digest=""), name="api_imageconversion_digest_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
+
+
+class ResponsiveImage(models.Model):
+    """
+    Width ladder of AVIF/WebP derivatives for one stored image (product
+    image, banner or collage tile), with the metadata clients need before the
+    image loads: dimensions, byte size, dominant colour and a tiny blurred
+    placeholder. Files live under derivatives/ and are generated once, the
+    metadata in the same pass (see api.utils.image_derivatives).
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    source = models.CharField(max_length=255, unique=True)  # storage path the models reference
+    origin = models.CharField(max_length=255, blank=True, default="")  # better-quality file to derive from, if any
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    # [{"width": 320, "height": 240, "avif": "derivatives/..../320.avif", "webp": ".../320.webp"}, ...]
+    renditions = models.JSONField(default=list, blank=True)
+    bytes = models.PositiveBigIntegerField(null=True, blank=True)  # size of ``source``
+    dominant_color = models.CharField(max_length=7, blank=True, default="")  # "#rrggbb"
+    placeholder = models.TextField(blank=True, default="")  # LQIP data URI, a few hundred bytes
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
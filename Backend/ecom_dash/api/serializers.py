@@ -4,11 +4,49 @@ from rest_framework.request import Request
 from .models import *
 from .models import VisitorRegionData
 from .models import Product
-from .models import Order, Customer, OrderItem
+from .models import Order, Customer, OrderItem, normalize_order_status
 from decimal import Decimal
+from urllib.parse import urlparse
+from django.db import models, transaction
+from django.utils import timezone
 
 from .models import MainCategory, SubCategory, Material, Color, Occasion, HomeCollageItem
-from .utils.image_utils import convert_list_to_avif
+from .utils.image_derivatives import IMAGE_RECORDS_CONTEXT, image_meta, image_metadata, image_records, srcset, srcsets
+from .utils.image_utils import image_statuses, resolve_image_ids, store_images
+from .utils.pricing import charge_kind, price_item_rows
+
+
+def _image_key(value):
+    """Compare image references by path so absolute URLs echoed back by clients match stored ones."""
+    if isinstance(value, str) and value.startswith("http"):
+        return urlparse(value).path
+    return value
+
+
+def _images_unchanged(incoming, stored) -> bool:
+    return [_image_key(v) for v in incoming or []] == [_image_key(v) for v in stored or []]
+
+
+def _variant_value_changed(variant, attr, value) -> bool:
+    if attr == "rpd":
+        return variant.rpd_id != (value.pk if value is not None else None)
+    return getattr(variant, attr) != value
+
+
+class ImageRecordsListSerializer(serializers.ListSerializer):
+    """
+    Looks up the derivative records of every image in the list in one batch
+    and shares them through the context, so each item's srcset/image_meta
+    does not hit the cache and database on its own. The child serializer
+    lists an instance's image URLs in ``image_urls``.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        records = self.context.setdefault(IMAGE_RECORDS_CONTEXT, {})
+        urls = (url for item in items for url in self.child.image_urls(item))
+        records.update(image_records(urls, known=records))
+        return super().to_representation(items)
 
 
 class ProductVariantSerializer(serializers.ModelSerializer):
@@ -24,6 +62,11 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         fields = [
             "id", "name", "sku", "mrp", "sellingPrice", "stock", "images", "tags", "colors", "sizes", "rpdId"
         ]
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return instance.images or []
 
     def to_internal_value(self, data):
         # Be lenient: accept both 'sellingPrice' and 'selling_price'
@@ -40,6 +83,9 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             pass
         return super().to_internal_value(data)
 
+    def validate_images(self, value):
+        return resolve_image_ids(value)
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         request = self.context.get("request")
@@ -49,6 +95,10 @@ class ProductVariantSerializer(serializers.ModelSerializer):
                 request.build_absolute_uri(img) if isinstance(img, str) and img.startswith("/") else img
                 for img in images
             ]
+        data["image_status"] = image_statuses(instance.images)
+        records = self.context.get(IMAGE_RECORDS_CONTEXT)
+        data["srcset"] = srcsets(instance.images, request, records)
+        data["image_meta"] = image_metadata(instance.images, records)
         return data
 
 
@@ -75,6 +125,11 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return [*(instance.images or []), *(url for v in instance.variants.all() for url in v.images or [])]
 
     def get_deliveryInfo(self, obj):
         return {
@@ -91,6 +146,10 @@ class ProductSerializer(serializers.ModelSerializer):
         link = RPDProductLink.objects.filter(product=obj).first()
         return link.rpd_id if link else None
 
+    def validate_images(self, value):
+        # Upload ids resolve here, so an unknown one fails the request before any field is saved.
+        return resolve_image_ids(value)
+
     def to_representation(self, instance):
         """
         Modify the output representation.
@@ -103,14 +162,22 @@ class ProductSerializer(serializers.ModelSerializer):
         if request and instance.images:
             # This logic was previously in get_images
             representation['images'] = [request.build_absolute_uri(img) for img in instance.images]
+        # "processing" while an upload's AVIF is still being encoded (api.utils.image_utils)
+        representation['image_status'] = image_statuses(instance.images)
+        records = self.context.get(IMAGE_RECORDS_CONTEXT)
+        representation['srcset'] = srcsets(instance.images, request, records)
+        representation['image_meta'] = image_metadata(instance.images, records)
         # Keep camelCase for frontend consumers
         representation['limitedDealEndsAt'] = representation.get('limited_deal_ends_at')
         return representation
 
+    # Atomic so the AVIF jobs store_images queues only reach the worker once
+    # the rows listing those images exist (the outbox delivers on commit).
+    @transaction.atomic
     def create(self, validated_data):
         variants_data = validated_data.pop("variants", [])
         if "images" in validated_data:
-            validated_data["images"] = convert_list_to_avif(validated_data.get("images") or [])
+            validated_data["images"] = store_images(validated_data.get("images") or [])
         product = super().create(validated_data)
 
         # Link base product to RPD if provided
@@ -124,7 +191,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
         for variant in variants_data:
             images = variant.get("images") or []
-            variant["images"] = convert_list_to_avif(images)
+            variant["images"] = store_images(images)
             ProductVariant.objects.create(product=product, **variant)
         return product
 
@@ -159,10 +226,14 @@ class ProductSerializer(serializers.ModelSerializer):
     #                 ProductVariant.objects.create(product=product, **variant)
 
     #         return product
+    @transaction.atomic
     def update(self, instance, validated_data):
         variants_data = validated_data.pop("variants", [])
         if "images" in validated_data:
-            validated_data["images"] = convert_list_to_avif(validated_data.get("images") or [])
+            if _images_unchanged(validated_data.get("images"), instance.images):
+                validated_data["images"] = instance.images
+            else:
+                validated_data["images"] = store_images(validated_data.get("images") or [])
         product = super().update(instance, validated_data)
 
         # Update base product RPD link if provided
@@ -175,8 +246,10 @@ class ProductSerializer(serializers.ModelSerializer):
                 # If invalid id provided, remove link
                 RPDProductLink.objects.filter(product=product).delete()
 
-        existing_variants = {v.id: v for v in product.variants.all()}
-        existing_by_sku = {v.sku: v for v in product.variants.all() if v.sku}
+        # One query for the current variants; everything below diffs against this snapshot.
+        existing = list(product.variants.all())
+        existing_variants = {v.id: v for v in existing}
+        existing_by_sku = {v.sku: v for v in existing if v.sku}
         allowed_keys = {"name", "sku", "images", "tags", "colors", "sizes", "mrp", "selling_price", "stock", "rpd"}
 
         # 🧠 Fields that should NOT be copied from parent
@@ -218,8 +291,23 @@ class ProductSerializer(serializers.ModelSerializer):
         except Exception:
             pass
 
-        for variant in variants_data:
+        # The nested serializer treats "id" as read-only, so recover it from the raw payload by position.
+        raw_variants = initial_variants_raw if isinstance(initial_variants_raw, list) else []
+
+        to_update = {}
+        changed_fields = set()
+        to_create = []
+        now = timezone.now()
+
+        for index, variant in enumerate(variants_data):
+            raw_positional = raw_variants[index] if index < len(raw_variants) else None
             v_id = variant.get("id")
+            if v_id is None and isinstance(raw_positional, dict):
+                v_id = raw_positional.get("id")
+            try:
+                v_id = int(v_id) if v_id not in (None, "") else None
+            except (TypeError, ValueError):
+                v_id = None
             v_sku = variant.get("sku")
 
             # Normalize possible camelCase key from nested serializer
@@ -228,7 +316,7 @@ class ProductSerializer(serializers.ModelSerializer):
                 vdict["selling_price"] = vdict.pop("sellingPrice")
 
             # Fallbacks: ensure selling_price is carried over from raw payload if needed
-            raw = initial_by_id.get(v_id) or initial_by_sku.get(v_sku)
+            raw = initial_by_id.get(v_id) or initial_by_sku.get(v_sku) or raw_positional
             if "selling_price" not in vdict:
                 if isinstance(raw, dict) and raw.get("sellingPrice") not in (None, ""):
                     vdict["selling_price"] = raw.get("sellingPrice")
@@ -250,32 +338,47 @@ class ProductSerializer(serializers.ModelSerializer):
 
             # Only keep fields belonging to ProductVariant
             cleaned = {k: v for k, v in vdict.items() if k in allowed_keys}
-            if "images" in cleaned:
-                cleaned["images"] = convert_list_to_avif(cleaned.get("images") or [])
+            for key in ("mrp", "selling_price"):
+                if key in cleaned:
+                    if cleaned[key] in (None, ""):
+                        cleaned.pop(key)
+                    else:
+                        cleaned[key] = Decimal(str(cleaned[key]))
 
-            if v_id and v_id in existing_variants:
-                v_obj = existing_variants[v_id]
-                for attr, value in cleaned.items():
-                    setattr(v_obj, attr, value)
-                v_obj.save()
+            v_obj = existing_variants.get(v_id) or (existing_by_sku.get(v_sku) if v_sku else None)
 
-            elif v_sku and v_sku in existing_by_sku:
-                v_obj = existing_by_sku[v_sku]
-                for attr, value in cleaned.items():
-                    setattr(v_obj, attr, value)
-                v_obj.save()
+            if v_obj is None:
+                if "images" in cleaned:
+                    cleaned["images"] = store_images(cleaned.get("images") or [])
+                new_variant = ProductVariant(product=product, **cleaned)
+                new_variant.check_pricing()
+                to_create.append(new_variant)
+                continue
 
-            else:
-                ProductVariant.objects.create(product=product, **cleaned)
+            if "images" in cleaned:
+                if _images_unchanged(cleaned["images"], v_obj.images):
+                    cleaned.pop("images")
+                else:
+                    cleaned["images"] = store_images(cleaned.get("images") or [])
 
-        # Ensure fresh related data for representation
-        try:
-            product.refresh_from_db()
-            # Clear any prefetch cache if present
-            if hasattr(product, "_prefetched_objects_cache"):
-                product._prefetched_objects_cache.pop("variants", None)
-        except Exception:
-            pass
+            dirty = [attr for attr, value in cleaned.items() if _variant_value_changed(v_obj, attr, value)]
+            if not dirty:
+                continue
+            for attr in dirty:
+                setattr(v_obj, attr, cleaned[attr])
+            v_obj.check_pricing()
+            v_obj.updated_at = now
+            to_update[v_obj.pk] = v_obj
+            changed_fields.update(dirty)
+
+        if to_update:
+            ProductVariant.objects.bulk_update(list(to_update.values()), sorted(changed_fields | {"updated_at"}))
+        if to_create:
+            ProductVariant.objects.bulk_create(to_create)
+
+        # Drop any stale prefetch so the response re-reads variants in a single query
+        if hasattr(product, "_prefetched_objects_cache"):
+            product._prefetched_objects_cache.pop("variants", None)
 
         return product
 
@@ -284,9 +387,14 @@ class ProductSerializer(serializers.ModelSerializer):
 class CustomerSerializer(serializers.ModelSerializer):
     total_orders = serializers.IntegerField(read_only=True)
     total_spend = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    last_order_at = serializers.DateTimeField(read_only=True)
+    cancelled_orders = serializers.IntegerField(read_only=True)
     class Meta:
         model = Customer
-        fields = ['id', 'name', 'email', 'phone', 'status', 'created_at', 'total_orders', 'total_spend']
+        fields = [
+            'id', 'name', 'email', 'phone', 'status', 'created_at',
+            'total_orders', 'total_spend', 'last_order_at', 'cancelled_orders',
+        ]
 
 class CustomerAccountSerializer(serializers.ModelSerializer):
     total_orders = serializers.IntegerField(read_only=True)
@@ -302,7 +410,20 @@ class CustomerAccountSerializer(serializers.ModelSerializer):
         status_val = self.initial_data.get("status")
         if status_val is not None and "is_active" not in validated_data:
             validated_data["is_active"] = str(status_val).lower() == "active"
-        return super().update(instance, validated_data)
+        account = super().update(instance, validated_data)
+        if account.api_customer_id and "email" in validated_data:
+            # Keep the linked record on the new address so the old one is free for a new account.
+            Customer.objects.filter(pk=account.api_customer_id).exclude(email=account.email).update(email=account.email)
+        return account
+
+class OrderStatusField(serializers.ChoiceField):
+    """Order status that accepts any casing ("Accepted", "CANCELED") and stores the canonical value."""
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=Order.STATUS_CHOICES, **kwargs)
+
+    def to_internal_value(self, data):
+        return super().to_internal_value(normalize_order_status(data))
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(
@@ -331,10 +452,13 @@ class OrderWithItemsSerializer(serializers.ModelSerializer):
     customer = CustomerSerializer(required=False)
     # Make total_amount server-controlled
     total_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    gst_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     # Be lenient with incoming charge fields
     gst_percent = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
     delivery_charge = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
     items = OrderItemSerializer(many=True, required=False)
+    status = OrderStatusField(required=False)
 
     class Meta:
         model = Order
@@ -342,7 +466,7 @@ class OrderWithItemsSerializer(serializers.ModelSerializer):
             'id', 'customer', 'total_amount', 'status',
             'payment_method', 'address_line1', 'address_line2',
             'city', 'state', 'pincode',
-            'gst_percent', 'delivery_charge',
+            'subtotal', 'gst_percent', 'gst_amount', 'delivery_charge',
             'created_at', 'items'
         ]
 
@@ -359,72 +483,24 @@ class OrderWithItemsSerializer(serializers.ModelSerializer):
                 data[key] = None
         return super().to_internal_value(data)
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        data['status'] = instance.status.lower()
-        return data
-
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         customer_data = validated_data.pop('customer')
         # Pull charges from payload (defaults to 0 if omitted)
         gst_percent = validated_data.pop('gst_percent', 0) or 0
         delivery_charge = validated_data.pop('delivery_charge', 0) or 0
-        # Ignore client-provided total_amount when items are present
-        client_total = validated_data.pop('total_amount', 0)
+        # total_amount is always computed server-side
+        validated_data.pop('total_amount', None)
 
         customer, _ = Customer.objects.get_or_create(
             email=customer_data['email'],
             defaults={'name': customer_data['name'], 'phone': customer_data['phone']}
         )
-        # Start with total 0; compute from items if provided
-        order = Order.objects.create(
-            customer=customer,
-            total_amount=0,
-            gst_percent=gst_percent,
-            delivery_charge=delivery_charge,
-            **validated_data,
-        )
-
-        # Compute subtotal ignoring synthetic charge items if sent as items
-        subtotal = Decimal('0')
-        gst_from_items = Decimal('0')
-        delivery_from_items = Decimal('0')
-        for item in items_data:
-            name = (item.get('name') or '').strip().lower()
-            price_val = item.get('price', 0)
-            qty_val = item.get('quantity', 0)
-            # Normalize decimals
-            price_dec = price_val if isinstance(price_val, Decimal) else Decimal(str(price_val))
-            qty_dec = qty_val if isinstance(qty_val, Decimal) else Decimal(str(qty_val))
-
-            if name in ('gst', 'delivery charge', 'delivery'):
-                if name == 'gst':
-                    gst_from_items += price_dec
-                else:
-                    delivery_from_items += price_dec
-                continue
-            OrderItem.objects.create(order=order, **item)
-            subtotal += (price_dec * qty_dec)
-
-        # Determine charges
-        # Normalize incoming gst_percent and delivery_charge to Decimal
-        gst_pct_dec = gst_percent if isinstance(gst_percent, Decimal) else Decimal(str(gst_percent))
-        del_charge_dec = delivery_charge if isinstance(delivery_charge, Decimal) else Decimal(str(delivery_charge))
-
-        if (gst_pct_dec is None or gst_pct_dec == Decimal('0')) and subtotal > 0 and gst_from_items > 0:
-            # Derive percentage from provided GST item amount
-            gst_pct_dec = (gst_from_items / subtotal) * Decimal('100')
-
-        if (del_charge_dec is None or del_charge_dec == Decimal('0')) and delivery_from_items > 0:
-            del_charge_dec = delivery_from_items
-
-        # Calculate totals with Decimal math
-        gst_amount = (subtotal * gst_pct_dec) / Decimal('100') if subtotal > 0 else Decimal('0')
-        order.gst_percent = gst_pct_dec
-        order.delivery_charge = del_charge_dec
-        order.total_amount = subtotal + gst_amount + del_charge_dec
+        goods, breakdown = price_item_rows(items_data, gst_percent=gst_percent, delivery=delivery_charge)
+        order = Order(customer=customer, **validated_data)
+        breakdown.apply(order)
         order.save()
+        OrderItem.objects.bulk_create([OrderItem(order=order, **item) for item in goods])
         return order
 
     def update(self, instance, validated_data):
@@ -443,54 +519,32 @@ class OrderWithItemsSerializer(serializers.ModelSerializer):
         for field in ['status', 'payment_method', 'address_line1', 'address_line2', 'city', 'state', 'pincode']:
             if field in validated_data:
                 setattr(instance, field, validated_data[field])
-        if gst_percent is not None:
-            instance.gst_percent = gst_percent
-        if delivery_charge is not None:
-            instance.delivery_charge = delivery_charge
-        instance.save()
 
-        recompute = (items_data is not None) or (gst_percent is not None) or (delivery_charge is not None)
         if items_data is not None:
+            # Explicit charges win, then GST/delivery sent as pseudo lines, then what the order had.
+            kinds = {charge_kind(item.get('name')) for item in items_data}
+            rate = gst_percent if gst_percent is not None else (None if 'gst' in kinds else instance.gst_percent)
+            delivery = delivery_charge if delivery_charge is not None else (
+                None if 'delivery' in kinds else instance.delivery_charge
+            )
             instance.items.all().delete()
-            subtotal = Decimal('0')
-            gst_from_items = Decimal('0')
-            delivery_from_items = Decimal('0')
-            for item in items_data:
-                name = (item.get('name') or '').strip().lower()
-                price_val = item.get('price', 0)
-                qty_val = item.get('quantity', 0)
-                price_dec = price_val if isinstance(price_val, Decimal) else Decimal(str(price_val))
-                qty_dec = qty_val if isinstance(qty_val, Decimal) else Decimal(str(qty_val))
-
-                if name in ('gst', 'delivery charge', 'delivery'):
-                    if name == 'gst':
-                        gst_from_items += price_dec
-                    else:
-                        delivery_from_items += price_dec
-                    continue
-                OrderItem.objects.create(order=instance, **item)
-                subtotal += (price_dec * qty_dec)
-
-            # If gst_percent not explicitly provided but GST item exists, derive
-            if gst_percent is None and subtotal > 0 and gst_from_items > 0:
-                instance.gst_percent = (gst_from_items / subtotal) * Decimal('100')
-            # If delivery not explicitly provided, take from items
-            if delivery_charge is None and delivery_from_items > 0:
-                instance.delivery_charge = delivery_from_items
-        else:
-            # Recompute subtotal from existing items if only charges changed
-            if recompute:
-                subtotal = sum([(i.price * i.quantity) for i in instance.items.all()], Decimal('0'))
-
-        if recompute:
-            gst_amount = (subtotal * (instance.gst_percent if isinstance(instance.gst_percent, Decimal) else Decimal(str(instance.gst_percent)))) / Decimal('100') if subtotal > 0 else Decimal('0')
-            del_charge_dec = instance.delivery_charge if isinstance(instance.delivery_charge, Decimal) else Decimal(str(instance.delivery_charge or 0))
-            instance.total_amount = subtotal + gst_amount + del_charge_dec
-            instance.save()
+            goods, breakdown = price_item_rows(items_data, gst_percent=rate, delivery=delivery)
+            OrderItem.objects.bulk_create([OrderItem(order=instance, **item) for item in goods])
+            breakdown.apply(instance)
+        elif gst_percent is not None or delivery_charge is not None:
+            # Only charges changed: re-price the stored items.
+            _, breakdown = price_item_rows(
+                instance.items.values('name', 'price', 'quantity'),
+                gst_percent=gst_percent if gst_percent is not None else instance.gst_percent,
+                delivery=delivery_charge if delivery_charge is not None else instance.delivery_charge,
+            )
+            breakdown.apply(instance)
+        instance.save()
         return instance
     
 class OrderSerializer(serializers.ModelSerializer):
     customer = CustomerSerializer()   # ✅ nested allowed
+    status = OrderStatusField(required=False)
 
     class Meta:
         model = Order
@@ -500,11 +554,6 @@ class OrderSerializer(serializers.ModelSerializer):
             'city', 'state', 'pincode', 'created_at'
         ]
         
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        data['status'] = instance.status.lower()
-        return data
-
     def create(self, validated_data):
         customer_data = validated_data.pop('customer')
         # check if customer exists by email
@@ -606,6 +655,11 @@ class BannerSerializer(serializers.ModelSerializer):
             'device_type', 'start_date', 'end_date', 'status',
             'created_at', 'updated_at'
         ]
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return [instance.image.url] if instance.image else []
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -613,6 +667,10 @@ class BannerSerializer(serializers.ModelSerializer):
         image = data.get("image")
         if image and request and not str(image).startswith("http"):
             data["image"] = request.build_absolute_uri(image)
+        image_url = instance.image.url if instance.image else None
+        records = self.context.get(IMAGE_RECORDS_CONTEXT)
+        data["image_srcset"] = srcset(image_url, request, records)
+        data["image_meta"] = image_meta(image_url, records)
         return data
 class NoteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -690,9 +748,20 @@ class OccasionSerializer(serializers.ModelSerializer):
         model = Occasion
         fields = '__all__'
 
+    def validate_name(self, value):
+        value = (value or "").strip()
+        qs = Occasion.objects.filter(name__iexact=value)
+        if self.instance is not None:
+            qs = qs.exclude(pk=self.instance.pk)
+        if qs.exists():
+            raise serializers.ValidationError("An occasion with this name already exists.")
+        return value
+
 class HomeCollageItemSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(required=False, allow_null=True)
     imageUrl = serializers.SerializerMethodField()
+    imageSrcset = serializers.SerializerMethodField()
+    imageMeta = serializers.SerializerMethodField()
 
     class Meta:
         model = HomeCollageItem
@@ -703,6 +772,8 @@ class HomeCollageItemSerializer(serializers.ModelSerializer):
             "image",
             "image_url",
             "imageUrl",
+            "imageSrcset",
+            "imageMeta",
             "grid_class",
             "display_order",
             "redirect_url",
@@ -714,6 +785,11 @@ class HomeCollageItemSerializer(serializers.ModelSerializer):
             "grid_class": {"required": False, "allow_blank": True},
             "redirect_url": {"required": False, "allow_blank": True, "allow_null": True},
         }
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return [instance.resolved_image] if instance.resolved_image else []
 
     def get_imageUrl(self, obj):
         request = self.context.get("request")
@@ -722,6 +798,12 @@ class HomeCollageItemSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(url)
         return url
 
+    def get_imageSrcset(self, obj):
+        return srcset(obj.resolved_image, self.context.get("request"), self.context.get(IMAGE_RECORDS_CONTEXT))
+
+    def get_imageMeta(self, obj):
+        return image_meta(obj.resolved_image, self.context.get(IMAGE_RECORDS_CONTEXT))
+
     def validate(self, attrs):
         image = attrs.get("image")
         image_url = attrs.get("image_url")
@@ -0,0 +1,81 @@
+"""
+Model signal handlers for the api app. Connected in ApiConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from api.models import Banner, Customer, HomeCollageItem, Notification, Occasion, Order
+from api.utils.customer_stats import refresh_customer_stats
+from api.utils.image_derivatives import queue_derivatives
+from api.utils.status_counts import adjust_status_counts, status_transition
+from api.utils.realtime import invalidate_unread_count, publish_notification, publish_order
+
+
+@receiver(pre_save, sender=Order)
+def _read_stored_order(sender, instance, **kwargs):
+    # Count from the stored row, not from what this instance was loaded with: a
+    # bulk_transition, another request or a deferred load leaves that copy stale.
+    # Runs inside Order.save's transaction, so the lock holds until the counters move.
+    if instance._state.adding or not instance.pk:
+        return
+    stored = Order.objects.select_for_update().filter(pk=instance.pk).values_list("status", "customer_id").first()
+    if stored:
+        instance._counted_status, instance._stats_customer_id = stored
+
+
+@receiver(post_save, sender=Order)
+def _order_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    refresh_customer_stats({instance.customer_id, getattr(instance, "_stats_customer_id", None)})
+    current = instance.__dict__.get("status")
+    if created:
+        adjust_status_counts({current: 1})
+    elif update_fields is None or "status" in update_fields:
+        adjust_status_counts(status_transition(getattr(instance, "_counted_status", None), current))
+    if created:
+        publish_order(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def _read_deleted_order(sender, instance, origin=None, **kwargs):
+    # Cascades and queryset deletes load fresh rows; a direct delete may hold a stale copy.
+    if origin is instance:
+        stored = Order.objects.select_for_update().filter(pk=instance.pk).values_list("status", "customer_id").first()
+        if stored:
+            instance.status, instance.customer_id = stored
+
+
+@receiver(post_delete, sender=Order)
+def _order_deleted(sender, instance, origin=None, **kwargs):
+    adjust_status_counts({instance.__dict__.get("status"): -1})
+    # Orders cascading from a customer delete take the stats row with them.
+    if isinstance(origin, Customer) or getattr(origin, "model", None) is Customer:
+        return
+    refresh_customer_stats({instance.customer_id})
+
+
+@receiver(post_save, sender=HomeCollageItem)
+def _collage_item_saved(sender, instance, **kwargs):
+    # Occasion tiles double as entries in the admin occasion dropdown.
+    if instance.item_type == "occasion":
+        Occasion.ensure_names([instance.name])
+    if instance.image:
+        queue_derivatives([instance.image.name])
+
+
+@receiver(post_save, sender=Banner)
+def _banner_saved(sender, instance, **kwargs):
+    # Responsive sizes for the upload; a no-op when this image already has them.
+    if instance.image:
+        queue_derivatives([instance.image.name])
+
+
+@receiver(post_save, sender=Notification)
+def _notification_saved(sender, instance, created=False, **kwargs):
+    invalidate_unread_count()
+    if created:
+        publish_notification(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def _notification_deleted(sender, instance, **kwargs):
+    invalidate_unread_count()
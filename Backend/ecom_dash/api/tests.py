@@ -1,3 +1,549 @@
-from django.test import TestCase
+import base64
+import gzip
+import hashlib
+import json
+import os
+import smtplib
+import socketserver
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.models import (
+    ActivityLog, Banner, Customer, CustomerStats, HomeCollageItem, ImageConversion, Order, OrderItem,
+    OrderStatusEvent, OutboxMessage, Product, ProductVariant,
+)
+from api.utils import outbox
+from api.utils.activity_log import ActivityLogBuffer, activity_log_buffer
+from api.utils.image_utils import store_images
+from api.utils.order_status import bulk_transition
+from api.utils.smtp_pool import POOL, send_batch
+from api.utils.status_counts import status_counts
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: replies to the end of DATA come from ``server.data_replies``."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250 stub")
+            elif command.startswith("DATA"):
+                self.reply("354 go ahead")
+                body = b""
+                while not body.endswith(b"\r\n.\r\n"):
+                    chunk = self.rfile.readline()
+                    if not chunk:
+                        return
+                    body += chunk
+                with server.lock:
+                    reply = server.data_replies.pop(0) if server.data_replies else "250 queued"
+                    server.attempts += 1
+                    if reply.startswith("250"):
+                        server.delivered.append(time.monotonic())
+                self.reply(reply)
+            elif command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 ok")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = self.attempts = 0
+        self.delivered = []
+        self.data_replies = []
+
+
+@override_settings(EMAIL_RETRY_BACKOFF_SECONDS=0, EMAIL_RATE_LIMITS={}, EMAIL_MAX_MESSAGES_PER_CONNECTION=100)
+class PooledEmailBackendTests(SimpleTestCase):
+    def setUp(self):
+        POOL.clear()
+        self.server = _SMTPServer()
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(POOL.clear)
+
+    def connection(self):
+        return get_connection(
+            "api.utils.smtp_pool.PooledEmailBackend",
+            host="127.0.0.1", port=self.server.server_address[1],
+            username="", password="", use_tls=False, use_ssl=False,
+        )
+
+    def messages(self, count):
+        return [EmailMessage(f"Order {n}", "Body", "shop@example.com", [f"buyer{n}@example.com"]) for n in range(count)]
+
+    def test_batches_reuse_one_pooled_connection(self):
+        for _ in range(3):
+            self.assertEqual(send_batch(self.messages(2), self.connection()), [None, None])
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.delivered), 6)
+
+    @override_settings(EMAIL_MAX_MESSAGES_PER_CONNECTION=2)
+    def test_connection_recycled_after_message_limit(self):
+        self.assertEqual(send_batch(self.messages(5), self.connection()), [None] * 5)
+
+        self.assertEqual(self.server.connections, 3)
+
+    @override_settings(EMAIL_RATE_LIMITS={"127.0.0.1": 20})
+    def test_sends_are_spaced_to_the_host_rate_limit(self):
+        started = time.monotonic()
+        self.assertEqual(send_batch(self.messages(30), self.connection()), [None] * 30)
+
+        # A burst of 20, then the other 10 at 20 per second.
+        self.assertGreaterEqual(time.monotonic() - started, 0.45)
+        self.assertEqual(len(self.server.delivered), 30)
+
+    def test_4xx_reply_is_retried(self):
+        self.server.data_replies = ["451 4.3.0 Try again later"]
+
+        self.assertEqual(send_batch(self.messages(1), self.connection()), [None])
+
+        self.assertEqual((self.server.attempts, len(self.server.delivered)), (2, 1))
+
+    def test_5xx_reply_gives_up_and_keeps_the_connection(self):
+        self.server.data_replies = ["550 5.1.1 No such user"]
+
+        errors = self.connection().send_batch(self.messages(2))
+
+        self.assertIsInstance(errors[0], smtplib.SMTPDataError)
+        self.assertEqual(errors[0].smtp_code, 550)
+        self.assertIsNone(errors[1])
+        self.assertEqual((self.server.attempts, self.server.connections), (2, 1))
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_SECONDS=30)
+@mock.patch.object(outbox.random, "uniform", return_value=1.0)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.outcomes = {}
+        handlers = mock.patch.dict(outbox.HANDLERS, {"test": lambda msgs: {m.id: self.outcomes.get(m.id) for m in msgs}})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def test_workers_never_claim_the_same_message(self, _):
+        outbox.enqueue("test", ({"n": n} for n in range(5)))
+
+        first = outbox.claim_batch("w1", limit=3)
+        second = outbox.claim_batch("w2", limit=3)
+
+        self.assertEqual((len(first), len(second)), (3, 2))
+        self.assertFalse({m.id for m in first} & {m.id for m in second})
+        self.assertEqual(outbox.claim_batch("w3"), [])
+        self.assertEqual(OutboxMessage.objects.filter(locked_by="w1").count(), 3)
+
+    def test_slow_topics_are_claimed_a_few_at_a_time(self, _):
+        outbox.enqueue("slow", ({"n": n} for n in range(5)))
+        outbox.enqueue("test", ({"n": n} for n in range(3)))
+
+        with mock.patch.dict(outbox.BATCH_SIZES, {"slow": 2}):
+            first = outbox.claim_batch("w1", limit=4)
+            second = outbox.claim_batch("w2", limit=4)
+
+        self.assertEqual(sorted(m.topic for m in first), ["slow", "slow", "test", "test"])
+        self.assertEqual(sorted(m.topic for m in second), ["slow", "slow", "test"])
+
+    def test_failures_back_off_then_give_up(self, _):
+        [msg] = outbox.enqueue("test", [{}])
+        self.outcomes[msg.id] = "SMTPServerDisconnected"
+
+        for attempt, delay in ((1, 30), (2, 60)):
+            started = timezone.now()
+            self.assertEqual(outbox.drain("w1"), (0, 1))
+            msg.refresh_from_db()
+            self.assertEqual((msg.status, msg.attempts, msg.locked_by), (OutboxMessage.PENDING, attempt, ""))
+            self.assertAlmostEqual((msg.available_at - started).total_seconds(), delay, delta=1)
+            # Not due yet: nothing to claim until the backoff passes.
+            self.assertEqual(outbox.claim_batch("w1"), [])
+            OutboxMessage.objects.filter(pk=msg.pk).update(available_at=timezone.now())
+
+        self.assertEqual(outbox.drain("w1"), (0, 1))
+        msg.refresh_from_db()
+        self.assertEqual((msg.status, msg.attempts, msg.last_error), (OutboxMessage.FAILED, 3, "SMTPServerDisconnected"))
+        self.assertEqual(outbox.claim_batch("w1"), [])
+
+    def test_expired_lease_is_reclaimed_and_the_late_worker_does_not_overwrite(self, _):
+        outbox.enqueue("test", [{}])
+        [slow] = outbox.claim_batch("w1")
+        self.assertEqual(outbox.claim_batch("w2"), [])
+        OutboxMessage.objects.filter(pk=slow.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        [again] = outbox.claim_batch("w2")
+        self.outcomes[slow.id] = "timed out"
+        with self.assertLogs("api.utils.outbox", "WARNING"):
+            self.assertEqual(outbox.process_batch([slow]), (0, 0))
+
+        again.refresh_from_db()
+        self.assertEqual((again.status, again.locked_by, again.attempts), (OutboxMessage.PROCESSING, "w2", 0))
+        self.outcomes[slow.id] = None
+        self.assertEqual(outbox.process_batch([again]), (1, 0))
+        again.refresh_from_db()
+        self.assertEqual((again.status, again.attempts, again.last_error), (OutboxMessage.SENT, 1, ""))
+
+
+
+class OrderRollupTests(TestCase):
+    """The signal- and bulk_transition-maintained counters against a recount of the orders."""
+
+    def setUp(self):
+        self.ann = Customer.objects.create(name="Ann", email="ann@example.com", phone="1")
+        self.bob = Customer.objects.create(name="Bob", email="bob@example.com", phone="2")
+
+    def _order(self, customer, status=Order.PENDING, *lines):
+        order = Order.objects.create(customer=customer, status=status, total_amount=0)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, name=f"Item {n}", price=Decimal(price), quantity=qty)
+            for n, (price, qty) in enumerate(lines or [("100.00", 1)])
+        ])
+        order.total_amount = sum(item.price * item.quantity for item in order.items.all())
+        order.save()
+        return order
+
+    def assertRollupsMatchOrders(self):
+        expected_counts = {status: 0 for status, _ in Order.STATUS_CHOICES}
+        expected_stats = {}
+        for order in Order.objects.prefetch_related("items"):
+            expected_counts[order.status] += 1
+            stats = expected_stats.setdefault(order.customer_id, {
+                "order_count": 0, "lifetime_spend": Decimal("0"), "last_order_at": None, "cancelled_count": 0,
+            })
+            stats["order_count"] += 1
+            stats["lifetime_spend"] += sum(item.price * item.quantity for item in order.items.all())
+            stats["last_order_at"] = max(filter(None, [stats["last_order_at"], order.created_at]))
+            stats["cancelled_count"] += order.status == Order.CANCELLED
+        expected_counts["all"] = sum(expected_counts.values())
+        self.assertEqual(status_counts(), expected_counts)
+
+        empty = {"order_count": 0, "lifetime_spend": Decimal("0"), "last_order_at": None, "cancelled_count": 0}
+        actual = {
+            row.pop("customer_id"): row
+            for row in CustomerStats.objects.values(
+                "customer_id", "order_count", "lifetime_spend", "last_order_at", "cancelled_count"
+            )
+        }
+        customers = Customer.objects.values_list("id", flat=True)
+        self.assertEqual(actual, {cid: expected_stats.get(cid, empty) for cid in customers})
+
+    def test_signals_follow_create_status_change_cancel_reassign_and_delete(self):
+        first = self._order(self.ann, Order.PENDING, ("250.00", 2), ("99.50", 1))
+        second = self._order(self.ann, Order.ACCEPTED)
+        third = self._order(self.bob, Order.PENDING, ("40.00", 3))
+        self.assertRollupsMatchOrders()
+
+        first.status = Order.DISPATCHED
+        first.save()
+        second.status = Order.CANCELLED
+        second.save()
+        self.assertRollupsMatchOrders()
+
+        third.customer = self.ann
+        third.save()
+        self.assertRollupsMatchOrders()
+
+        first.delete()
+        self.assertRollupsMatchOrders()
+
+        # A fresh instance without the remembered status still counts its change.
+        reloaded = Order.objects.only("id", "customer", "created_at").get(pk=third.pk)
+        reloaded.status = Order.COMPLETED
+        reloaded.save()
+        self.assertRollupsMatchOrders()
+
+    def test_bulk_transition_keeps_the_rollups(self):
+        orders = [
+            self._order(self.ann, Order.PENDING, ("10.00", 1)),
+            self._order(self.ann, Order.CANCELLED, ("20.00", 2)),
+            self._order(self.bob, Order.ACCEPTED, ("30.00", 3)),
+            self._order(self.bob, Order.DISPATCHED, ("40.00", 1)),
+        ]
+        ids = [order.id for order in orders]
+
+        results, changed, missing = bulk_transition(ids + [ids[0], 999999], Order.DISPATCHED, notify=False)
+
+        self.assertEqual(changed, ids[:3])
+        self.assertEqual(missing, [999999])
+        self.assertEqual([row["changed"] for row in results], [True, True, True, False])
+        self.assertEqual(OrderStatusEvent.objects.filter(order_id__in=ids, to_status=Order.DISPATCHED).count(), 3)
+        self.assertRollupsMatchOrders()
+
+        bulk_transition(ids[1:], Order.CANCELLED, notify=False)
+        orders[0].delete()
+        self.assertRollupsMatchOrders()
+
+    def test_deleting_a_customer_leaves_the_other_rollups_consistent(self):
+        self._order(self.ann, Order.COMPLETED)
+        self._order(self.bob, Order.PENDING)
+
+        self.ann.delete()
+
+        self.assertRollupsMatchOrders()
+
+class ActivityLogBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = ActivityLogBuffer(batch_size=3, flush_interval=60)
+        self.addCleanup(self.buffer.flush)
+
+    def test_writes_when_the_batch_fills(self):
+        self.buffer.add("one")
+        self.buffer.add("two")
+        self.assertEqual((ActivityLog.objects.count(), len(self.buffer)), (0, 2))
+
+        self.buffer.add("three")
+
+        self.assertEqual(list(ActivityLog.objects.order_by("id").values_list("message", flat=True)), ["one", "two", "three"])
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_failed_flush_keeps_the_entries(self):
+        self.buffer.add("one")
+        self.buffer.add("two")
+
+        with mock.patch.object(ActivityLog.objects, "bulk_create", side_effect=DatabaseError("locked")):
+            with self.assertLogs("api.utils.activity_log", "ERROR"):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(len(self.buffer), 2)
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+    @override_settings(ACTIVITY_LOG_MAX_PENDING=2)
+    def test_requeue_drops_the_oldest_beyond_the_cap(self):
+        buffer = ActivityLogBuffer(batch_size=10, flush_interval=60)
+        self.addCleanup(buffer.flush)
+        for message in ("one", "two", "three"):
+            buffer.add(message)
+
+        with mock.patch.object(ActivityLog.objects, "bulk_create", side_effect=DatabaseError("locked")):
+            with self.assertLogs("api.utils.activity_log", "ERROR"):
+                buffer.flush()
+
+        buffer.flush()
+        self.assertEqual(sorted(ActivityLog.objects.values_list("message", flat=True)), ["three", "two"])
+
+
+class ActivityLogApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email="admin@example.com", password="pw"))
+        self.addCleanup(activity_log_buffer.flush)
+
+    def test_cursor_pages_walk_newest_first(self):
+        now = timezone.now()
+        for n in range(5):
+            ActivityLog.objects.create(message=f"entry {n}", timestamp=now - timedelta(minutes=n))
+
+        seen, url = [], "/api/logs/?page_size=2"
+        while url:
+            page = self.client.get(url).json()
+            seen += [row["message"] for row in page["results"]]
+            url = page["next"]
+
+        self.assertEqual(seen, [f"entry {n}" for n in range(5)])
+
+    def test_post_is_written_on_flush(self):
+        res = self.client.post("/api/logs/", {"message": "Exported orders", "type": "success"}, format="json")
+
+        self.assertEqual(res.status_code, 202)
+        self.assertNotIn("id", res.json())
+        activity_log_buffer.flush()
+        self.assertTrue(ActivityLog.objects.filter(message="Exported orders", user__email="admin@example.com").exists())
+
+
+class ArchiveActivityLogsTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=100)
+        ActivityLog.objects.bulk_create([ActivityLog(message=f"old {n}", timestamp=old) for n in range(3)])
+        ActivityLog.objects.create(message="recent")
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive_dir = tmp.name
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command("archive_activity_logs", "--days=90", f"--archive-dir={self.archive_dir}", *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_old_entries_to_a_gzipped_file(self):
+        self.assertIn("Archived 3", self.archive("--batch-size=2"))
+
+        self.assertEqual(list(ActivityLog.objects.values_list("message", flat=True)), ["recent"])
+        [path] = Path(self.archive_dir).iterdir()
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh]
+        self.assertEqual([row["message"] for row in rows], ["old 0", "old 1", "old 2"])
+
+    def test_dry_run_keeps_everything(self):
+        self.assertIn("3 log entries", self.archive("--dry-run"))
+
+        self.assertEqual(ActivityLog.objects.count(), 4)
+        self.assertEqual(list(Path(self.archive_dir).iterdir()), [])
+
+
+class CollectOrphanedMediaTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, MEDIA_URL="/media/")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def file(self, path, hours_old=100, data=b"bytes"):
+        default_storage.save(path, ContentFile(data))
+        stamp = time.time() - hours_old * 3600
+        os.utime(default_storage.path(path), (stamp, stamp))
+        return path
+
+    def collect(self, *args):
+        call_command("collect_orphaned_media", "--grace-hours=72", *args, stdout=StringIO())
+
+    def test_deletes_old_unreferenced_files_only(self):
+        orphan = self.file("products/orphan.avif")
+        fresh = self.file("products/fresh.avif", hours_old=1)
+        backup = self.file("backups/db.sqlite3")
+
+        self.collect()
+
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(fresh))
+        self.assertTrue(default_storage.exists(backup))
+
+    def test_keeps_files_the_catalogue_references(self):
+        product = Product.objects.create(name="Ring", images=[f"/media/{self.file('products/ring.avif')}"])
+        ProductVariant.objects.create(product=product, name="Gold", images=[f"/media/{self.file('products/gold.avif')}"])
+        Banner.objects.create(title="Sale", image=self.file("banners/sale.avif"))
+        HomeCollageItem.objects.create(name="Wedding", item_type="occasion", image_url=f"http://shop.example/media/{self.file('collages/wedding.avif')}")
+
+        self.collect()
+
+        for path in ("products/ring.avif", "products/gold.avif", "banners/sale.avif", "collages/wedding.avif"):
+            self.assertTrue(default_storage.exists(path), path)
+
+    def test_keeps_an_old_image_handed_out_again_by_a_dedupe_hit(self):
+        png = self._png()
+        digest = hashlib.sha256(png).hexdigest()
+        raw = self.file(f"products/raw/{digest}.png", data=png)
+        avif = self.file(f"products/{digest}.avif")
+        ImageConversion.objects.create(
+            source=raw, result=avif, digest=digest, status=ImageConversion.DONE,
+            last_used_at=timezone.now() - timedelta(days=30),
+        )
+
+        # Re-uploading the same picture resolves to the stored AVIF; the product using it is not saved yet.
+        [url] = store_images(["data:image/png;base64," + base64.b64encode(png).decode()])
+        self.assertEqual(url, f"/media/{avif}")
+        self.collect()
+
+        self.assertTrue(default_storage.exists(raw))
+        self.assertTrue(default_storage.exists(avif))
+
+    def test_dry_run_deletes_nothing(self):
+        orphan = self.file("products/orphan.avif")
+
+        self.collect("--dry-run")
+
+        self.assertTrue(default_storage.exists(orphan))
+
+    @staticmethod
+    def _png():
+        buffer = BytesIO()
+        Image.new("RGB", (4, 4), "gold").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+class ServeMediaTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name, MEDIA_X_ACCEL_REDIRECT=None, MEDIA_X_SENDFILE=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.name = f"products/{'a' * 64}.avif"
+        default_storage.save(self.name, ContentFile(b"0123456789"))
+        self.url = f"/media/{self.name}"
+
+    def test_full_response_is_cacheable(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b"".join(res.streaming_content), b"0123456789")
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+
+    def test_single_range_gets_206(self):
+        res = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(res.streaming_content), b"2345")
+
+        res = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+        self.assertEqual((res["Content-Range"], b"".join(res.streaming_content)), ("bytes 7-9/10", b"789"))
+
+    def test_unsatisfiable_range_gets_416(self):
+        res = self.client.get(self.url, HTTP_RANGE="bytes=20-")
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res["Content-Range"], "bytes */10")
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        res = self.client.get(self.url, HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(MEDIA_X_ACCEL_REDIRECT="/protected-media/")
+    def test_x_accel_redirect_hands_the_file_to_nginx(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(res.content, b"")
+        self.assertIn("ETag", res)
+
+    def test_backups_are_not_served(self):
+        default_storage.save("backups/db.sqlite3", ContentFile(b"secret"))
+
+        self.assertEqual(self.client.get("/media/backups/db.sqlite3").status_code, 404)
+        self.assertEqual(self.client.get("/media/products/../backups/db.sqlite3").status_code, 404)
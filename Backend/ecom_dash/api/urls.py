@@ -32,8 +32,11 @@ router.register('customer-accounts', CustomerAccountViewSet, basename="customer-
 
 
 urlpatterns = [
+    # Must precede the router so "stream" is not taken for a notification pk
+    path('notifications/stream/', admin_event_stream, name='notification-stream'),
     path('', include(router.urls)),path('record-visitor/', record_visitor, name='record-visitor'),
     path('backup-db/', backup_database, name='backup-database'),
     path('backups/', list_backups, name='list-backups'),
+    path('backups/<str:filename>/', download_backup, name='download-backup'),
     path('restore-db/', restore_database, name='restore-database'),
 ]
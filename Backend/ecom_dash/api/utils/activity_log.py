@@ -0,0 +1,101 @@
+"""
+Buffered writer for ActivityLog rows.
+
+Entries are queued in memory and written with one bulk_create when the batch
+fills up or the flush interval passes, instead of one INSERT per log call.
+A crash can lose at most one flush interval of entries. A batch the database
+refuses is logged and put back for the next flush, up to
+ACTIVITY_LOG_MAX_PENDING entries (the oldest go first beyond that).
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from api.models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogBuffer:
+    def __init__(self, batch_size: int | None = None, flush_interval: float | None = None):
+        self.batch_size = batch_size or getattr(settings, "ACTIVITY_LOG_BATCH_SIZE", 100)
+        self.flush_interval = flush_interval or getattr(settings, "ACTIVITY_LOG_FLUSH_INTERVAL", 2.0)
+        self.max_pending = getattr(settings, "ACTIVITY_LOG_MAX_PENDING", 10000)
+        self._lock = threading.Lock()
+        self._pending: list[ActivityLog] = []
+        self._timer: threading.Timer | None = None
+
+    def add(self, message: str, type: str = "info", user=None) -> ActivityLog:
+        """Queue an entry and return the unsaved instance (timestamp already set)."""
+        entry = ActivityLog(
+            message=message,
+            type=type,
+            user=user if getattr(user, "is_authenticated", False) else None,
+            timestamp=timezone.now(),
+        )
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.batch_size
+            if not full:
+                self._arm_timer()
+        if full:
+            self.flush()
+        return entry
+
+    def _arm_timer(self):
+        """Schedule a flush unless one is already due (call with the lock held)."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> int:
+        """Write the queued entries; returns how many were written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+        try:
+            ActivityLog.objects.bulk_create(batch, batch_size=500)
+        except DatabaseError:
+            # The API already answered 202 for these; keep them for the next flush.
+            logger.exception("Could not write %d activity log entries; retrying on the next flush.", len(batch))
+            self._requeue(batch)
+            return 0
+        return len(batch)
+
+    def _requeue(self, batch: list[ActivityLog]):
+        with self._lock:
+            self._pending = batch + self._pending
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                self._pending = self._pending[overflow:]
+                logger.error("Activity log buffer full; dropped the %d oldest entries.", overflow)
+            self._arm_timer()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
+activity_log_buffer = ActivityLogBuffer()
+atexit.register(activity_log_buffer.flush)
+
+
+def log_activity(message: str, type: str = "info", user=None) -> ActivityLog:
+    return activity_log_buffer.add(message, type=type, user=user)
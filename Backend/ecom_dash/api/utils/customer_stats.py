@@ -0,0 +1,66 @@
+"""
+Maintenance helpers for the CustomerStats rollup table.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import Count, Max, Q, Sum
+
+from api.models import Customer, CustomerStats, Order
+
+STATS_FIELDS = ["order_count", "lifetime_spend", "last_order_at", "cancelled_count"]
+
+
+def refresh_customer_stats(customer_ids: Iterable[int]) -> int:
+    """
+    Recompute stats for the given customers with one grouped query over their
+    orders (served by the customer_id index) and upsert the rows.
+    Runs inside the caller's transaction so the rollup commits with the order.
+    """
+    ids = {cid for cid in customer_ids if cid}
+    if not ids:
+        return 0
+
+    rows = {
+        row["customer_id"]: row
+        for row in (
+            Order.objects.filter(customer_id__in=ids)
+            .values("customer_id")
+            .annotate(
+                order_count=Count("id"),
+                lifetime_spend=Sum("total_amount"),
+                last_order_at=Max("created_at"),
+                cancelled_count=Count("id", filter=Q(status=Order.CANCELLED)),
+            )
+        )
+    }
+    existing = set(Customer.objects.filter(id__in=ids).values_list("id", flat=True))
+    stats = []
+    for cid in existing:
+        row = rows.get(cid) or {}
+        stats.append(CustomerStats(
+            customer_id=cid,
+            order_count=row.get("order_count") or 0,
+            lifetime_spend=row.get("lifetime_spend") or Decimal("0"),
+            last_order_at=row.get("last_order_at"),
+            cancelled_count=row.get("cancelled_count") or 0,
+        ))
+    if stats:
+        CustomerStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=["customer"],
+            update_fields=STATS_FIELDS + ["updated_at"],
+        )
+    return len(stats)
+
+
+def rebuild_customer_stats(batch_size: int = 500) -> int:
+    """Recompute the rollup for every customer, batch by batch."""
+    total = 0
+    ids = list(Customer.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(ids), batch_size):
+        total += refresh_customer_stats(ids[start:start + batch_size])
+    return total
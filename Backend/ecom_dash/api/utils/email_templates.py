@@ -0,0 +1,84 @@
+"""
+Precompiled email templates.
+
+Email templates live in api/templates/emails/ and are compiled once per
+process (``warm_email_templates`` runs from ApiConfig.ready()), so a send only
+renders. Fragments shared by many emails, such as an order's item table, go
+through ``render_fragments``: they are cached under a digest of their context
+and template source, so identical content is rendered once however many
+status emails reuse it.
+
+Settings (optional)::
+
+    EMAIL_FRAGMENT_CACHE_SECONDS = 3600
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from typing import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+
+FRAGMENT_CACHE_PREFIX = "email:fragment"
+
+EMAIL_TEMPLATES = (
+    "emails/order_status_subject.txt",
+    "emails/order_status_intro.txt",
+    "emails/order_status.txt",
+    "emails/order_status.html",
+    "emails/_order_summary.txt",
+    "emails/_order_summary.html",
+)
+
+_compiled: dict[str, tuple] = {}  # name -> (template, source digest)
+_lock = threading.Lock()
+
+
+def _compile(name: str) -> tuple:
+    compiled = _compiled.get(name)
+    if compiled is None:
+        with _lock:
+            compiled = _compiled.get(name)
+            if compiled is None:
+                template = get_template(name)
+                source = getattr(template.template, "source", "") or ""
+                compiled = _compiled[name] = (template, hashlib.sha1(source.encode()).hexdigest()[:12])
+    return compiled
+
+
+def warm_email_templates() -> None:
+    """Parse every email template up front so the first send does not pay for it."""
+    for name in EMAIL_TEMPLATES:
+        _compile(name)
+
+
+def render_email(name: str, context: dict) -> str:
+    return _compile(name)[0].render(context)
+
+
+def render_line(name: str, context: dict) -> str:
+    """Render a one-line template (subjects, intros), collapsing the whitespace its tags leave behind."""
+    return " ".join(render_email(name, context).split())
+
+
+def _fragment_key(name: str, digest: str) -> str:
+    return f"{FRAGMENT_CACHE_PREFIX}:{name}:{_compile(name)[1]}:{digest}"
+
+
+def render_fragments(names: Sequence[str], context: dict) -> list[str]:
+    """
+    Render ``names`` with ``context`` (plain JSON-able values), reusing cached
+    output for the same context and template source. One cache round trip.
+    """
+    digest = hashlib.sha1(json.dumps(context, sort_keys=True, default=str).encode()).hexdigest()
+    keys = [_fragment_key(name, digest) for name in names]
+    cached = cache.get_many(keys)
+    missing = {key: render_email(name, context).strip() for name, key in zip(names, keys) if key not in cached}
+    if missing:
+        cache.set_many(missing, getattr(settings, "EMAIL_FRAGMENT_CACHE_SECONDS", 3600))
+        cached.update(missing)
+    return [cached[key] for key in keys]
@@ -0,0 +1,124 @@
+"""
+Idempotency-Key handling for endpoints that create orders.
+
+The first request with a given key runs normally and its response is stored;
+retries with the same key get that response back from one indexed lookup
+without re-running the handler (no pricing, writes or emails).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder as RendererJSONEncoder
+
+from api.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def _request_hash(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, cls=RendererJSONEncoder, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _replay(record: IdempotencyKey) -> Response:
+    response = Response(record.response_body, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _claim(scope: str, owner: str, key: str, request_hash: str):
+    """
+    Return (record, None) when this request should run, or (None, response)
+    when it is a replay, a conflicting reuse of the key or a duplicate in flight.
+    """
+    now = timezone.now()
+    record = IdempotencyKey.objects.filter(scope=scope, owner=owner, key=key).first()
+    if record is not None:
+        stale_lock = now - timedelta(seconds=getattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 60))
+        if record.expires_at <= now or (record.status_code is None and record.created_at <= stale_lock):
+            # Expired, or the first attempt died mid-request: start over with this one.
+            record.delete()
+        elif record.request_hash != request_hash:
+            return None, Response(
+                {"detail": f"{HEADER} was already used with a different request body."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        elif record.status_code is None:
+            return None, Response(
+                {"detail": "A request with this Idempotency-Key is still being processed."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        else:
+            return None, _replay(record)
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope,
+                owner=owner,
+                key=key,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + timedelta(hours=getattr(settings, "IDEMPOTENCY_KEY_TTL_HOURS", 24)),
+            )
+    except IntegrityError:
+        # Lost the race against a concurrent retry with the same key.
+        return None, Response(
+            {"detail": "A request with this Idempotency-Key is still being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return record, None
+
+
+def run_idempotent(request, scope: str, owner: str, handler: Callable[[], Response]) -> Response:
+    """
+    Run ``handler`` once per (scope, owner, Idempotency-Key). Without the header
+    the handler just runs. The handler runs in one transaction with the stored
+    response; responses below 500 are replayed, server errors and exceptions
+    release the key so the client can retry.
+    """
+    key = (request.headers.get(HEADER) or "").strip()
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    record, early = _claim(scope, owner, key, _request_hash(request))
+    if early is not None:
+        return early
+
+    try:
+        # The stored response commits with the handler's own writes: a crash in
+        # between can no longer leave an order behind a key that still looks
+        # unfinished (and would be run again once its lock goes stale).
+        with transaction.atomic():
+            response = handler()
+            if response.status_code >= 500:
+                record.delete()
+                return response
+            record.status_code = response.status_code
+            # Encode the way the renderer does so a replay is byte-for-byte the same payload.
+            record.response_body = json.loads(json.dumps(response.data, cls=RendererJSONEncoder))
+            record.save(update_fields=["status_code", "response_body"])
+    except Exception:
+        record.delete()
+        raise
+    return response
+
+
+def purge_expired_keys() -> int:
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
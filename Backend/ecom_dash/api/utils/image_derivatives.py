@@ -0,0 +1,339 @@
+"""
+Responsive image derivatives.
+
+Every stored image (product and variant images, banners, collage tiles) gets
+a width ladder encoded as AVIF and WebP, recorded on a ResponsiveImage row
+together with the original's metadata: dimensions, byte size, dominant
+colour and a tiny blurred WebP placeholder (LQIP) that clients can paint
+while the real image loads. Files go to
+derivatives/<digest of the source path>/<width>q<quality>.<format>; the
+paths are deterministic and existing files are never re-encoded, so each
+derivative is generated once; the metadata comes out of the same decode.
+
+Generation runs on the outbox worker, in the image process pool:
+product uploads are queued when their AVIF is ready (deriving from the raw
+original), banners and collage tiles when they are saved, and
+``manage.py build_image_derivatives`` backfills older images. ``srcsets``
+turns stored image URLs into the srcset data the serializers expose, and
+``image_metadata`` into the placeholder data. List serializers look up the
+records for a whole page at once with ``image_records`` and hand them to both
+through the serializer context (``IMAGE_RECORDS_CONTEXT``).
+
+Settings (optional)::
+
+    IMAGE_DERIVATIVE_WIDTHS = (160, 320, 640, 1280)
+    IMAGE_DERIVATIVE_QUALITY = {"avif": 60, "webp": 75}
+    IMAGE_SRCSET_CACHE_SECONDS = 86400
+    IMAGE_PLACEHOLDER_SIZE = 16
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+from io import BytesIO
+from typing import Iterable, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from api.models import ResponsiveImage
+from api.utils.image_utils import media_path, run_in_pool
+from api.utils.outbox import enqueue, handler
+
+IMAGE_DERIVATIVES = "image_derivatives"
+FORMATS = ("avif", "webp")
+RECORD_CACHE_PREFIX = "image:record"
+IMAGE_RECORDS_CONTEXT = "image_records"
+# Not generated yet: re-check soon rather than caching the miss for a day.
+SRCSET_MISS_SECONDS = 60
+
+
+def _widths() -> Sequence[int]:
+    return getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", (160, 320, 640, 1280))
+
+
+def derivative_path(source: str, width: int, fmt: str, quality: int) -> str:
+    """The quality is part of the name so a re-encode never changes the bytes behind a (cached-forever) URL."""
+    digest = hashlib.sha1(source.encode()).hexdigest()
+    return f"derivatives/{digest[:2]}/{digest}/{width}q{quality}.{fmt}"
+
+
+def ladder(width: int, height: int) -> list[tuple[int, int]]:
+    """(width, height) steps below the original, topped by the original width when under the largest step."""
+    widths = _widths()
+    steps = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+    return [(w, max(1, round(height * w / width))) for w in steps]
+
+
+def _dimensions(data: bytes) -> tuple[int, int]:
+    """Display size from the header alone, honouring EXIF rotation."""
+    img = Image.open(BytesIO(data))
+    width, height = img.size
+    if img.getexif().get(0x0112) in (5, 6, 7, 8):
+        width, height = height, width
+    return width, height
+
+
+def _dominant_color(img: Image.Image) -> str:
+    """Most common colour of a 5-colour median-cut palette; transparency is read as white."""
+    small = img.copy()
+    small.thumbnail((64, 64))
+    if small.mode == "RGBA":
+        small = Image.alpha_composite(Image.new("RGBA", small.size, "white"), small)
+    palette = small.convert("RGB").quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(palette.getcolors())
+    r, g, b = palette.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _placeholder(img: Image.Image, size: int) -> str:
+    """A ``size``-pixel (longest side) WebP as a data URI; browsers upscale it into a blur."""
+    thumb = img.copy()
+    thumb.thumbnail((size, size), Image.BILINEAR)
+    buffer = BytesIO()
+    thumb.save(buffer, format="WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def _encode_ladder(data: bytes, todo: list[tuple[int, int, str]], quality: dict, placeholder_size: int) -> tuple:
+    """
+    Pure CPU work for the pool: one encoded file per (width, height, format)
+    in ``todo``, plus {"dominant_color", "placeholder"} from the same decode.
+    """
+    img = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    resized: dict[tuple[int, int], Image.Image] = {}
+    out = []
+    for width, height, fmt in todo:
+        frame = resized.get((width, height))
+        if frame is None:
+            frame = resized[(width, height)] = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        buffer = BytesIO()
+        frame.save(buffer, format=fmt.upper(), quality=quality.get(fmt, 70))
+        out.append(buffer.getvalue())
+    # The smallest rendition is already decoded and resized; summarise that instead of the full image.
+    base = resized[min(resized)] if resized else img
+    meta = {"dominant_color": _dominant_color(base), "placeholder": _placeholder(base, placeholder_size)}
+    return out, meta
+
+
+def queue_derivatives(sources: Iterable) -> int:
+    """
+    Queue derivative builds for storage paths (or (path, origin) pairs, where
+    ``origin`` is a better-quality file to derive from). Paths that already
+    have a ResponsiveImage row are skipped. Returns how many were queued.
+    """
+    pairs = {}
+    for entry in sources:
+        source, origin = entry if isinstance(entry, tuple) else (entry, "")
+        if source:
+            pairs[source] = origin or ""
+    if not pairs:
+        return 0
+    known = set(ResponsiveImage.objects.filter(source__in=list(pairs)).values_list("source", flat=True))
+    rows = [ResponsiveImage(source=s, origin=o) for s, o in pairs.items() if s not in known]
+    if not rows:
+        return 0
+    ResponsiveImage.objects.bulk_create(rows, ignore_conflicts=True)
+    enqueue(IMAGE_DERIVATIVES, ({"source": row.source} for row in rows))
+    return len(rows)
+
+
+def _read(row: ResponsiveImage) -> bytes:
+    for path in (row.origin, row.source):
+        if path and default_storage.exists(path):
+            with default_storage.open(path, "rb") as fh:
+                return fh.read()
+    raise FileNotFoundError(row.source)
+
+
+def build_derivatives(sources: Iterable[str], *, force: bool = False) -> dict[str, ResponsiveImage]:
+    """
+    Build the ladders and metadata for ``sources`` now (creating rows as
+    needed), encoding every missing file of the batch in one process pool.
+    Rows already done are left alone unless ``force`` (or they predate the
+    metadata). Failures are recorded on the rows.
+    """
+    sources = list(dict.fromkeys(s for s in sources if s))
+    rows = ResponsiveImage.objects.in_bulk(sources, field_name="source")
+    missing = [ResponsiveImage(source=s) for s in sources if s not in rows]
+    if missing:
+        ResponsiveImage.objects.bulk_create(missing, ignore_conflicts=True)
+        rows = ResponsiveImage.objects.in_bulk(sources, field_name="source")
+
+    quality = {"avif": 60, "webp": 75, **(getattr(settings, "IMAGE_DERIVATIVE_QUALITY", None) or {})}
+    placeholder_size = getattr(settings, "IMAGE_PLACEHOLDER_SIZE", 16)
+    work, calls = [], []
+    for row in rows.values():
+        if row.status == ResponsiveImage.DONE and row.placeholder and not force:
+            continue
+        try:
+            data = _read(row)
+            row.width, row.height = _dimensions(data)
+        except Exception as exc:
+            row.status, row.error = ResponsiveImage.FAILED, f"{type(exc).__name__}: {exc}"[:2000]
+            continue
+        steps = ladder(row.width, row.height)
+        todo = [
+            (w, h, fmt) for w, h in steps for fmt in FORMATS
+            if force or not default_storage.exists(derivative_path(row.source, w, fmt, quality[fmt]))
+        ]
+        row.renditions = [
+            {"width": w, "height": h, **{fmt: derivative_path(row.source, w, fmt, quality[fmt]) for fmt in FORMATS}}
+            for w, h in steps
+        ]
+        try:
+            row.bytes = default_storage.size(row.source)
+        except Exception:
+            row.bytes = None
+        work.append((row, todo))
+        calls.append((data, todo, quality, placeholder_size))
+
+    for (row, todo), result in zip(work, run_in_pool(_encode_ladder, calls)):
+        if isinstance(result, Exception):
+            row.status, row.error, row.renditions = ResponsiveImage.FAILED, f"{type(result).__name__}: {result}"[:2000], []
+            continue
+        encoded, meta = result
+        row.dominant_color, row.placeholder = meta["dominant_color"], meta["placeholder"]
+        for (w, _, fmt), blob in zip(todo, encoded):
+            path = derivative_path(row.source, w, fmt, quality[fmt])
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            default_storage.save(path, ContentFile(blob))
+        row.status, row.error = ResponsiveImage.DONE, ""
+
+    if rows:
+        ResponsiveImage.objects.bulk_update(
+            list(rows.values()),
+            ["width", "height", "renditions", "bytes", "dominant_color", "placeholder", "status", "error", "updated_at"],
+        )
+        forget_records(rows)
+    return rows
+
+
+# Each source is a full ladder of encodes; a few per claim keep a batch well inside the outbox lease.
+@handler(IMAGE_DERIVATIVES, batch_size=4)
+def _build_queued(messages) -> dict:
+    """Failures are recorded on the ResponsiveImage rows; a retry would fail the same way."""
+    build_derivatives({m.payload.get("source") for m in messages})
+    return {m.id: None for m in messages}
+
+
+def _cache_key(source: str) -> str:
+    return f"{RECORD_CACHE_PREFIX}:{hashlib.sha1(source.encode()).hexdigest()}"
+
+
+def forget_records(sources: Iterable[str]) -> None:
+    """Drop cached srcset/metadata for ``sources`` after their rows changed or went away."""
+    keys = [_cache_key(source) for source in sources]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _records(sources: set[str]) -> dict[str, dict]:
+    """
+    {"width", "height", "renditions", "bytes", "color", "placeholder"} per
+    source ({} when not built), cache first, then one query.
+    """
+    keys = {source: _cache_key(source) for source in sources}
+    cached = cache.get_many(list(keys.values()))
+    found = {source: cached[key] for source, key in keys.items() if key in cached}
+    todo = [source for source in sources if source not in found]
+    if todo:
+        rows = ResponsiveImage.objects.filter(source__in=todo, status=ResponsiveImage.DONE).only(
+            "source", "width", "height", "renditions", "bytes", "dominant_color", "placeholder"
+        )
+        built = {
+            row.source: {
+                "width": row.width,
+                "height": row.height,
+                "renditions": row.renditions,
+                "bytes": row.bytes,
+                "color": row.dominant_color,
+                "placeholder": row.placeholder,
+            }
+            for row in rows
+        }
+        timeout = getattr(settings, "IMAGE_SRCSET_CACHE_SECONDS", 86400)
+        cache.set_many({keys[s]: built[s] for s in built}, timeout)
+        cache.set_many({keys[s]: {} for s in todo if s not in built}, SRCSET_MISS_SECONDS)
+        found.update(built)
+    return found
+
+
+def image_records(urls: Iterable[str], known: dict | None = None) -> dict[str, dict]:
+    """
+    Records for every image among ``urls`` not already in ``known``, in one
+    batch ({} for images without derivatives). Pass the result to
+    ``srcsets``/``image_metadata`` as ``records``.
+    """
+    known = known or {}
+    paths = {p for p in map(media_path, urls) if p and p not in known}
+    found = _records(paths) if paths else {}
+    return {path: found.get(path, {}) for path in paths}
+
+
+def _lookup(paths: list, records: dict | None) -> dict[str, dict]:
+    """``records`` topped up with whatever ``paths`` it lacks (all of them when None)."""
+    wanted = {p for p in paths if p}
+    if records is None:
+        return _records(wanted)
+    missing = wanted - records.keys()
+    return {**records, **_records(missing)} if missing else records
+
+
+def srcsets(urls: Iterable[str], request=None, records: dict | None = None) -> list[dict | None]:
+    """
+    Srcset data per image URL, or None when it has no derivatives (yet):
+    {"width": 1200, "height": 900, "avif": "<url> 160w, ...", "webp": "<url> 160w, ..."}.
+    URLs are absolute when ``request`` is given; ``records`` comes from ``image_records``.
+    """
+    urls = list(urls or [])
+    paths = [media_path(url) for url in urls]
+    records = _lookup(paths, records)
+
+    def absolute(path):
+        url = default_storage.url(path)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    out = []
+    for path in paths:
+        record = records.get(path) if path else None
+        if not record or not record.get("renditions"):
+            out.append(None)
+            continue
+        entry = {"width": record["width"], "height": record["height"]}
+        for fmt in FORMATS:
+            entry[fmt] = ", ".join(f"{absolute(r[fmt])} {r['width']}w" for r in record["renditions"])
+        out.append(entry)
+    return out
+
+
+def srcset(url: str | None, request=None, records: dict | None = None) -> dict | None:
+    return srcsets([url], request, records)[0] if url else None
+
+
+def image_metadata(urls: Iterable[str], records: dict | None = None) -> list[dict | None]:
+    """
+    What a client needs to lay out and paint each image before it loads, or
+    None when not computed yet:
+    {"width": 1200, "height": 900, "bytes": 48211, "color": "#d8c3a5", "placeholder": "data:image/webp;base64,..."}.
+    """
+    paths = [media_path(url) for url in urls or []]
+    records = _lookup(paths, records)
+    out = []
+    for path in paths:
+        record = records.get(path) if path else None
+        if not record or not record.get("placeholder"):
+            out.append(None)
+            continue
+        out.append({key: record[key] for key in ("width", "height", "bytes", "color", "placeholder")})
+    return out
+
+
+def image_meta(url: str | None, records: dict | None = None) -> dict | None:
+    return image_metadata([url], records)[0] if url else None
@@ -1,14 +1,47 @@
 """
 Utilities for normalizing incoming product images and converting JPG/PNG inputs
 to AVIF files saved under MEDIA_ROOT.
+
+Encoding AVIF takes seconds of CPU per image, so requests never do it:
+``store_images`` saves the decoded upload as-is, returns its URL straight
+away and queues an ImageConversion through the outbox. The run_outbox_worker
+command encodes queued images in a process pool, stores the AVIF and swaps
+its URL into every product/variant still pointing at the raw file. Raw
+uploads are kept as the full-quality originals.
+
+Files are content-addressed: raw uploads and their AVIFs are named after the
+SHA-256 of the decoded bytes, and ImageConversion rows index those digests.
+Re-sending an image (every product update echoes them) or using the same
+picture on another product is a lookup that returns the existing URL; nothing
+is written or encoded again.
+
+Uploads can also arrive as multipart files (``upload_images``): the
+``HashingUploadHandler`` streams each file to a temporary file in chunks,
+hashing it on the way, so request memory stays bounded however many images
+are sent. Each stored image gets an id (its ImageConversion row) that product
+payloads may reference in ``images`` instead of a data URI.
+
+Settings (optional)::
+
+    IMAGE_AVIF_QUALITY = 70
+    IMAGE_WORKERS = os.cpu_count()
+    IMAGE_UPLOAD_MAX_BYTES = 15 * 1024 * 1024
 """
 import base64
-import uuid
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from typing import Iterable, List
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import urlparse
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.base import ContentFile, File
 from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 # Register AVIF support if available; fails gracefully when the plugin is missing.
 try:
@@ -17,6 +50,14 @@ except Exception:
     pass
 from PIL import Image  # noqa: E402  (import after plugin registration)
 
+from api.models import ImageConversion, Product, ProductVariant  # noqa: E402
+from api.utils.outbox import enqueue, handler  # noqa: E402
+from rest_framework.exceptions import ValidationError  # noqa: E402
+
+IMAGE_CONVERT_AVIF = "image_convert_avif"
+RAW_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png"}
+PIL_MIME = {"JPEG": "image/jpeg", "PNG": "image/png"}
+
 
 def _is_data_uri(value: str) -> bool:
     return isinstance(value, str) and value.startswith("data:image/")
@@ -37,40 +78,337 @@ def _decode_data_uri(data_uri: str) -> bytes:
         return b""
 
 
-def _save_avif(image_bytes: bytes, folder: str = "products", quality: int = 70) -> str:
+def _encode_avif(image_bytes: bytes, quality: int = 70) -> bytes:
+    """Pure CPU work, run in pool processes: bytes in, AVIF bytes out."""
     img = Image.open(BytesIO(image_bytes)).convert("RGB")
     buffer = BytesIO()
     img.save(buffer, format="AVIF", quality=quality)
-    filename = f"{folder}/{uuid.uuid4().hex}.avif"
-    path = default_storage.save(filename, ContentFile(buffer.getvalue()))
-    return default_storage.url(path)
+    return buffer.getvalue()
+
 
+def _looks_like_image(image_bytes: bytes) -> bool:
+    """Header-only check (no decode) so unreadable uploads are kept as sent, as before."""
+    try:
+        Image.open(BytesIO(image_bytes))
+        return True
+    except Exception:
+        return False
 
-def convert_list_to_avif(values: Iterable[str]) -> List[str]:
+
+def _save_once(path: str, data) -> str:
+    """Write a content-addressed file (bytes or a File) unless it is already there (same name, same bytes)."""
+    if default_storage.exists(path):
+        return path
+    saved = default_storage.save(path, data if isinstance(data, File) else ContentFile(data))
+    if saved != path:
+        # Lost a race with an identical upload; keep the canonical name only.
+        default_storage.delete(saved)
+    return path
+
+
+class _Digest(str):
+    """Placeholder in ``store_images`` output for an upload resolved after the index lookup."""
+
+
+def store_images(values: Iterable[str], folder: str = "products") -> List[str]:
     """
-    Convert a list of image strings to AVIF URLs when they are data URIs for JPG/PNG.
-    Existing URLs or non-supported formats are returned unchanged.
+    Store JPG/PNG data URIs as uploaded and queue their AVIF conversion;
+    returns the list with those entries replaced by the stored image's URL
+    (the AVIF once converted, the raw file until then). Images already in
+    the store, by content, are looked up rather than saved again.
+    Existing URLs or non-supported formats are returned unchanged; image ids
+    from ``upload_images`` are turned into URLs by ``resolve_image_ids`` when
+    the request is validated.
     """
-    output: List[str] = []
+    output: List[object] = []
+    uploads = {}  # digest -> (bytes, mime)
     for val in values or []:
         if not _is_data_uri(val):
             output.append(val)
             continue
 
         mime = _extract_mime(val)
-        if mime not in ("image/jpeg", "image/png"):
+        if mime not in RAW_EXTENSIONS:
             output.append(val)
             continue
 
         decoded = _decode_data_uri(val)
-        if not decoded:
+        if not decoded or not _looks_like_image(decoded):
             output.append(val)
             continue
 
+        digest = hashlib.sha256(decoded).hexdigest()
+        uploads.setdefault(digest, (decoded, mime))
+        output.append(_Digest(digest))
+    if not uploads:
+        return _finished_urls(output)
+
+    urls = {digest: stored_url(job) for digest, job in _index(uploads, folder).items()}
+    return _finished_urls([urls[v] if isinstance(v, _Digest) else v for v in output])
+
+
+def _index(uploads: dict, folder: str) -> dict:
+    """
+    {digest: (bytes or File, mime)} -> {digest: ImageConversion}. Digests
+    already in the store are looked up; the rest are saved and queued.
+    """
+    known = {job.digest: job for job in ImageConversion.objects.filter(digest__in=list(uploads))}
+    _mark_used(known.values())
+    new = [
+        ImageConversion(source=_save_once(f"{folder}/raw/{digest}.{RAW_EXTENSIONS[mime]}", data), digest=digest)
+        for digest, (data, mime) in uploads.items()
+        if digest not in known
+    ]
+    if new:
+        ImageConversion.objects.bulk_create(new, ignore_conflicts=True)
+        created = list(ImageConversion.objects.filter(digest__in=[job.digest for job in new]))
+        known.update((job.digest, job) for job in created)
+        enqueue(IMAGE_CONVERT_AVIF, ({"conversion_id": job.pk} for job in created))
+    return known
+
+
+def _mark_used(jobs) -> None:
+    """
+    Record that these existing images were just handed out again: their files
+    may be unreferenced and old, and a product about to use them is not saved
+    yet, so orphan collection must leave them alone for its grace period.
+    """
+    ids = [job.pk for job in jobs]
+    if ids:
+        ImageConversion.objects.filter(pk__in=ids).update(last_used_at=timezone.now())
+
+
+def stored_url(job: ImageConversion) -> str:
+    """URL an image from the store is referenced by: the AVIF once converted, the raw upload until then."""
+    return default_storage.url(job.result if job.status == ImageConversion.DONE else job.source)
+
+
+def _image_id(value) -> Optional[int]:
+    """Upload ids arrive as ints, or as digit strings once a CharField list has coerced them."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def resolve_image_ids(values: List[object]) -> List[object]:
+    """
+    Replace integer (or digit string) entries, image ids from ``upload_images``,
+    with that image's URL. Unknown ids raise ValidationError, so serializers
+    call this from ``validate_images`` before anything is written.
+    """
+    values = list(values or [])
+    ids = {_image_id(v) for v in values} - {None}
+    if not ids:
+        return list(values)
+    jobs = ImageConversion.objects.in_bulk(ids)
+    unknown = sorted(ids - set(jobs))
+    if unknown:
+        raise ValidationError(f"Unknown image id(s): {', '.join(map(str, unknown))}.")
+    _mark_used(jobs.values())
+    return [v if _image_id(v) is None else stored_url(jobs[_image_id(v)]) for v in values]
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file to a temporary file (never to memory) while
+    computing its SHA-256, and skips files over IMAGE_UPLOAD_MAX_BYTES as
+    soon as they cross the limit. Skipped file names end up in ``rejected``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = getattr(settings, "IMAGE_UPLOAD_MAX_BYTES", 15 * 1024 * 1024)
+        self.rejected: List[str] = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > self.max_bytes:
+            self.rejected.append(self.file_name)
+            raise SkipFile()
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.sha256.hexdigest()
+        return upload
+
+
+def upload_images(files: Iterable, folder: str = "products") -> tuple:
+    """
+    Store uploaded files (from ``HashingUploadHandler``) in the image store.
+    Returns ([(file name, ImageConversion)], [(file name, error)]). Only JPG
+    and PNG are accepted, checked from the file header.
+    """
+    uploads, names, errors = {}, [], []
+    for upload in files:
         try:
-            avif_url = _save_avif(decoded)
-            output.append(avif_url)
+            with Image.open(upload) as img:
+                mime = PIL_MIME.get(img.format)
         except Exception:
-            # In case conversion fails, keep the original to avoid data loss.
-            output.append(val)
-    return output
+            mime = None
+        if mime is None:
+            errors.append((upload.name, "Only JPG and PNG images are accepted."))
+            continue
+        upload.seek(0)
+        digest = getattr(upload, "sha256", None) or _hash_file(upload)
+        uploads.setdefault(digest, (upload, mime))
+        names.append((upload.name, digest))
+    jobs = _index(uploads, folder) if uploads else {}
+    return [(name, jobs[digest]) for name, digest in names], errors
+
+
+def _hash_file(upload) -> str:
+    sha = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha.update(chunk)
+    upload.seek(0)
+    return sha.hexdigest()
+
+
+def _finished_urls(values: List[str]) -> List[str]:
+    """A client may echo a raw URL it saw before the swap; point it at the finished AVIF instead."""
+    raw = {_storage_path(_url_path(v)): v for v in values if isinstance(v, str) and "/raw/" in _url_path(v)}
+    if not raw:
+        return values
+    done = dict(
+        ImageConversion.objects.filter(source__in=list(raw), status=ImageConversion.DONE).values_list("source", "result")
+    )
+    urls = {raw[source]: default_storage.url(result) for source, result in done.items()}
+    return [urls.get(v, v) if isinstance(v, str) else v for v in values]
+
+
+def _url_path(value: str) -> str:
+    return urlparse(value).path if isinstance(value, str) else value
+
+
+def image_statuses(images: Iterable[str]) -> List[str]:
+    """
+    Conversion state per image for API responses: "processing" while the AVIF
+    is queued, "failed" when encoding gave up (the original stays), otherwise
+    "ready". Only raw uploads cost a query.
+    """
+    images = list(images or [])
+    raw = {}
+    for url in images:
+        path = _url_path(url)
+        if isinstance(path, str) and "/raw/" in path:
+            raw[path] = None
+    if raw:
+        jobs = ImageConversion.objects.filter(source__in=[_storage_path(p) for p in raw]).only("source", "status")
+        states = {default_storage.url(job.source): job.status for job in jobs}
+        raw = {path: states.get(path) for path in raw}
+    labels = {ImageConversion.PENDING: "processing", ImageConversion.FAILED: "failed"}
+    return [labels.get(raw.get(_url_path(url)), "ready") for url in images]
+
+
+def _storage_path(url_path: str) -> str:
+    media_url = settings.MEDIA_URL if settings.MEDIA_URL.startswith("/") else f"/{settings.MEDIA_URL}"
+    return url_path[len(media_url):] if url_path.startswith(media_url) else url_path.lstrip("/")
+
+
+def media_path(url: str) -> Optional[str]:
+    """Storage path behind a MEDIA_URL (relative or absolute) URL; None for data URIs and external links."""
+    if not isinstance(url, str) or not url or url.startswith("data:"):
+        return None
+    path = _url_path(url)
+    media_url = settings.MEDIA_URL if settings.MEDIA_URL.startswith("/") else f"/{settings.MEDIA_URL}"
+    return path[len(media_url):] if path.startswith(media_url) else None
+
+
+def run_in_pool(func: Callable, calls: List[tuple]) -> List[object]:
+    """
+    ``func(*args)`` for every args tuple, returning each result or the
+    exception it raised. More than one call fans out to a process pool
+    (IMAGE_WORKERS); ``func`` must be a picklable module-level function.
+    """
+    workers = min(getattr(settings, "IMAGE_WORKERS", None) or os.cpu_count() or 1, len(calls))
+    if workers <= 1:
+        results = []
+        for args in calls:
+            try:
+                results.append(func(*args))
+            except Exception as exc:
+                results.append(exc)
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *args) for args in calls]
+        return [future.exception() or future.result() for future in futures]
+
+
+def swap_image_urls(mapping: dict) -> int:
+    """Replace image URLs (matched by path) on every product and variant that has them. Returns rows changed."""
+    if not mapping:
+        return 0
+    match = Q()
+    for old in mapping:
+        match |= Q(images__icontains=os.path.basename(old))
+    changed = 0
+    now = timezone.now()
+    for model in (Product, ProductVariant):
+        # Rows stay locked from read to write so a concurrent product edit is
+        # neither overwritten with the list read here nor lost under it.
+        with transaction.atomic():
+            rows = []
+            for row in model.objects.select_for_update().filter(match).only("id", "images"):
+                images = [mapping.get(_url_path(img), img) for img in row.images or []]
+                if images != row.images:
+                    row.images, row.updated_at = images, now
+                    rows.append(row)
+            if rows:
+                model.objects.bulk_update(rows, ["images", "updated_at"])
+                changed += len(rows)
+    return changed
+
+
+# AVIF encodes are slow; a small claim keeps the batch well inside the outbox lease.
+@handler(IMAGE_CONVERT_AVIF, batch_size=8)
+def _convert_images(messages) -> dict:
+    """Encode every queued image of the batch together, then swap all finished URLs in one pass."""
+    jobs = ImageConversion.objects.in_bulk({m.payload.get("conversion_id") for m in messages})
+    results = {}
+    todo, sources, seen = [], [], set()
+    for msg in messages:
+        job = jobs.get(msg.payload.get("conversion_id"))
+        if job is None or job.status != ImageConversion.PENDING or job.pk in seen:
+            results[msg.id] = None
+            continue
+        seen.add(job.pk)
+        try:
+            with default_storage.open(job.source, "rb") as fh:
+                sources.append(fh.read())
+        except Exception as exc:
+            results[msg.id] = f"{type(exc).__name__}: {exc}"  # Storage hiccup: let the outbox retry.
+            continue
+        todo.append((msg, job))
+
+    quality = getattr(settings, "IMAGE_AVIF_QUALITY", 70)
+    encoded_all = run_in_pool(_encode_avif, [(data, quality) for data in sources])
+    swaps, derive = {}, []
+    for (msg, job), encoded in zip(todo, encoded_all):
+        if isinstance(encoded, Exception):
+            # Not an image Pillow can read; retrying will not help, so keep the original.
+            job.status, job.error = ImageConversion.FAILED, f"{type(encoded).__name__}: {encoded}"[:2000]
+        else:
+            folder, name = job.source.split("/raw/", 1)
+            job.result = _save_once(f"{folder}/{os.path.splitext(name)[0]}.avif", encoded)
+            job.status, job.error = ImageConversion.DONE, ""
+            swaps[default_storage.url(job.source)] = default_storage.url(job.result)
+            derive.append((job.result, job.source))
+        job.save(update_fields=["result", "status", "error", "updated_at"])
+        results[msg.id] = None
+    swap_image_urls(swaps)
+    # Responsive sizes come from the full-quality original rather than the AVIF.
+    from api.utils.image_derivatives import queue_derivatives
+
+    queue_derivatives(derive)
+    return results
@@ -0,0 +1,80 @@
+"""
+Stock reservation for checkout and other order-creating paths.
+"""
+from __future__ import annotations
+
+from functools import reduce
+from operator import or_
+from typing import Mapping
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from api.models import Product, ProductVariant
+
+
+class InsufficientStock(Exception):
+    """Raised when one or more lines cannot be covered; ``shortages`` lists them."""
+
+    def __init__(self, shortages: list[dict]):
+        super().__init__("Insufficient stock")
+        self.shortages = shortages
+
+
+def _decrement(model, quantities: Mapping[int, int], *, flip_status: bool) -> int:
+    """
+    Take ``quantities`` ({pk: qty}) off ``model.stock`` in a single UPDATE whose
+    WHERE clause only matches rows that still hold enough stock. The database
+    re-checks that condition on the locked row, so concurrent callers cannot
+    both succeed on the last unit. Returns the number of rows updated.
+    """
+    if not quantities:
+        return 0
+    updates = {
+        "stock": Case(
+            *[When(pk=pk, then=F("stock") - qty) for pk, qty in quantities.items()],
+            default=F("stock"),
+            output_field=IntegerField(),
+        ),
+    }
+    if flip_status:
+        # Mirror Product.save(): a product sold down to zero is out of stock.
+        updates["status"] = Case(
+            *[When(pk=pk, status="in_stock", stock__lte=qty, then=Value("out_of_stock")) for pk, qty in quantities.items()],
+            default=F("status"),
+        )
+    enough = reduce(or_, [Q(pk=pk, stock__gte=qty) for pk, qty in quantities.items()])
+    return model.objects.filter(enough).update(**updates)
+
+
+def _shortages(model, quantities: Mapping[int, int], key: str) -> list[dict]:
+    available = dict(model.objects.filter(pk__in=quantities).values_list("pk", "stock"))
+    return [
+        {key: pk, "requested": qty, "available": available.get(pk, 0)}
+        for pk, qty in quantities.items()
+        if available.get(pk, 0) < qty
+    ]
+
+
+def reserve_stock(product_quantities: Mapping[int, int], variant_quantities: Mapping[int, int] | None = None) -> None:
+    """
+    Decrement product and variant stock for an order, all or nothing. Must run
+    inside ``transaction.atomic()``; on a shortage it raises InsufficientStock
+    and the caller's transaction rolls back any partial decrement.
+    """
+    variant_quantities = variant_quantities or {}
+    for model, quantities, key in (
+        (Product, product_quantities, "product_id"),
+        (ProductVariant, variant_quantities, "variant_id"),
+    ):
+        try:
+            # Savepoint so a partial match is undone before the shortage report reads stock.
+            with transaction.atomic():
+                if _decrement(model, quantities, flip_status=model is Product) != len(quantities):
+                    raise _PartialDecrement
+        except _PartialDecrement:
+            raise InsufficientStock(_shortages(model, quantities, key)) from None
+
+
+class _PartialDecrement(Exception):
+    pass
@@ -0,0 +1,403 @@
+"""
+Vector PDF invoices.
+
+Pages are drawn with PDF text and line operators in the standard Helvetica
+fonts, so an invoice is a few KB, stays sharp at any zoom and needs no PDF
+library. ``invoice_data`` snapshots everything an invoice prints; its digest
+is the cache key, so an invoice is rendered once per order version and
+status changes (which are not printed) never trigger a re-render.
+
+``render_invoices`` renders many orders at once, fanning cache misses out to
+a process pool (month-end exports), and ``invoices_zip`` packs the results.
+Measure with ``manage.py invoice_benchmark``.
+
+Settings (all optional)::
+
+    INVOICE_SELLER = {"name": ..., "tagline": ..., "address": ..., "gst": ..., "email": ..., "phone": ...}
+    INVOICE_CACHE_SECONDS = 86400
+    INVOICE_WORKERS = os.cpu_count()
+    INVOICE_POOL_THRESHOLD = 16          # fewer misses than this render in-process
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import zlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.utils.pricing import money
+
+# Bump when the layout changes so cached PDFs are re-rendered.
+LAYOUT_VERSION = 1
+INVOICE_CACHE_PREFIX = "invoice:pdf"
+
+DEFAULT_SELLER = {
+    "name": "Aura Jewels",
+    "tagline": "Design & Branding",
+    "address": "3, Aishbagh, Lucknow, Uttar Pradesh",
+    "gst": "09EDGPS0111B1Z1",
+    "email": "info@aurajewels.com",
+    "phone": "+91 98765 43210",
+}
+
+# A4 in points.
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89
+MARGIN = 48
+FOOTER_Y = 36
+
+# Advance widths (1/1000 em) of the printable ASCII range from the Adobe AFM
+# files for the base-14 fonts; anything else is measured as an average glyph.
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    widths = _HELVETICA_BOLD if bold else _HELVETICA
+    total = 0
+    for ch in text:
+        code = ord(ch) - 32
+        total += widths[code] if 0 <= code < len(widths) else 556
+    return total * size / 1000
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", "replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _num(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+class Page:
+    """Content stream of one page: text in F1 (Helvetica) / F2 (Helvetica-Bold), lines and filled boxes."""
+
+    def __init__(self):
+        self.ops: list[bytes] = []
+
+    def text(self, x, y, text, *, size=10, bold=False, align="left", gray=0.0):
+        if not text:
+            return
+        if align == "right":
+            x -= text_width(text, size, bold)
+        elif align == "center":
+            x -= text_width(text, size, bold) / 2
+        font = "F2" if bold else "F1"
+        self.ops.append(
+            f"BT {_num(gray)} g /{font} {_num(size)} Tf {_num(x)} {_num(y)} Td ".encode() + _pdf_string(text) + b" Tj ET"
+        )
+
+    def line(self, x1, y1, x2, y2, *, width=0.5, gray=0.8):
+        self.ops.append(f"{_num(gray)} G {_num(width)} w {_num(x1)} {_num(y1)} m {_num(x2)} {_num(y2)} l S".encode())
+
+    def box(self, x, y, w, h, *, gray=0.94):
+        self.ops.append(f"{_num(gray)} g {_num(x)} {_num(y)} {_num(w)} {_num(h)} re f".encode())
+
+    def content(self) -> bytes:
+        return b"\n".join(self.ops)
+
+
+def write_pdf(pages: Sequence[Page], *, title: str = "") -> bytes:
+    """Serialise pages into a PDF 1.4 file with Flate-compressed content streams."""
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Producer (ecom_dash) /Title " + _pdf_string(title) + b" >>",
+    ]
+    kids = []
+    for page in pages:
+        stream = zlib.compress(page.content(), 6)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_num(PAGE_WIDTH)} {_num(PAGE_HEIGHT)}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_ref} 0 R >>"
+            ).encode()
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def _fmt_money(value) -> str:
+    return f"Rs. {money(value):,.2f}"
+
+
+def _fit(text: str, width: float, size: float, bold: bool = False) -> str:
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + "...", size, bold) > width:
+        text = text[:-1]
+    return text.rstrip() + "..."
+
+
+def _wrap(text: str, width: float, size: float, max_lines: int = 2) -> list[str]:
+    """Greedy word wrap; whatever does not fit in ``max_lines`` is elided."""
+    lines, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and text_width(candidate, size) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current or not lines:
+        lines.append(current)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = _fit(lines[-1] + " ...", width, size)
+    return [_fit(line, width, size) for line in lines]
+
+
+def invoice_data(order) -> dict:
+    """
+    Everything the invoice prints, as plain JSON types (picklable for the
+    process pool, hashable for the cache). Pass orders with ``customer`` and
+    ``items`` preloaded when building many.
+    """
+    customer = order.customer
+    address = [order.address_line1, order.address_line2]
+    address.append(" ".join(part for part in (order.city and f"{order.city},", order.state, order.pincode) if part))
+    items = []
+    for item in order.items.all():
+        quantity = int(item.quantity or 0)
+        items.append({
+            "name": item.name or "Item",
+            "sku": item.sku or "",
+            "price": str(money(item.price)),
+            "quantity": quantity,
+            "amount": str(money(money(item.price) * quantity)),
+        })
+    return {
+        "layout": LAYOUT_VERSION,
+        "seller": {**DEFAULT_SELLER, **(getattr(settings, "INVOICE_SELLER", None) or {})},
+        "number": f"{order.id:05d}",
+        "order_id": order.id,
+        "date": timezone.localtime(order.created_at).strftime("%d %b %Y"),
+        "payment_method": order.get_payment_method_display(),
+        "customer": {
+            "name": getattr(customer, "name", "") or "",
+            "email": getattr(customer, "email", "") or "",
+            "phone": getattr(customer, "phone", "") or "",
+        },
+        "address": [line.strip() for line in address if line and line.strip()],
+        "items": items,
+        "subtotal": str(money(order.subtotal)),
+        "gst_percent": str(money(order.gst_percent)),
+        "gst_amount": str(money(order.gst_amount)),
+        "delivery": str(money(order.delivery_charge)),
+        "total": str(money(order.total_amount)),
+    }
+
+
+def invoice_digest(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+# Item table columns: (left edge, right edge) in points.
+_DESC = (MARGIN, 330)
+_PRICE = (330, 420)
+_QTY = (420, 465)
+_AMOUNT = (465, PAGE_WIDTH - MARGIN)
+_ROW_SIZE = 9.5
+_LINE_HEIGHT = 12
+
+
+def _table_header(page: Page, y: float) -> float:
+    page.box(MARGIN, y - 6, PAGE_WIDTH - 2 * MARGIN, 20)
+    page.text(_DESC[0] + 6, y, "DESCRIPTION", size=8.5, bold=True, gray=0.3)
+    page.text(_PRICE[1] - 6, y, "UNIT PRICE", size=8.5, bold=True, gray=0.3, align="right")
+    page.text(_QTY[1] - 6, y, "QTY", size=8.5, bold=True, gray=0.3, align="right")
+    page.text(_AMOUNT[1] - 6, y, "AMOUNT", size=8.5, bold=True, gray=0.3, align="right")
+    return y - 24
+
+
+def _first_page_header(page: Page, data: dict) -> float:
+    seller, right = data["seller"], PAGE_WIDTH - MARGIN
+    top = PAGE_HEIGHT - MARGIN - 14
+    page.text(MARGIN, top, seller.get("name") or "", size=18, bold=True)
+    y = top - 16
+    for line in (seller.get("tagline"), seller.get("address"),
+                 seller.get("gst") and f"GSTIN: {seller['gst']}",
+                 " | ".join(part for part in (seller.get("email"), seller.get("phone")) if part)):
+        if line:
+            page.text(MARGIN, y, line, size=9, gray=0.35)
+            y -= 12
+
+    page.text(right, top, "TAX INVOICE", size=14, bold=True, align="right")
+    meta_y = top - 16
+    for label, value in (("Invoice No", data["number"]), ("Order", f"#{data['order_id']}"),
+                         ("Date", data["date"]), ("Payment", data["payment_method"])):
+        page.text(right, meta_y, f"{label}: {value}", size=9, align="right")
+        meta_y -= 12
+
+    y = min(y, meta_y) - 14
+    page.line(MARGIN, y, right, y)
+    y -= 20
+    page.text(MARGIN, y, "BILL TO", size=8.5, bold=True, gray=0.3)
+    y -= 14
+    customer = data["customer"]
+    contact = [line for line in (customer["name"], customer["email"], customer["phone"]) if line]
+    for line in contact + (data["address"] or ["Address not provided"]):
+        page.text(MARGIN, y, _fit(line, 300, 10), size=10)
+        y -= 13
+    return y - 16
+
+
+def _continued_header(page: Page, data: dict) -> float:
+    top = PAGE_HEIGHT - MARGIN - 10
+    page.text(MARGIN, top, data["seller"].get("name") or "", size=11, bold=True)
+    page.text(PAGE_WIDTH - MARGIN, top, f"Invoice {data['number']} (continued)", size=9, align="right", gray=0.35)
+    return top - 28
+
+
+def _totals(page: Page, data: dict, y: float) -> float:
+    label_x, value_x = _PRICE[0] - 20, _AMOUNT[1] - 6
+    gst_label = "GST"
+    if money(data["gst_percent"]):
+        gst_label = f"GST ({money(data['gst_percent']).normalize():f}%)"
+    rows = [("Subtotal", data["subtotal"]), (gst_label, data["gst_amount"])]
+    if money(data["delivery"]):
+        rows.append(("Delivery", data["delivery"]))
+    for label, value in rows:
+        page.text(label_x, y, label, size=10)
+        page.text(value_x, y, _fmt_money(value), size=10, align="right")
+        y -= 15
+    page.line(label_x, y + 9, _AMOUNT[1], y + 9, width=0.8, gray=0.5)
+    y -= 6
+    page.text(label_x, y, "Total", size=11.5, bold=True)
+    page.text(value_x, y, _fmt_money(data["total"]), size=11.5, bold=True, align="right")
+    return y - 15
+
+
+TOTALS_HEIGHT = 90
+
+
+def render_invoice(data: dict) -> bytes:
+    """Lay out ``invoice_data(order)`` on as many A4 pages as the item table needs. Pure: no DB or cache access."""
+    pages = [Page()]
+    y = _table_header(pages[0], _first_page_header(pages[0], data))
+    bottom = FOOTER_Y + 30
+
+    items = data["items"] or [{"name": "No items were found on this order.", "sku": "", "price": None,
+                               "quantity": None, "amount": None}]
+    for item in items:
+        name_lines = _wrap(item["name"], _DESC[1] - _DESC[0] - 12, _ROW_SIZE)
+        if item["sku"]:
+            name_lines.append(f"SKU: {item['sku']}")
+        height = len(name_lines) * _LINE_HEIGHT + 8
+        if y - height < bottom:
+            pages.append(Page())
+            y = _table_header(pages[-1], _continued_header(pages[-1], data))
+        page = pages[-1]
+        for index, line in enumerate(name_lines):
+            is_sku = index == len(name_lines) - 1 and item["sku"]
+            page.text(_DESC[0] + 6, y - index * _LINE_HEIGHT, line,
+                      size=8 if is_sku else _ROW_SIZE, gray=0.45 if is_sku else 0)
+        if item["price"] is not None:
+            page.text(_PRICE[1] - 6, y, _fmt_money(item["price"]), size=_ROW_SIZE, align="right")
+            page.text(_QTY[1] - 6, y, str(item["quantity"]), size=_ROW_SIZE, align="right")
+            page.text(_AMOUNT[1] - 6, y, _fmt_money(item["amount"]), size=_ROW_SIZE, align="right")
+        y -= height
+        page.line(MARGIN, y + _LINE_HEIGHT - 2, PAGE_WIDTH - MARGIN, y + _LINE_HEIGHT - 2, width=0.4, gray=0.85)
+
+    if y - TOTALS_HEIGHT < bottom:
+        pages.append(Page())
+        y = _continued_header(pages[-1], data)
+    _totals(pages[-1], data, y - 6)
+
+    for number, page in enumerate(pages, start=1):
+        page.text(MARGIN, FOOTER_Y, "Thank you for shopping with us.", size=8.5, gray=0.45)
+        page.text(PAGE_WIDTH - MARGIN, FOOTER_Y, f"Page {number} of {len(pages)}", size=8.5, gray=0.45, align="right")
+    return write_pdf(pages, title=f"Invoice {data['number']}")
+
+
+@dataclass(frozen=True)
+class RenderedInvoice:
+    order_id: int
+    digest: str
+    pdf: bytes
+
+    @property
+    def filename(self) -> str:
+        return f"Invoice-{self.order_id:05d}.pdf"
+
+
+def _cache_key(digest: str) -> str:
+    return f"{INVOICE_CACHE_PREFIX}:{digest}"
+
+
+def _render_many(datas: list[dict], workers: int | None = None) -> list[bytes]:
+    workers = workers or getattr(settings, "INVOICE_WORKERS", None) or os.cpu_count() or 1
+    if workers <= 1 or len(datas) < getattr(settings, "INVOICE_POOL_THRESHOLD", 16):
+        return [render_invoice(data) for data in datas]
+    workers = min(workers, len(datas))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_invoice, datas, chunksize=max(1, len(datas) // (workers * 4))))
+
+
+def render_invoices(orders: Iterable, *, workers: int | None = None) -> list[RenderedInvoice]:
+    """
+    Cached PDFs for ``orders`` (with customer/items preloaded), in order.
+    Cache misses are rendered in a process pool once there are enough of them.
+    """
+    datas = [invoice_data(order) for order in orders]
+    digests = [invoice_digest(data) for data in datas]
+    cached = cache.get_many([_cache_key(digest) for digest in set(digests)])
+    missing = {digest: data for digest, data in zip(digests, datas) if _cache_key(digest) not in cached}
+    if missing:
+        fresh = dict(zip(missing, _render_many(list(missing.values()), workers)))
+        cache.set_many({_cache_key(d): pdf for d, pdf in fresh.items()}, getattr(settings, "INVOICE_CACHE_SECONDS", 86400))
+        cached.update({_cache_key(d): pdf for d, pdf in fresh.items()})
+    return [RenderedInvoice(data["order_id"], digest, cached[_cache_key(digest)]) for data, digest in zip(datas, digests)]
+
+
+def invoice_pdf(order) -> RenderedInvoice:
+    return render_invoices([order], workers=1)[0]
+
+
+def invoices_zip(invoices: Iterable[RenderedInvoice]) -> bytes:
+    # Content streams are already Flate-compressed, so the archive just stores them.
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for invoice in invoices:
+            archive.writestr(invoice.filename, invoice.pdf)
+    return buffer.getvalue()
@@ -0,0 +1,206 @@
+"""
+Garbage collection for MEDIA_ROOT.
+
+Product edits swap image URLs without deleting the old files, and deleted
+products, banners and collage tiles leave theirs behind. ``collect`` finds
+stored files nothing references any more and deletes them (or moves them
+under quarantine/), together with the ImageConversion / ResponsiveImage rows
+that pointed at them, so the content index never resolves an upload to a
+file that is gone.
+
+A file is referenced when a Product or ProductVariant lists it in
+``images``, a Banner or HomeCollageItem uses it (upload or media image_url),
+or a rich product description mentions its URL, and also when it belongs to
+a referenced image: the raw original behind an AVIF (and the AVIF behind a
+raw URL still being converted) and every responsive derivative. Files newer
+than the grace period are always kept: uploads from
+``POST /api/products/images/`` are stored before the product that uses them
+is saved. So are the files of images the store handed out within the grace
+period (ImageConversion.last_used_at): a re-upload of an old, unreferenced
+image deduplicates to its existing files without rewriting them.
+Database backups and the quarantine itself are never touched.
+
+Settings (optional)::
+
+    MEDIA_GC_GRACE_HOURS = 72
+    MEDIA_GC_PROTECTED = ("backups/", "quarantine/")
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Iterator
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from api.models import (
+    Banner,
+    HomeCollageItem,
+    ImageConversion,
+    Product,
+    ProductVariant,
+    ResponsiveImage,
+    RichProductDescription,
+)
+from api.utils.image_derivatives import forget_records
+from api.utils.image_utils import media_path
+
+QUARANTINE_DIR = "quarantine"
+
+
+@dataclass
+class Report:
+    scanned: int = 0
+    scanned_bytes: int = 0
+    kept_recent: int = 0
+    orphans: list[tuple[str, int]] = field(default_factory=list)  # (path, size)
+    removed_rows: int = 0
+
+    @property
+    def orphan_bytes(self) -> int:
+        return sum(size for _, size in self.orphans)
+
+    def by_folder(self) -> dict[str, tuple[int, int]]:
+        """{top-level folder: (files, bytes)} of the orphans."""
+        folders: dict[str, tuple[int, int]] = {}
+        for path, size in self.orphans:
+            top = path.split("/", 1)[0] if "/" in path else "."
+            count, total = folders.get(top, (0, 0))
+            folders[top] = (count + 1, total + size)
+        return folders
+
+
+def _protected() -> tuple[str, ...]:
+    return tuple(getattr(settings, "MEDIA_GC_PROTECTED", ("backups/", f"{QUARANTINE_DIR}/")))
+
+
+def _media_urls_in(value) -> Iterator[str]:
+    """Storage paths of MEDIA_URL links anywhere inside a JSON value (rich descriptions)."""
+    media_url = re.escape(settings.MEDIA_URL)
+    for match in re.finditer(rf"{media_url}[^\s\"'<>)]+", json.dumps(value)):
+        path = media_path(match.group(0))
+        if path:
+            yield path
+
+
+def referenced_paths(used_since=None) -> set[str]:
+    """
+    Every storage path the catalogue uses, directly or through a referenced
+    image; with ``used_since``, also images the store handed out after it.
+    """
+    paths: set[str] = set()
+    for model in (Product, ProductVariant):
+        for images in model.objects.values_list("images", flat=True).iterator():
+            paths.update(p for p in map(media_path, images or []) if p)
+    for model in (Banner, HomeCollageItem):
+        paths.update(model.objects.exclude(image="").exclude(image__isnull=True).values_list("image", flat=True))
+    for url in HomeCollageItem.objects.exclude(image_url="").exclude(image_url__isnull=True).values_list(
+        "image_url", flat=True
+    ):
+        path = media_path(url)
+        if path:
+            paths.add(path)
+    for content in RichProductDescription.objects.values_list("content", flat=True).iterator():
+        paths.update(_media_urls_in(content))
+    if used_since is not None:
+        recent = ImageConversion.objects.filter(last_used_at__gt=used_since).values_list("source", "result")
+        for source, result in recent.iterator():
+            paths.update(p for p in (source, result) if p)
+
+    # AVIF <-> raw original, in both directions. One pass over each table rather
+    # than an IN (...) with every referenced path.
+    for source, result in ImageConversion.objects.values_list("source", "result").iterator():
+        if source in paths and result:
+            paths.add(result)
+        elif result in paths:
+            paths.add(source)
+    # Responsive derivatives and the originals they are built from.
+    rows = ResponsiveImage.objects.values_list("source", "origin", "renditions").iterator()
+    for source, origin, renditions in rows:
+        if source not in paths:
+            continue
+        if origin:
+            paths.add(origin)
+        for rendition in renditions or []:
+            paths.update(rendition.get(fmt) for fmt in ("avif", "webp") if rendition.get(fmt))
+    return paths
+
+
+def _walk(protected: tuple[str, ...], directory: str = "") -> Iterator[str]:
+    dirs, files = default_storage.listdir(directory)
+    for name in files:
+        path = f"{directory}/{name}" if directory else name
+        if not path.startswith(protected):
+            yield path
+    for name in dirs:
+        path = f"{directory}/{name}" if directory else name
+        if not f"{path}/".startswith(protected):
+            yield from _walk(protected, path)
+
+
+def find_orphans(grace: timedelta) -> Report:
+    report = Report()
+    cutoff = timezone.now() - grace
+    referenced = referenced_paths(used_since=cutoff)
+    for path in _walk(_protected()):
+        size = default_storage.size(path)
+        report.scanned += 1
+        report.scanned_bytes += size
+        if path in referenced:
+            continue
+        if default_storage.get_modified_time(path) > cutoff:
+            report.kept_recent += 1
+            continue
+        report.orphans.append((path, size))
+    return report
+
+
+def collect(grace: timedelta | None = None, *, dry_run: bool = False, quarantine: bool = False) -> Report:
+    """
+    Find unreferenced files older than ``grace`` and delete them (or move
+    them to quarantine/<timestamp>/...), then drop the image rows that
+    pointed at them. ``dry_run`` only reports.
+    """
+    if grace is None:
+        grace = timedelta(hours=getattr(settings, "MEDIA_GC_GRACE_HOURS", 72))
+    report = find_orphans(grace)
+    if dry_run or not report.orphans:
+        return report
+
+    # A product saved (or an upload deduplicated) while we walked may have picked up one of these.
+    referenced = referenced_paths(used_since=timezone.now() - grace)
+    report.orphans = [(path, size) for path, size in report.orphans if path not in referenced]
+    gone = {path for path, _ in report.orphans}
+
+    target = f"{QUARANTINE_DIR}/{timezone.now():%Y%m%d-%H%M%S}"
+    for path in gone:
+        if quarantine:
+            with default_storage.open(path, "rb") as fh:
+                default_storage.save(f"{target}/{path}", fh)
+        default_storage.delete(path)
+
+    conversions = ImageConversion.objects.filter(source__in=gone)
+    responsive = list(ResponsiveImage.objects.filter(source__in=gone).values_list("source", flat=True))
+    report.removed_rows = conversions.delete()[0] + ResponsiveImage.objects.filter(source__in=responsive).delete()[0]
+    forget_records(responsive)
+    _remove_empty_dirs()
+    return report
+
+
+def _remove_empty_dirs() -> None:
+    """Derivatives get a folder per image; drop the ones collection emptied (local storage only)."""
+    root = getattr(default_storage, "location", None)
+    base = os.path.join(root, "derivatives") if root else ""
+    if not os.path.isdir(base):
+        return
+    for current, _, _ in os.walk(base, topdown=False):
+        if current != base:
+            try:
+                os.rmdir(current)  # Fails, as intended, while anything is left inside.
+            except OSError:
+                pass
@@ -0,0 +1,169 @@
+"""
+Serving MEDIA files (uploads, AVIFs, derivatives).
+
+``serve_media`` replaces ``django.conf.urls.static.static``, which only works
+with DEBUG on and streams whole files with no caching headers. It answers
+conditional GETs (ETag / Last-Modified) with 304, supports single byte
+ranges (206 / 416), and marks content-addressed files (named after their
+SHA-256 or, before that, a random uuid; everything under derivatives/) as
+immutable with a one year max-age, so browsers and CDNs stop asking. Other
+uploads (banners, collage tiles keep their original names, which can be
+reused) get a short max-age and revalidate by ETag. Database backups live
+under MEDIA_ROOT/backups/ but are never served here (404); the admin
+downloads them through the authenticated ``/api/backups/<filename>/``.
+
+In production the file body should not go through a Django worker at all:
+set MEDIA_X_ACCEL_REDIRECT to an nginx ``internal`` location aliased to
+MEDIA_ROOT, or MEDIA_X_SENDFILE for Apache/lighttpd, and the view only sets
+headers and hands the path to the web server (which then does ranges and
+conditional requests itself). Without either, files go out through
+FileResponse, which uses the WSGI server's sendfile support where it has it.
+
+Static files are served by WhiteNoise from the hashed, precompressed copies
+``collectstatic`` writes through ``StaticFilesStorage`` (see STORAGES in
+settings), with far-future caching; images are already compressed, so media
+is not precompressed.
+
+Settings (optional)::
+
+    SERVE_MEDIA = True
+    MEDIA_X_ACCEL_REDIRECT = "/protected-media/"   # nginx
+    MEDIA_X_SENDFILE = False                      # Apache mod_xsendfile / lighttpd
+    MEDIA_IMMUTABLE_MAX_AGE = 31536000
+    MEDIA_MAX_AGE = 3600
+"""
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+CHUNK_SIZE = 64 * 1024
+# <sha256>.<ext> names from the image store (<uuid4 hex> before it), and derivatives/<digest>/<width>...
+IMMUTABLE_PATH = re.compile(r"(^|/)([0-9a-f]{64}|[0-9a-f]{32})\.[a-z0-9]+$|^derivatives/")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+PRIVATE_PREFIXES = ("backups/",)
+
+
+def is_immutable(path: str) -> bool:
+    return bool(IMMUTABLE_PATH.search(path))
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _byte_range(header: str, size: int):
+    """(start, end) inclusive for a single satisfiable range, None to send the whole file, False if unsatisfiable."""
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None  # Multiple or malformed ranges: a full 200 is always a valid answer.
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path: str):
+    if os.path.normpath(path).replace(os.sep, "/").lstrip("/").startswith(PRIVATE_PREFIXES):
+        raise Http404("Not found")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    etag = _etag(stat)
+    last_modified = int(stat.st_mtime)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        accel = getattr(settings, "MEDIA_X_ACCEL_REDIRECT", None)
+        if accel:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = quote(f"{accel.rstrip('/')}/{path.lstrip('/')}")
+        elif getattr(settings, "MEDIA_X_SENDFILE", False):
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = full_path
+        else:
+            response = _file_response(request, full_path, stat, content_type, etag)
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if is_immutable(path):
+        patch_cache_control(
+            response, public=True, immutable=True, max_age=getattr(settings, "MEDIA_IMMUTABLE_MAX_AGE", 31536000)
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, "MEDIA_MAX_AGE", 3600))
+    return response
+
+
+def _file_response(request, full_path: str, stat: os.stat_result, content_type: str, etag: str):
+    size = stat.st_size
+    header = request.META.get("HTTP_RANGE", "")
+    if_range = request.META.get("HTTP_IF_RANGE", "")
+    if header and if_range and if_range != etag and parse_http_date_safe(if_range) != int(stat.st_mtime):
+        header = ""  # The client's copy is stale: send the whole file.
+    byte_range = _byte_range(header, size) if header else None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, "rb"), content_type=content_type)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_read_range(full_path, start, end - start + 1), status=206, content_type=content_type)
+    response["Content-Length"] = str(end - start + 1)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Hashed + gzip/brotli static files once collectstatic has run; until then
+    (or for a file missing from the manifest) the plain name is used instead
+    of every page that links a static file raising.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
@@ -0,0 +1,91 @@
+"""
+Helpers for moving orders between statuses and keeping their history.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from django.db import transaction
+from django.utils import timezone
+
+from analytic.rollups import local_date, refresh_order_metrics
+from api.models import Order, OrderStatusEvent, normalize_order_status
+from api.utils.customer_stats import refresh_customer_stats
+from api.utils.outbox import ORDER_STATUS_EMAIL, enqueue
+from api.utils.status_counts import adjust_status_counts
+
+
+def _actor(user):
+    return user if getattr(user, "is_authenticated", False) and getattr(user, "pk", None) else None
+
+
+def record_status_change(order: Order, previous_status: str | None, user=None) -> OrderStatusEvent | None:
+    """Store a history row when ``order.status`` differs from ``previous_status``."""
+    if (order.status or "") == (previous_status or ""):
+        return None
+    return OrderStatusEvent.objects.create(
+        order=order,
+        from_status=previous_status or "",
+        to_status=order.status or "",
+        changed_by=_actor(user),
+    )
+
+
+def bulk_transition(order_ids: Iterable[int], new_status: str, user=None, *, notify: bool = True):
+    """
+    Move many orders to ``new_status`` with one UPDATE and one history INSERT.
+    With ``notify`` a status email per changed order is queued in the same transaction.
+    Returns (results, changed_ids, missing_ids) where results is a compact
+    per-order list of {id, previous_status, status, changed}.
+    """
+    ids = list(dict.fromkeys(order_ids))
+    new_status = normalize_order_status(new_status)
+    now = timezone.now()
+    actor = _actor(user)
+
+    with transaction.atomic():
+        rows = list(
+            Order.objects.select_for_update()
+            .filter(id__in=ids)
+            .values_list("id", "status", "customer_id", "created_at")
+        )
+        previous = {oid: status for oid, status, _, _ in rows}
+        changed_ids = [oid for oid in ids if oid in previous and previous[oid] != new_status]
+        if changed_ids:
+            Order.objects.filter(id__in=changed_ids).update(status=new_status, updated_at=now)
+            OrderStatusEvent.objects.bulk_create([
+                OrderStatusEvent(
+                    order_id=oid,
+                    from_status=previous[oid] or "",
+                    to_status=new_status,
+                    changed_by=actor,
+                    created_at=now,
+                )
+                for oid in changed_ids
+            ])
+            # Queryset.update() skips the Order signals, so refresh the rollups here.
+            changed_set = set(changed_ids)
+            deltas = Counter(previous[oid] for oid in changed_ids)
+            adjust_status_counts({
+                **{status: -n for status, n in deltas.items()},
+                new_status: len(changed_ids),
+            })
+            refresh_customer_stats({cid for oid, _, cid, _ in rows if oid in changed_set})
+            refresh_order_metrics({local_date(created) for oid, _, _, created in rows if oid in changed_set})
+            if notify:
+                enqueue(ORDER_STATUS_EMAIL, ({"order_id": oid, "status": new_status} for oid in changed_ids))
+
+    changed = set(changed_ids)
+    results = [
+        {
+            "id": oid,
+            "previous_status": previous[oid] or "",
+            "status": new_status if oid in changed else previous[oid] or "",
+            "changed": oid in changed,
+        }
+        for oid in ids
+        if oid in previous
+    ]
+    missing = [oid for oid in ids if oid not in previous]
+    return results, changed_ids, missing
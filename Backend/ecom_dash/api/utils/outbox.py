@@ -0,0 +1,199 @@
+"""
+Transactional outbox for order side effects.
+
+Callers enqueue messages inside the transaction that changes the order, so a
+message exists if and only if the change committed. The run_outbox_worker
+command claims due messages under a lease, delivers them and retries failures
+with exponential backoff; a worker that dies mid-batch only delays its
+messages until the lease runs out, and one that overruns its lease leaves
+the outcome to whichever worker claimed the messages next.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import timedelta
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Order, OutboxMessage
+from api.utils.email_utils import build_order_status_email
+from api.utils.smtp_pool import send_batch
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUS_EMAIL = "order_status_email"
+
+# topic -> callable(messages) returning {message_id: error or None}
+HANDLERS: dict[str, Callable[[list[OutboxMessage]], dict[int, str | None]]] = {}
+# topic -> most messages of it one claim may take (slow handlers must finish inside the lease)
+BATCH_SIZES: dict[str, int] = {}
+
+
+def handler(topic: str, batch_size: int | None = None):
+    def register(func):
+        HANDLERS[topic] = func
+        if batch_size:
+            BATCH_SIZES[topic] = batch_size
+        return func
+    return register
+
+
+def _batch_sizes() -> dict[str, int]:
+    return {**BATCH_SIZES, **(getattr(settings, "OUTBOX_TOPIC_BATCH_SIZES", None) or {})}
+
+
+def enqueue(topic: str, payloads: Iterable[dict]) -> list[OutboxMessage]:
+    """Record messages in the caller's transaction; they are delivered once it commits."""
+    rows = [OutboxMessage(topic=topic, payload=payload) for payload in payloads]
+    return OutboxMessage.objects.bulk_create(rows) if rows else []
+
+
+def enqueue_order_status_emails(orders: Iterable[Order]) -> list[OutboxMessage]:
+    """Queue a status email per order, pinned to the status each order has now."""
+    return enqueue(ORDER_STATUS_EMAIL, ({"order_id": o.pk, "status": o.status or ""} for o in orders))
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 30)
+    cap = getattr(settings, "OUTBOX_RETRY_MAX_SECONDS", 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    # Jitter so a mail outage does not end in every message retrying at once.
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(worker: str, limit: int = 50, lease_seconds: int | None = None) -> list[OutboxMessage]:
+    """
+    Lease up to ``limit`` due messages to ``worker``, taking no more of a
+    topic than its batch size (``handler(batch_size=...)``, overridable with
+    OUTBOX_TOPIC_BATCH_SIZES). Rows are locked with SKIP LOCKED where the
+    database supports it, and the claiming UPDATE only matches rows still
+    claimable, so concurrent workers never share a message.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=lease_seconds or getattr(settings, "OUTBOX_LEASE_SECONDS", 300))
+    claimable = Q(status=OutboxMessage.PENDING, available_at__lte=now) | Q(
+        status=OutboxMessage.PROCESSING, locked_until__lt=now
+    )
+    with transaction.atomic():
+        qs = OutboxMessage.objects.filter(claimable).order_by("available_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        sizes = _batch_sizes()
+        ids = []
+        for topic, size in sizes.items():
+            ids += qs.filter(topic=topic).values_list("id", flat=True)[:max(min(size, limit - len(ids)), 0)]
+        ids += qs.exclude(topic__in=list(sizes)).values_list("id", flat=True)[:limit - len(ids)]
+        if not ids:
+            return []
+        OutboxMessage.objects.filter(claimable, id__in=ids).update(
+            status=OutboxMessage.PROCESSING, locked_by=worker, locked_until=now + lease,
+        )
+    return list(OutboxMessage.objects.filter(id__in=ids, locked_by=worker, status=OutboxMessage.PROCESSING))
+
+
+def _finish(messages: list[OutboxMessage], results: dict[int, str | None]) -> tuple[int, int]:
+    """
+    Record each outcome, but only on rows the claiming worker still holds: if
+    its lease ran out and another worker claimed the message meanwhile, that
+    worker's result is the one that counts.
+    """
+    now = timezone.now()
+    max_attempts = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 8)
+    sent = failed = 0
+    with transaction.atomic():
+        for msg in messages:
+            error = results.get(msg.id, "No result from handler")
+            fields = {"attempts": msg.attempts + 1, "locked_by": "", "locked_until": None}
+            if error is None:
+                fields.update(status=OutboxMessage.SENT, sent_at=now, last_error="")
+            else:
+                fields["last_error"] = error[:2000]
+                if fields["attempts"] >= max_attempts:
+                    fields["status"] = OutboxMessage.FAILED
+                else:
+                    fields.update(status=OutboxMessage.PENDING, available_at=now + _retry_delay(fields["attempts"]))
+            owned = OutboxMessage.objects.filter(
+                id=msg.id, locked_by=msg.locked_by, status=OutboxMessage.PROCESSING
+            ).update(**fields)
+            if not owned:
+                logger.warning("Outbox message %s was claimed by another worker after %s's lease ran out.", msg.id, msg.locked_by)
+                continue
+            for name, value in fields.items():
+                setattr(msg, name, value)
+            if error is None:
+                sent += 1
+            else:
+                failed += 1
+    return sent, failed
+
+
+def process_batch(messages: list[OutboxMessage]) -> tuple[int, int]:
+    """Deliver claimed messages grouped by topic. Returns (sent, failed)."""
+    by_topic: dict[str, list[OutboxMessage]] = {}
+    for msg in messages:
+        by_topic.setdefault(msg.topic, []).append(msg)
+    results: dict[int, str | None] = {}
+    for topic, batch in by_topic.items():
+        func = HANDLERS.get(topic)
+        if func is None:
+            results.update({m.id: f"No handler for topic {topic!r}" for m in batch})
+            continue
+        try:
+            results.update(func(batch))
+        except Exception as exc:
+            results.update({m.id: f"{type(exc).__name__}: {exc}" for m in batch})
+    return _finish(messages, results)
+
+
+def drain(worker: str, batch_size: int = 50, max_batches: int | None = None) -> tuple[int, int]:
+    """Process due messages until none are left (or ``max_batches`` ran). Returns (sent, failed)."""
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        messages = claim_batch(worker, batch_size)
+        if not messages:
+            break
+        s, f = process_batch(messages)
+        sent, failed, batches = sent + s, failed + f, batches + 1
+    return sent, failed
+
+
+@handler(ORDER_STATUS_EMAIL)
+def _send_order_status_emails(messages: list[OutboxMessage]) -> dict[int, str | None]:
+    """Build every email first, then hand them to the mail backend as one batch."""
+    orders = Order.objects.select_related("customer").prefetch_related("items").in_bulk(
+        {m.payload.get("order_id") for m in messages}
+    )
+    results: dict[int, str | None] = {}
+    mail = get_connection(fail_silently=False)
+    outgoing: list[tuple[int, EmailMessage]] = []
+    for msg in messages:
+        order = orders.get(msg.payload.get("order_id"))
+        if order is None:
+            results[msg.id] = None  # Order deleted since; nothing to send.
+            continue
+        try:
+            email = build_order_status_email(order, connection=mail, status=msg.payload.get("status"))
+        except Exception as exc:
+            results[msg.id] = f"{type(exc).__name__}: {exc}"
+            continue
+        if email is None:
+            results[msg.id] = None
+        else:
+            outgoing.append((msg.id, email))
+    if outgoing:
+        errors = send_batch([email for _, email in outgoing], connection=mail)
+        results.update({msg_id: error for (msg_id, _), error in zip(outgoing, errors)})
+    return results
@@ -0,0 +1,156 @@
+"""
+Order pricing: the one place subtotal, GST, delivery and total are worked out.
+
+The result is stored on Order (subtotal, gst_percent, gst_amount,
+delivery_charge, total_amount) when the order is written, and everything that
+shows money afterwards (emails, invoices, analytics) reads those columns.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Iterable, Sequence
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+HUNDRED = Decimal("100")
+
+# Older clients send charges as pseudo line items; these names are not goods.
+GST_LINE_NAMES = {"gst", "gst charge", "tax", "taxes", "igst", "cgst", "sgst"}
+DELIVERY_LINE_NAMES = {
+    "delivery", "delivery charge", "delivery charges",
+    "shipping", "shipping charge", "shipping charges",
+}
+
+ORDER_PRICE_FIELDS = ["subtotal", "gst_percent", "gst_amount", "delivery_charge", "total_amount"]
+
+
+def to_decimal(value, default: Decimal = ZERO) -> Decimal:
+    """Lenient Decimal parse: accepts numbers, numeric strings and "18%"; anything else is ``default``."""
+    if value in (None, ""):
+        return default
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value).replace("%", "").strip())
+    except (InvalidOperation, ValueError):
+        return default
+
+
+def money(value) -> Decimal:
+    return to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def charge_kind(name: str | None) -> str | None:
+    """'gst' or 'delivery' for pseudo charge lines, None for real goods."""
+    key = (name or "").strip().lower()
+    if key in GST_LINE_NAMES:
+        return "gst"
+    if key in DELIVERY_LINE_NAMES:
+        return "delivery"
+    return None
+
+
+@dataclass(frozen=True)
+class Line:
+    price: Decimal
+    quantity: int
+    # Per-line GST rate (e.g. product.gst); used when no order-wide rate is given.
+    gst_percent: Decimal = ZERO
+
+    @property
+    def total(self) -> Decimal:
+        return self.price * self.quantity
+
+
+@dataclass(frozen=True)
+class Breakdown:
+    subtotal: Decimal
+    gst_percent: Decimal
+    gst_amount: Decimal
+    delivery: Decimal
+    total: Decimal
+
+    def apply(self, order) -> None:
+        order.subtotal = self.subtotal
+        order.gst_percent = self.gst_percent
+        order.gst_amount = self.gst_amount
+        order.delivery_charge = self.delivery
+        order.total_amount = self.total
+
+
+def price_order(
+    lines: Sequence[Line],
+    *,
+    gst_percent=None,
+    delivery=None,
+    gst_from_lines=ZERO,
+    delivery_from_lines=ZERO,
+    client_total=None,
+) -> Breakdown:
+    """
+    Price goods ``lines``.
+
+    GST uses ``gst_percent`` for every line when given, otherwise each line's
+    own rate, otherwise a GST amount sent as a pseudo line. Delivery is
+    ``delivery`` or the delivery pseudo lines. When the client sends the total
+    it showed (``client_total``) and it is not below the subtotal, that total
+    wins and any gap is booked as GST, then delivery, if those are still zero.
+    """
+    subtotal = sum((line.total for line in lines), ZERO)
+    order_rate = to_decimal(gst_percent)
+    delivery_amount = to_decimal(delivery)
+    if not delivery_amount and delivery_from_lines:
+        delivery_amount = to_decimal(delivery_from_lines)
+
+    gst_amount = ZERO
+    rate = order_rate
+    for line in lines:
+        line_rate = order_rate or line.gst_percent
+        if line_rate:
+            gst_amount += line.total * line_rate / HUNDRED
+            # Without an order-wide rate, report the first line rate seen.
+            rate = rate or line_rate
+    if not gst_amount and gst_from_lines:
+        gst_amount = to_decimal(gst_from_lines)
+        if subtotal and not rate:
+            rate = gst_amount / subtotal * HUNDRED
+
+    total = subtotal + gst_amount + delivery_amount
+    client = to_decimal(client_total, default=None) if client_total not in (None, "") else None
+    if client is not None and client >= subtotal:
+        gap = client - total
+        if gap > 0 and not gst_amount:
+            gst_amount, gap = gap, ZERO
+            if subtotal and not rate:
+                rate = gst_amount / subtotal * HUNDRED
+        if gap > 0 and not delivery_amount:
+            delivery_amount = gap
+        total = client
+
+    return Breakdown(
+        subtotal=money(subtotal),
+        gst_percent=to_decimal(rate).quantize(CENT, rounding=ROUND_HALF_UP),
+        gst_amount=money(gst_amount),
+        delivery=money(delivery_amount),
+        total=money(total),
+    )
+
+
+def price_item_rows(rows: Iterable[dict], **kwargs) -> tuple[list[dict], Breakdown]:
+    """
+    Split admin-entered item dicts (name/price/quantity) into real goods and
+    pseudo charge lines, then price them. Returns (goods_rows, breakdown).
+    """
+    goods, gst_lines, delivery_lines = [], ZERO, ZERO
+    for row in rows:
+        line_total = to_decimal(row.get("price")) * to_decimal(row.get("quantity"))
+        kind = charge_kind(row.get("name"))
+        if kind == "gst":
+            gst_lines += line_total
+        elif kind == "delivery":
+            delivery_lines += line_total
+        else:
+            goods.append(row)
+    lines = [Line(to_decimal(r.get("price")), int(to_decimal(r.get("quantity")))) for r in goods]
+    return goods, price_order(lines, gst_from_lines=gst_lines, delivery_from_lines=delivery_lines, **kwargs)
@@ -0,0 +1,143 @@
+"""
+In-process broadcast for the admin push channel (new notifications and orders).
+Subscribers are asyncio queues owned by streaming responses; publishers are the
+sync model signal handlers and may run on any thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+UNREAD_CACHE_KEY = "notifications:unread_count"
+UNREAD_CACHE_TIMEOUT = 300
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def _offer(queue: asyncio.Queue, event: dict):
+    # A full queue means a slow client; it catches up from the DB cursor instead.
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        """Register a queue on the running event loop. Returns the handle for unsubscribe()."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(entry)
+        return entry
+
+    def unsubscribe(self, entry):
+        with self._lock:
+            self._subscribers.discard(entry)
+
+    def publish(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for entry in subscribers:
+            loop, queue = entry
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Event loop already closed; drop the stale subscriber.
+                self.unsubscribe(entry)
+
+
+broker = EventBroker()
+
+
+def get_unread_count() -> int:
+    count = cache.get(UNREAD_CACHE_KEY)
+    if count is None:
+        from api.models import Notification
+
+        count = Notification.objects.filter(is_read=False).count()
+        cache.set(UNREAD_CACHE_KEY, count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def invalidate_unread_count():
+    cache.delete(UNREAD_CACHE_KEY)
+
+
+def notification_event(notification) -> dict:
+    return {
+        "type": "notification",
+        "id": notification.id,
+        "data": {
+            "id": notification.id,
+            "title": notification.title,
+            "message": notification.message,
+            "is_read": notification.is_read,
+            "type": notification.type,
+            "created_at": notification.created_at.isoformat() if notification.created_at else None,
+        },
+    }
+
+
+def order_event(order) -> dict:
+    customer = getattr(order, "customer", None)
+    return {
+        "type": "order",
+        "id": order.id,
+        "data": {
+            "id": order.id,
+            "customer_name": getattr(customer, "name", None),
+            "status": (order.status or "").lower(),
+            "total_amount": str(order.total_amount),
+            "created_at": order.created_at.isoformat() if order.created_at else None,
+        },
+    }
+
+
+def publish_notification(notification):
+    def _send():
+        event = notification_event(notification)
+        event["unread"] = get_unread_count()
+        broker.publish(event)
+
+    transaction.on_commit(_send)
+
+
+def publish_order(order):
+    transaction.on_commit(lambda: broker.publish(order_event(order)))
+
+
+def current_cursor() -> tuple[int, int]:
+    """Highest notification and order ids; a fresh subscriber starts from here."""
+    from api.models import Notification, Order
+
+    last_notification = Notification.objects.aggregate(m=Max("id"))["m"] or 0
+    last_order = Order.objects.aggregate(m=Max("id"))["m"] or 0
+    return last_notification, last_order
+
+
+def fetch_events_after(last_notification_id: int, last_order_id: int, limit: int = 50) -> list[dict]:
+    """
+    DB-cursor fallback: rows past the client's cursor, read as primary-key range
+    scans. Covers events published by other worker processes and clients that
+    reconnect with Last-Event-ID.
+    """
+    from api.models import Notification, Order
+
+    events = [
+        notification_event(n)
+        for n in Notification.objects.filter(id__gt=last_notification_id).order_by("id")[:limit]
+    ]
+    if events:
+        unread = get_unread_count()
+        for event in events:
+            event["unread"] = unread
+    events.extend(
+        order_event(o)
+        for o in Order.objects.filter(id__gt=last_order_id).select_related("customer").order_by("id")[:limit]
+    )
+    return events
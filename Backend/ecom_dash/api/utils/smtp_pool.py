@@ -0,0 +1,277 @@
+"""
+Pooled SMTP email backend.
+
+Django's SMTP backend opens a new (SSL) connection for every ``send_mail`` and
+every ``EmailMessage.send()``. ``PooledEmailBackend`` keeps authenticated
+connections warm in a process-wide pool, sends batches over one connection,
+spaces sends to each provider's rate limit and retries transient failures
+(dropped connections, 4xx replies) on a fresh connection.
+
+Enable with ``EMAIL_BACKEND = "api.utils.smtp_pool.PooledEmailBackend"``.
+Tuning (all optional)::
+
+    EMAIL_POOL_SIZE = 4                      # idle connections kept per server/login
+    EMAIL_POOL_IDLE_SECONDS = 60             # older idle connections are NOOP-checked
+    EMAIL_MAX_MESSAGES_PER_CONNECTION = 100  # recycle before the provider cuts us off
+    EMAIL_RATE_LIMITS = {"smtp.hostinger.com": 10}   # messages per second per host
+    EMAIL_SEND_RETRIES = 3
+    EMAIL_RETRY_BACKOFF_SECONDS = 0.5
+
+For local runs and tests point it at an SMTP sink instead of the provider,
+e.g. ``python -m aiosmtpd -n -l localhost:1025`` with EMAIL_HOST=localhost,
+EMAIL_PORT=1025, EMAIL_USE_SSL=false, EMAIL_HOST_USER= (no login), and
+measure throughput with ``manage.py email_benchmark``.
+"""
+from __future__ import annotations
+
+import smtplib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.mail.message import EmailMessage, sanitize_address
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class _Pooled:
+    connection: smtplib.SMTP
+    sent: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ConnectionPool:
+    """Idle SMTP connections per (host, port, user, tls, ssl); thread-safe."""
+
+    def __init__(self):
+        self._idle: dict[tuple, deque[_Pooled]] = {}
+        self._lock = threading.Lock()
+
+    def checkout(self, key) -> _Pooled | None:
+        idle_limit = _setting("EMAIL_POOL_IDLE_SECONDS", 60)
+        while True:
+            with self._lock:
+                queue = self._idle.get(key)
+                pooled = queue.pop() if queue else None
+            if pooled is None:
+                return None
+            if time.monotonic() - pooled.last_used < idle_limit or _alive(pooled.connection):
+                return pooled
+            _quit(pooled.connection)
+
+    def checkin(self, key, pooled: _Pooled) -> None:
+        pooled.last_used = time.monotonic()
+        with self._lock:
+            queue = self._idle.setdefault(key, deque())
+            if len(queue) < _setting("EMAIL_POOL_SIZE", 4):
+                queue.append(pooled)
+                return
+        _quit(pooled.connection)
+
+    def clear(self) -> None:
+        with self._lock:
+            pooled = [p for queue in self._idle.values() for p in queue]
+            self._idle.clear()
+        for p in pooled:
+            _quit(p.connection)
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` sends per second with bursts of up to ``rate`` sends."""
+
+    def __init__(self, rate: float):
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+POOL = ConnectionPool()
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(host: str) -> RateLimiter | None:
+    rate = (_setting("EMAIL_RATE_LIMITS", {}) or {}).get(host)
+    if not rate:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None or limiter.rate != float(rate):
+            limiter = _limiters[host] = RateLimiter(rate)
+        return limiter
+
+
+def _alive(connection) -> bool:
+    try:
+        return connection.noop()[0] == 250
+    except Exception:
+        return False
+
+
+def _quit(connection) -> None:
+    try:
+        connection.quit()
+    except Exception:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Worth retrying: dropped/failed connections, socket errors and 4xx replies."""
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    # Other SMTPExceptions are protocol/data errors; anything else OSError is the socket.
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def _connection_usable(exc: Exception) -> bool:
+    """After a rejected message the session is still fine; after anything else it is not."""
+    return isinstance(exc, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)) and not isinstance(
+        exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+    )
+
+
+class PooledEmailBackend(EmailBackend):
+    """
+    Drop-in replacement for django.core.mail.backends.smtp.EmailBackend.
+    ``close()`` hands the connection back to the pool instead of quitting.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sent_on_connection = 0
+
+    @property
+    def pool_key(self) -> tuple:
+        return (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+
+    def open(self):
+        if self.connection:
+            return False
+        pooled = POOL.checkout(self.pool_key)
+        if pooled is not None:
+            self.connection, self._sent_on_connection = pooled.connection, pooled.sent
+            return True
+        self._sent_on_connection = 0
+        return super().open()
+
+    def close(self):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        if self._sent_on_connection < _setting("EMAIL_MAX_MESSAGES_PER_CONNECTION", 100):
+            POOL.checkin(self.pool_key, _Pooled(connection, self._sent_on_connection))
+        else:
+            _quit(connection)
+
+    def _discard(self):
+        if self.connection is not None:
+            _quit(self.connection)
+            self.connection = None
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        errors = self.send_batch(email_messages)
+        failures = [exc for exc in errors if exc is not None]
+        if failures and not self.fail_silently:
+            raise failures[0]
+        return len(errors) - len(failures)
+
+    def send_batch(self, email_messages: Sequence[EmailMessage]) -> list[Exception | None]:
+        """
+        Send every message over pooled connections; one result per message
+        (None when sent). Unlike send_messages this never stops at the first
+        failure, so callers such as the outbox can record each outcome.
+        """
+        results: list[Exception | None] = []
+        with self._lock:
+            try:
+                for message in email_messages:
+                    results.append(self._send_with_retry(message))
+            finally:
+                self.close()
+        return results
+
+    def _send_with_retry(self, message: EmailMessage) -> Exception | None:
+        if not message.recipients():
+            return None
+        retries = _setting("EMAIL_SEND_RETRIES", 3)
+        backoff = _setting("EMAIL_RETRY_BACKOFF_SECONDS", 0.5)
+        limiter = _limiter(self.host)
+        for attempt in range(retries + 1):
+            try:
+                if self._sent_on_connection >= _setting("EMAIL_MAX_MESSAGES_PER_CONNECTION", 100):
+                    self._discard()
+                if self.connection is None:
+                    self.open()
+                    if self.connection is None:  # fail_silently swallowed the error
+                        raise smtplib.SMTPConnectError(-1, f"Could not connect to {self.host}:{self.port}")
+                if limiter is not None:
+                    limiter.wait()
+                self._deliver(message)
+                self._sent_on_connection += 1
+                return None
+            except Exception as exc:
+                if not _connection_usable(exc):
+                    self._discard()
+                if attempt >= retries or not _is_transient(exc):
+                    return exc
+                time.sleep(backoff * (2 ** attempt))
+        return None
+
+    def _deliver(self, message: EmailMessage) -> None:
+        encoding = message.encoding or settings.DEFAULT_CHARSET
+        from_email = sanitize_address(message.from_email, encoding)
+        recipients = [sanitize_address(addr, encoding) for addr in message.recipients()]
+        self.connection.sendmail(from_email, recipients, message.message().as_bytes(linesep="\r\n"))
+
+
+def send_batch(email_messages: Sequence[EmailMessage], connection=None) -> list[str | None]:
+    """
+    Send ``email_messages`` and return one error string (or None) per message.
+    Uses the pooled backend's batch path when configured, otherwise falls back
+    to one send per message over a shared connection.
+    """
+    connection = connection or get_connection(fail_silently=False)
+    if isinstance(connection, PooledEmailBackend):
+        return [None if exc is None else f"{type(exc).__name__}: {exc}" for exc in connection.send_batch(email_messages)]
+    results: list[str | None] = []
+    try:
+        connection.open()
+        for message in email_messages:
+            try:
+                sent = connection.send_messages([message])
+                results.append(None if sent else "Message was not sent")
+            except Exception as exc:
+                results.append(f"{type(exc).__name__}: {exc}")
+    finally:
+        connection.close()
+    return results
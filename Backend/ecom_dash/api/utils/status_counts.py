@@ -0,0 +1,60 @@
+"""
+Maintenance helpers for the OrderStatusCount counters.
+
+Order saves and deletes adjust the counters from api.signals, inside the
+order's transaction; bulk_transition adjusts them for its queryset UPDATE.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Mapping
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from api.models import Order, OrderStatusCount
+
+
+def adjust_status_counts(deltas: Mapping[str, int]) -> None:
+    """Apply {status: +n/-n}; one UPDATE per touched status."""
+    deltas = {status: n for status, n in deltas.items() if status and n}
+    if not deltas:
+        return
+    with transaction.atomic(savepoint=False):
+        OrderStatusCount.objects.bulk_create(
+            [OrderStatusCount(status=status) for status in deltas], ignore_conflicts=True
+        )
+        for status, n in deltas.items():
+            OrderStatusCount.objects.filter(status=status).update(count=F("count") + n)
+
+
+def status_transition(previous: str | None, current: str | None) -> Counter:
+    deltas = Counter()
+    if previous != current:
+        if previous:
+            deltas[previous] -= 1
+        if current:
+            deltas[current] += 1
+    return deltas
+
+
+def status_counts() -> dict:
+    """{status: count} for every known status (zeros included) plus "all"."""
+    counts = {status: 0 for status, _ in Order.STATUS_CHOICES}
+    counts.update(OrderStatusCount.objects.filter(count__gt=0).values_list("status", "count"))
+    counts["all"] = sum(counts.values())
+    return counts
+
+
+def rebuild_status_counts() -> dict:
+    """Recount from the orders table with one grouped query; used by the migration and for repair."""
+    rows = dict(Order.objects.values_list("status").annotate(n=Count("id")).order_by())
+    with transaction.atomic():
+        OrderStatusCount.objects.exclude(status__in=rows).delete()
+        OrderStatusCount.objects.bulk_create(
+            [OrderStatusCount(status=status, count=n) for status, n in rows.items()],
+            update_conflicts=True,
+            unique_fields=["status"],
+            update_fields=["count", "updated_at"],
+        )
+    return rows
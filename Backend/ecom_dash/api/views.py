@@ -23,7 +23,7 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status, viewsets
-from django.db.models import Count, Sum, DecimalField, OuterRef, Subquery, IntegerField, Max
+from django.db.models import Count, Sum, DecimalField, OuterRef, Subquery, IntegerField, Max, F
 from django.db.models.functions import Coalesce
 from .models import Order
 from .serializers import OrderWithItemsSerializer
@@ -39,25 +39,43 @@ from datetime import datetime, timezone as dt_timezone
 import os
 import shutil
 from pathlib import Path
-from django.db import connections
+from django.db import connections, transaction
 from .models import Banner
 from .serializers import BannerSerializer
 from django.db.models import Q
 from datetime import date
-from api.utils.email_utils import send_order_status_email
+from api.utils.outbox import enqueue_order_status_emails
+from api.utils.order_status import record_status_change, bulk_transition
+from api.utils.status_counts import status_counts
+from api.utils.invoice_pdf import invoice_pdf, invoices_zip, render_invoices
+from api.utils.image_utils import HashingUploadHandler, image_statuses, stored_url, upload_images
+from api.utils.realtime import (
+    broker as event_broker, current_cursor, fetch_events_after, get_unread_count, invalidate_unread_count,
+)
+from api.utils.activity_log import log_activity
+from api.utils.idempotency import run_idempotent
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import MultiPartParser
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 
 
 class BaseViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 class CustomerViewSet(BaseViewSet):
-    queryset = Customer.objects.annotate(
-        total_orders=Count('orders'),
+    # Read the CustomerStats rollup by primary key instead of aggregating all orders per list
+    queryset = Customer.objects.select_related('stats').annotate(
+        total_orders=Coalesce(F('stats__order_count'), 0, output_field=IntegerField()),
         total_spend=Coalesce(
-            Sum('orders__total_amount'),
+            F('stats__lifetime_spend'),
             0,
             output_field=DecimalField(max_digits=12, decimal_places=2)
-        )
+        ),
+        last_order_at=F('stats__last_order_at'),
+        cancelled_orders=Coalesce(F('stats__cancelled_count'), 0, output_field=IntegerField()),
     )
     serializer_class = CustomerSerializer
 
@@ -77,19 +95,16 @@ class CustomerAccountViewSet(BaseViewSet):
     serializer_class = CustomerAccountSerializer
 
     def get_queryset(self):
-        # Annotate total orders/spend for storefront customers by mapping to api.Customer via email (case-insensitive)
+        # Annotate total orders/spend for storefront customers from the CustomerStats rollup,
+        # joined through the account's api_customer FK
         qs = super().get_queryset()
-        orders_for_email = (
-            Order.objects
-            .filter(customer__email__iexact=OuterRef("email"))
-            .values("customer__email")
-        )
-        orders_count = orders_for_email.annotate(cnt=Count("id")).values("cnt")[:1]
-        orders_sum = orders_for_email.annotate(sum_amt=Sum("total_amount")).values("sum_amt")[:1]
-
         return qs.annotate(
-            total_orders=Coalesce(Subquery(orders_count), 0, output_field=IntegerField()),
-            total_spend=Coalesce(Subquery(orders_sum), 0, output_field=DecimalField(max_digits=12, decimal_places=2)),
+            total_orders=Coalesce(F("api_customer__stats__order_count"), 0, output_field=IntegerField()),
+            total_spend=Coalesce(
+                F("api_customer__stats__lifetime_spend"),
+                0,
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
         )
 
 
@@ -224,6 +239,34 @@ class ProductViewSet(BaseViewSet):
         # print("🧠 \n Serializer validated data:", serializer.validated_data)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=["post"], url_path="images", parser_classes=[MultiPartParser])
+    def upload_images(self, request):
+        """
+        Multipart image upload (any number of files, any field name). Files
+        stream to storage in chunks; returns an id and URL per image, and
+        product/variant ``images`` may then list those ids (or URLs) instead
+        of base64 data URIs.
+        """
+        # Must be set before request.FILES is first read.
+        handler = HashingUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+        files = [f for key in request.FILES for f in request.FILES.getlist(key)]
+        stored, errors = upload_images(files)
+        errors += [(name, "Image is too large.") for name in handler.rejected]
+        body = {
+            "images": [
+                {
+                    "id": job.pk,
+                    "name": name,
+                    "url": request.build_absolute_uri(stored_url(job)),
+                    "image_status": image_statuses([stored_url(job)])[0],
+                }
+                for name, job in stored
+            ],
+            "errors": [{"name": name, "error": error} for name, error in errors],
+        }
+        return Response(body, status=status.HTTP_201_CREATED if stored else status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=["get"], url_path="public")
     def public_products(self, request):
         """Returns parent + variants flattened for storefront."""
@@ -267,19 +310,25 @@ class ProductViewSet(BaseViewSet):
 
 
 
+ORDER_STATUSES = dict(Order.STATUS_CHOICES)
+
+
 class OrderViewSet(BaseViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderWithItemsSerializer
 
     def create(self, request, *args, **kwargs):
+        # Retries carrying the same Idempotency-Key get the first response back.
+        return run_idempotent(request, "orders.create", f"user:{request.user.pk}", lambda: self._create_order(request))
+
+    def _create_order(self, request):
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        self.perform_create(serializer)
-        try:
-            send_order_status_email(serializer.instance)
-        except Exception:
-            pass
+        # The status email is queued in the order's transaction and sent by the outbox worker.
+        with transaction.atomic():
+            self.perform_create(serializer)
+            enqueue_order_status_emails([serializer.instance])
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
@@ -289,33 +338,32 @@ class OrderViewSet(BaseViewSet):
 
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        updated_order = serializer.instance
-
-        try:
+        with transaction.atomic():
+            self.perform_update(serializer)
+            updated_order = serializer.instance
             new_status = getattr(updated_order, "status", None)
             if new_status and new_status != previous_status:
-                send_order_status_email(updated_order)
-        except Exception:
-            pass
+                record_status_change(updated_order, previous_status, request.user)
+                enqueue_order_status_emails([updated_order])
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         order = self.get_object()
-        new_status = request.data.get("status")
+        new_status = normalize_order_status(request.data.get("status"))
         if not new_status:
             return Response({"error": "Status is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if new_status not in ORDER_STATUSES:
+            return Response({"error": f"Unknown status '{new_status}'"}, status=status.HTTP_400_BAD_REQUEST)
 
         previous_status = order.status
         order.status = new_status
-        order.save()
-        try:
+        with transaction.atomic():
+            order.save()
             if new_status != previous_status:
-                send_order_status_email(order)
-        except Exception:
-            pass
+                record_status_change(order, previous_status, request.user)
+                enqueue_order_status_emails([order])
         # Return full order with items/addresses so admin UI has data for invoice generation
         try:
             from .serializers import OrderWithItemsSerializer
@@ -324,6 +372,94 @@ class OrderViewSet(BaseViewSet):
             serialized = OrderSerializer(order).data
         return Response(serialized, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        Move many orders to one status in a single UPDATE.
+        Body: {"ids": [1, 2, 3], "status": "dispatched"}
+        Customer emails go through the outbox, queued in the same transaction.
+        """
+        new_status = request.data.get("status")
+        ids = request.data.get("ids") or request.data.get("order_ids")
+        if not new_status or not isinstance(new_status, str):
+            return Response({"error": "Status is required"}, status=status.HTTP_400_BAD_REQUEST)
+        new_status = normalize_order_status(new_status)
+        if new_status not in ORDER_STATUSES:
+            return Response({"error": f"Unknown status '{new_status}'"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "'ids' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            return Response({"error": "'ids' must contain order ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results, changed_ids, missing = bulk_transition(ids, new_status, request.user)
+        return Response({
+            "status": new_status,
+            "updated": len(changed_ids),
+            "results": results,
+            "missing": missing,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='status-counts')
+    def status_counts(self, request):
+        """
+        Orders per status for the admin tab badges, read from the
+        OrderStatusCount counters: {"all": 42, "pending": 3, ...}.
+        """
+        return Response(status_counts(), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def invoice(self, request, pk=None):
+        """
+        The order's invoice as a vector PDF, cached per order version
+        (api.utils.invoice_pdf). The ETag is that version's digest.
+        """
+        order = self.get_object()
+        if order.status == Order.CANCELLED:
+            return Response({"error": f"Order #{order.id} is cancelled."}, status=status.HTTP_400_BAD_REQUEST)
+        rendered = invoice_pdf(order)
+        etag = f'"{rendered.digest}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(rendered.pdf, content_type="application/pdf")
+            response["Content-Disposition"] = f'attachment; filename="{rendered.filename}"'
+        response["ETag"] = etag
+        return response
+
+    @action(detail=False, methods=['get'], url_path='invoices')
+    def invoices(self, request):
+        """
+        Zip of invoice PDFs for ``?ids=1,2,3`` or a whole ``?month=2026-10``
+        (by order date). Cancelled orders are skipped.
+        """
+        orders = Order.objects.exclude(status=Order.CANCELLED)
+        ids, month = request.query_params.get("ids"), request.query_params.get("month")
+        if ids:
+            try:
+                orders = orders.filter(id__in=[int(i) for i in ids.split(",") if i.strip()])
+            except ValueError:
+                return Response({"error": "'ids' must be comma-separated order ids"}, status=status.HTTP_400_BAD_REQUEST)
+            label = "selected"
+        elif month:
+            try:
+                start = timezone.make_aware(datetime.strptime(month, "%Y-%m"))
+            except ValueError:
+                return Response({"error": "'month' must look like 2026-10"}, status=status.HTTP_400_BAD_REQUEST)
+            end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+            orders = orders.filter(created_at__gte=start, created_at__lt=end)
+            label = month
+        else:
+            return Response({"error": "Pass 'ids' or 'month'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = list(orders.select_related("customer").prefetch_related("items").order_by("id"))
+        if not orders:
+            return Response({"error": "No invoiceable orders found"}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(invoices_zip(render_invoices(orders)), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="invoices-{label}.zip"'
+        return response
+
 class DiscountViewSet(BaseViewSet):
     queryset = Discount.objects.all()
     serializer_class = DiscountSerializer
@@ -365,31 +501,7 @@ class HomeCollageItemViewSet(BaseViewSet):
         if item_type in ("occasion", "crystal"):
             qs = qs.filter(item_type=item_type)
         return qs
-    
-    def _sync_occasion(self, item: HomeCollageItem):
-        """
-        Ensure an Occasion record exists for collage items of type 'occasion'.
-        """
-        if getattr(item, "item_type", None) != "occasion":
-            return
-        name = (getattr(item, "name", "") or "").strip()
-        if not name:
-            return
-        existing = Occasion.objects.filter(name__iexact=name).first()
-        if not existing:
-            try:
-                Occasion.objects.create(name=name)
-            except Exception:
-                pass
-
-    def perform_create(self, serializer):
-        item = serializer.save()
-        self._sync_occasion(item)
 
-    def perform_update(self, serializer):
-        item = serializer.save()
-        self._sync_occasion(item)
-    
 class NoteViewSet(BaseViewSet):
     # queryset = Note.objects.all()
     serializer_class = NoteSerializer
@@ -404,11 +516,143 @@ class NotificationViewSet(BaseViewSet):
     queryset = Notification.objects.all().order_by("-created_at")
     serializer_class = NotificationSerializer
 
+    def get_queryset(self):
+        """
+        Optional incremental reads for pollers:
+        ?after_id=<id> returns only newer rows, ?limit=<n> caps the page.
+        """
+        qs = super().get_queryset()
+        if getattr(self, "action", None) != "list":
+            return qs
+        after_id = self.request.query_params.get("after_id")
+        if after_id:
+            try:
+                qs = qs.filter(id__gt=int(after_id))
+            except ValueError:
+                pass
+        limit = self.request.query_params.get("limit")
+        if limit:
+            try:
+                qs = qs[:max(1, min(int(limit), 500))]
+            except ValueError:
+                pass
+        return qs
+
     @action(detail=False, methods=["post"])
     def mark_all_read(self, request):
-        self.queryset.update(is_read=True)
+        Notification.objects.filter(is_read=False).update(is_read=True)
+        invalidate_unread_count()
         return Response({"status": "all marked as read"}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"])
+    def unread_count(self, request):
+        return Response({"unread": get_unread_count()}, status=status.HTTP_200_OK)
+
+
+def _format_sse(event, cursor):
+    return f"id: {cursor[0]}:{cursor[1]}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def _parse_stream_cursor(value):
+    try:
+        notification_id, order_id = str(value).split(":", 1)
+        return int(notification_id), int(order_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _authenticate_stream(request):
+    """EventSource cannot send headers, so accept the JWT as ?token= as well as Authorization: Bearer."""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    raw = request.GET.get("token")
+    if not raw:
+        parts = (request.headers.get("Authorization") or "").split()
+        raw = parts[1] if len(parts) == 2 else None
+    if not raw:
+        return None
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except Exception:
+        return None
+
+
+async def _admin_event_stream(cursor):
+    last_notification, last_order = cursor
+    poll_seconds = getattr(settings, "ADMIN_STREAM_POLL_SECONDS", 15)
+    max_seconds = getattr(settings, "ADMIN_STREAM_MAX_SECONDS", 600)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    subscription = event_broker.subscribe()
+    queue = subscription[1]
+    try:
+        yield f"retry: {poll_seconds * 1000}\n\n"
+        unread = await sync_to_async(get_unread_count)()
+        yield _format_sse({"type": "unread", "unread": unread}, (last_notification, last_order))
+        pending = await sync_to_async(fetch_events_after)(last_notification, last_order)
+        while True:
+            for event in pending:
+                if event["type"] == "notification":
+                    if event["id"] <= last_notification:
+                        continue
+                    last_notification = event["id"]
+                elif event["type"] == "order":
+                    if event["id"] <= last_order:
+                        continue
+                    last_order = event["id"]
+                yield _format_sse(event, (last_notification, last_order))
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                pending = [await asyncio.wait_for(queue.get(), timeout=min(poll_seconds, remaining))]
+            except asyncio.TimeoutError:
+                # Quiet period: check the DB cursor for events from other processes, then keep the connection warm.
+                pending = await sync_to_async(fetch_events_after)(last_notification, last_order)
+                if not pending:
+                    yield ": keepalive\n\n"
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+async def admin_event_stream(request):
+    """
+    Server-Sent Events feed of new Notification rows and new orders for the admin UI.
+    GET /api/notifications/stream/?token=<jwt>
+    Resumes from the Last-Event-ID header (or ?cursor=) after reconnects.
+    Under ASGI the stream pushes events as they are committed; under WSGI it
+    returns one catch-up batch and relies on EventSource's retry to poll.
+    """
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    cursor = _parse_stream_cursor(request.headers.get("Last-Event-ID") or request.GET.get("cursor"))
+    if cursor is None:
+        cursor = await sync_to_async(current_cursor)()
+
+    if not hasattr(request, "scope"):
+        poll_seconds = getattr(settings, "ADMIN_STREAM_POLL_SECONDS", 15)
+        events = await sync_to_async(fetch_events_after)(*cursor)
+        last_notification, last_order = cursor
+        chunks = [f"retry: {poll_seconds * 1000}\n\n"]
+        for event in events:
+            if event["type"] == "notification":
+                last_notification = max(last_notification, event["id"])
+            else:
+                last_order = max(last_order, event["id"])
+            chunks.append(_format_sse(event, (last_notification, last_order)))
+        if not events:
+            chunks.append(f"id: {cursor[0]}:{cursor[1]}\n: idle\n\n")
+        response = HttpResponse("".join(chunks), content_type="text/event-stream")
+    else:
+        response = StreamingHttpResponse(_admin_event_stream(cursor), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 class RPDViewSet(BaseViewSet):
     queryset = RPD.objects.all()
     serializer_class = RPDSerializer
@@ -539,7 +783,7 @@ def backup_database(request):
         # Ensure any DB connections are idle; for SQLite, a simple copy generally works when no writes in-flight
         shutil.copy2(db_path, backup_path)
 
-        backup_url = f"{settings.MEDIA_URL}backups/{backup_filename}"
+        backup_url = reverse('download-backup', args=[backup_filename])
         return Response({
             "message": "Backup created successfully",
             "backupPath": str(backup_path),
@@ -564,7 +808,7 @@ def list_backups(request):
                 'filename': p.name,
                 'size': stat.st_size,
                 'modified': datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc).isoformat(),
-                'url': f"{settings.MEDIA_URL}backups/{p.name}",
+                'url': reverse('download-backup', args=[p.name]),
             })
         return Response(items, status=status.HTTP_200_OK)
     except Exception as e:
@@ -572,6 +816,21 @@ def list_backups(request):
         return Response({"error": "Failed to list backups"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def download_backup(request, filename):
+    """Backups hold the whole database, so they are only downloadable here, never through MEDIA_URL."""
+    if '/' in filename or '\\' in filename or not filename.endswith('.sqlite3'):
+        return Response({"error": "Invalid filename"}, status=status.HTTP_400_BAD_REQUEST)
+    backup_file = Path(settings.MEDIA_ROOT) / 'backups' / filename
+    if not backup_file.is_file():
+        return Response({"error": "Backup file not found"}, status=status.HTTP_404_NOT_FOUND)
+    response = FileResponse(open(backup_file, 'rb'), as_attachment=True, filename=filename,
+                            content_type='application/vnd.sqlite3')
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
 def restore_database(request):
@@ -639,39 +898,42 @@ class OccasionViewSet(viewsets.ModelViewSet):
     queryset = Occasion.objects.all()
     serializer_class = OccasionSerializer
 
-    def _sync_collage_occasions(self):
-        """
-        Ensure occasions from homepage collage tiles exist in the Occasion table.
-        Case-insensitive matching to avoid duplicates.
-        """
-        names = (
-            HomeCollageItem.objects.filter(item_type="occasion")
-            .exclude(name__isnull=True)
-            .exclude(name__exact="")
-            .values_list("name", flat=True)
-        )
-        for name in names:
-            existing = Occasion.objects.filter(name__iexact=name).first()
-            if not existing:
-                try:
-                    Occasion.objects.create(name=name)
-                except Exception:
-                    # Ignore race conditions/validation errors
-                    pass
 
-    def get_queryset(self):
-        try:
-            self._sync_collage_occasions()
-        except Exception:
-            # Do not block listing if sync fails
-            pass
-        return super().get_queryset()
+class ActivityLogCursorPagination(CursorPagination):
+    """Keyset pagination over (timestamp, id) so deep pages stay as cheap as the first."""
+    ordering = ("-timestamp", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
 
 
 class ActivityLogViewSet(viewsets.ModelViewSet):
-    queryset = ActivityLog.objects.all().order_by("-timestamp")
+    queryset = ActivityLog.objects.select_related("user").order_by("-timestamp", "-id")
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]  # or AllowAny if you don’t want auth
+    pagination_class = ActivityLogCursorPagination
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user if self.request.user.is_authenticated else None)
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        log_type = params.get("type")
+        if log_type:
+            qs = qs.filter(type=log_type)
+        user = params.get("user")
+        if user:
+            qs = qs.filter(user_id=user) if user.isdigit() else qs.filter(user__email__iexact=user)
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        # Writes go through the buffered writer; the row lands on the next flush, so
+        # there is no primary key yet and the 202 answer carries none.
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entry = log_activity(
+            serializer.validated_data["message"],
+            type=serializer.validated_data.get("type", "info"),
+            user=request.user,
+        )
+        data = self.get_serializer(entry).data
+        data.pop("id", None)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -129,9 +130,27 @@ AUTH_USER_MODEL = "users.User"  # or your app name
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Static: WhiteNoise serves hashed, gzip/brotli-precompressed copies made by collectstatic, cached forever.
+# Deploys with DJANGO_DEBUG=false must run `python manage.py collectstatic --noinput` as a build step.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "api.utils.media_serving.StaticFilesStorage"},
+}
+# Development serves from the app directories without collectstatic (and without warning that
+# STATIC_ROOT is missing); fixed here so the test runner's DEBUG=False does not turn it off.
+WHITENOISE_AUTOREFRESH = DEBUG
+
+# Media: api.utils.media_serving (ETag/304, ranges, immutable content-addressed files).
+# Point MEDIA_X_ACCEL_REDIRECT at an nginx internal location aliased to MEDIA_ROOT
+# (or set MEDIA_X_SENDFILE) so the web server streams the bytes instead of a Django worker.
+SERVE_MEDIA = os.environ.get("SERVE_MEDIA", "true").lower() in ("1", "true", "yes", "on")
+MEDIA_X_ACCEL_REDIRECT = os.environ.get("MEDIA_X_ACCEL_REDIRECT", "") or None
+MEDIA_X_SENDFILE = os.environ.get("MEDIA_X_SENDFILE", "false").lower() in ("1", "true", "yes", "on")
+
 # AUTHENTICATION_BACKENDS = [
 #     'accounts.backends.EmailBackend',   # custom email login
 #     'django.contrib.auth.backends.ModelBackend',  # fallback
@@ -164,7 +183,8 @@ REST_FRAMEWORK = {
 
 
 # Hostinger SMTP settings
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Pooled SMTP: warm connections, batched sends, per-host rate limits and retries (api.utils.smtp_pool)
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "api.utils.smtp_pool.PooledEmailBackend")
 EMAIL_HOST = os.environ.get("EMAIL_HOST", "smtp.hostinger.com")
 # Prefer TLS on 587 by default; override via env if your provider requires SSL on 465
 EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 465))
@@ -176,6 +196,9 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "admin@mitzwahjewellery.com"
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "Sugar7@Best")
 
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER or "no-reply@example.com")
+EMAIL_POOL_SIZE = int(os.environ.get("EMAIL_POOL_SIZE", 4))
+EMAIL_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get("EMAIL_MAX_MESSAGES_PER_CONNECTION", 100))
+EMAIL_RATE_LIMITS = {"smtp.hostinger.com": float(os.environ.get("EMAIL_HOSTINGER_RATE", 10))}  # messages/second
 
 RECAPTCHA_SECRET_KEY = os.environ.get("RECAPTCHA_SECRET_KEY", "")
 
@@ -193,4 +216,5 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-customer-token",
     "cache-control",
     "pragma",
+    "idempotency-key",
 ]
@@ -21,9 +21,9 @@
 #     path('admin/', admin.site.urls),
 # ]
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, include, re_path
 from django.conf import settings
+from api.utils.media_serving import serve_media
 
 urlpatterns = [
     path('fortress/admin/', admin.site.urls),
@@ -31,4 +31,8 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('api/', include('analytic.urls')),
     path("storefront/", include("storefront.urls")),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Served in production too (unlike static()); see api.utils.media_serving for the nginx/X-Sendfile hand-off
+if getattr(settings, "SERVE_MEDIA", True):
+    urlpatterns.append(re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", serve_media))
@@ -44,7 +44,7 @@ class CustomerTokenAuthentication(BaseAuthentication):
             return None  # Let other authenticators try
 
         try:
-            session = CustomerSessionToken.objects.get(key=key)
+            session = CustomerSessionToken.objects.select_related("customer__api_customer").get(key=key)
         except CustomerSessionToken.DoesNotExist:
             raise exceptions.AuthenticationFailed("Invalid or expired token")
 
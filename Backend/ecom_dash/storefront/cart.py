@@ -0,0 +1,198 @@
+"""
+Server-side cart pricing for the storefront.
+
+``cart_summary`` prices a customer's cart the same way checkout will (variant
+resolution, unit prices and ``api.utils.pricing``) and adds per-line charges
+plus the best coupon the cart qualifies for. Lines checkout would refuse for
+want of a variant are flagged ``needs_variant`` and left out of the totals.
+Results are cached per cart version: a digest of the cart rows, the
+products/variants they point at and the discount table, so any edit to those
+produces a fresh key.
+"""
+from __future__ import annotations
+
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from api.models import Discount
+from api.utils.pricing import HUNDRED, ZERO, Line, money, price_order, to_decimal
+
+from .models import CartItem
+
+CART_SUMMARY_CACHE_PREFIX = "storefront:cart_summary"
+
+
+def resolve_variant(variants, variant_id=None):
+    """
+    The variant a cart or checkout line is for: the one named by ``variant_id``,
+    else the product's only one. Returns ``(variant, ok)``; ``ok`` is False when
+    the named variant is not among ``variants`` or several exist and none is named.
+    """
+    if variant_id:
+        variant = next((pv for pv in variants if pv.id == variant_id), None)
+        return variant, variant is not None
+    if len(variants) > 1:
+        return None, False
+    return (variants[0] if variants else None), True
+
+
+def unit_price(product, variant=None) -> Decimal:
+    if variant is not None:
+        return Decimal(str(variant.selling_price or variant.mrp or product.selling_price or product.mrp or 0))
+    return Decimal(str(product.selling_price or product.mrp or 0))
+
+
+def _discounts_for(product_ids, today):
+    """
+    Active coupons per product in two queries: the product-specific links and
+    the store-wide ones. Mirrors ProductDetailSerializer._active_discounts_qs.
+    """
+    links = Discount.applies_to_products.through.objects.filter(
+        Q(discount__end_date__isnull=True) | Q(discount__end_date__gte=today),
+        product_id__in=product_ids,
+        discount__status="active",
+    ).select_related("discount")
+    specific = {}
+    for link in links:
+        specific.setdefault(link.product_id, []).append(link.discount)
+    store_wide = list(
+        Discount.objects.filter(Q(end_date__isnull=True) | Q(end_date__gte=today),
+                                status="active", applies_to_type="all_products")
+    )
+    return specific, store_wide
+
+
+def _unit_saving(discount, price: Decimal) -> Decimal:
+    value = to_decimal(discount.value)
+    if value <= 0:
+        return ZERO
+    off = price * value / HUNDRED if discount.type == "percentage" else value
+    return min(off, price)
+
+
+def cart_version(customer) -> str:
+    """Digest of everything the summary depends on; two queries."""
+    cart = CartItem.objects.filter(customer=customer).aggregate(
+        lines=Count("id", distinct=True),
+        cart=Max("updated_at"),
+        products=Max("product__updated_at"),
+        # The count catches a deleted variant, which leaves no newer updated_at behind.
+        variant_count=Count("product__variants", distinct=True),
+        variants=Max("product__variants__updated_at"),
+    )
+    # Every coupon's schedule and state, not just the latest updated_at: a queryset
+    # update (or a deleted coupon) moves start/end dates without touching it.
+    discounts = Discount.objects.order_by("id").values_list("id", "status", "start_date", "end_date", "updated_at")
+    raw = "|".join(
+        str(v) for v in (*cart.values(), *discounts, timezone.localdate())
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def build_cart_summary(customer) -> dict:
+    """Price the cart from scratch in a fixed number of queries (cart, variants, coupons x2)."""
+    items = list(
+        CartItem.objects.filter(customer=customer)
+        .select_related("product")
+        .prefetch_related("product__variants")
+        .order_by("-created_at")
+    )
+    today = timezone.localdate()
+    specific, store_wide = _discounts_for({item.product_id for item in items}, today)
+
+    rows, lines, delivery = [], [], ZERO
+    savings = {}  # discount id -> (discount, amount off across the cart)
+    for item in items:
+        product, quantity = item.product, int(item.quantity or 0)
+        if quantity <= 0:
+            continue
+        variants = list(product.variants.all())
+        variant, ok = resolve_variant(variants, item.variant_id)
+        if not ok:
+            # Checkout refuses these until a variant is picked; pricing one would promise a total it never charges.
+            rows.append({
+                "id": item.id,
+                "product_id": product.id,
+                "variant_id": None,
+                "variant_ids": sorted(pv.id for pv in variants),
+                "name": product.name,
+                "quantity": quantity,
+                "needs_variant": True,
+            })
+            continue
+        price = unit_price(product, variant)
+        gst_percent = to_decimal(product.gst)
+        line = Line(price, quantity, gst_percent)
+        line_delivery = to_decimal(product.delivery_charges) * quantity
+        lines.append(line)
+        delivery += line_delivery
+
+        # Product-specific coupons win over store-wide ones, as on the product page.
+        candidates = specific.get(product.id) or store_wide
+        best_line = None
+        for discount in candidates:
+            off = _unit_saving(discount, price) * quantity
+            total_off = savings.get(discount.id, (discount, ZERO))[1] + off
+            savings[discount.id] = (discount, total_off)
+            if off > 0 and (best_line is None or off > best_line[1]):
+                best_line = (discount, off)
+
+        mrp = variant.mrp if variant is not None and variant.mrp else product.mrp
+        rows.append({
+            "id": item.id,
+            "product_id": product.id,
+            "variant_id": variant.id if variant is not None else None,
+            "name": product.name,
+            "quantity": quantity,
+            "mrp": money(mrp or price),
+            "unit_price": money(price),
+            "line_total": money(line.total),
+            "gst_percent": money(gst_percent),
+            "gst_amount": money(line.total * gst_percent / HUNDRED),
+            "delivery_charge": money(line_delivery),
+            "best_discount": _discount_payload(*best_line) if best_line else None,
+            "needs_variant": False,
+        })
+
+    breakdown = price_order(lines, delivery=delivery)
+    best = max(savings.values(), key=lambda pair: pair[1], default=None)
+    return {
+        "lines": rows,
+        "item_count": sum(row["quantity"] for row in rows),
+        "needs_variant": any(row["needs_variant"] for row in rows),
+        "subtotal": breakdown.subtotal,
+        "gst_percent": breakdown.gst_percent,
+        "gst_amount": breakdown.gst_amount,
+        "delivery_charge": breakdown.delivery,
+        # Coupons are not applied at checkout yet, so the best one is reported
+        # alongside the total rather than deducted from it.
+        "discount": _discount_payload(*best) if best and best[1] > 0 else None,
+        "total": breakdown.total,
+    }
+
+
+def _discount_payload(discount, amount) -> dict:
+    return {
+        "id": discount.id,
+        "code": discount.code,
+        "name": discount.name,
+        "type": discount.type,
+        "value": discount.value,
+        "applies_to": discount.applies_to_type,
+        "amount": money(amount),
+    }
+
+
+def cart_summary(customer) -> dict:
+    version = cart_version(customer)
+    key = f"{CART_SUMMARY_CACHE_PREFIX}:{customer.pk}:{version}"
+    summary = cache.get(key)
+    if summary is None:
+        summary = {**build_cart_summary(customer), "version": version}
+        cache.set(key, summary, getattr(settings, "CART_SUMMARY_SECONDS", 300))
+    return summary
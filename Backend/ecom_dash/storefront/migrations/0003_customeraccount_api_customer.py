@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_api_customers(apps, schema_editor):
+    CustomerAccount = apps.get_model('storefront', 'CustomerAccount')
+    Customer = apps.get_model('api', 'Customer')
+    linked = set(CustomerAccount.objects.filter(api_customer__isnull=False).values_list('api_customer_id', flat=True))
+    unlinked = {}
+    for customer in Customer.objects.exclude(id__in=linked).order_by('id'):
+        unlinked.setdefault(customer.email.lower(), customer)
+    for account in CustomerAccount.objects.filter(api_customer__isnull=True):
+        customer = unlinked.pop(account.email.lower(), None)
+        if customer is None:
+            customer = Customer.objects.create(email=account.email, name=account.name, phone=account.phone or '')
+        account.api_customer = customer
+        account.save(update_fields=['api_customer'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_customerstats'),
+        ('storefront', '0002_productreview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customeraccount',
+            name='api_customer',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='account', to='api.customer'),
+        ),
+        migrations.RunPython(link_api_customers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_image_last_used'),
+        ('storefront', '0003_customeraccount_api_customer'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='cartitem',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='storefront_cart_items', to='api.productvariant'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cartitem',
+            unique_together={('customer', 'product', 'variant')},
+        ),
+    ]
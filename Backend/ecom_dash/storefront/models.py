@@ -28,6 +28,10 @@ class CustomerAccount(Timestamped):
     phone = models.CharField(max_length=20, blank=True, null=True)
     password_hash = models.CharField(max_length=256)
     is_active = models.BooleanField(default=True)
+    # Admin-side customer record that owns this account's orders
+    api_customer = models.OneToOneField(
+        "api.Customer", on_delete=models.SET_NULL, null=True, blank=True, related_name="account"
+    )
 
     def set_password(self, raw_password: str):
         self.password_hash = make_password(raw_password)
@@ -38,6 +42,23 @@ class CustomerAccount(Timestamped):
     def __str__(self):
         return f"{self.name} <{self.email}>"
 
+    def ensure_api_customer(self):
+        """
+        Return the linked api.Customer, creating or adopting one by email the
+        first time. Later calls are a plain attribute read.
+        """
+        if self.api_customer_id:
+            return self.api_customer
+        from api.models import Customer
+
+        # Only an unlinked record can be adopted; one linked to another account stays theirs.
+        customer = Customer.objects.filter(email__iexact=self.email, account__isnull=True).order_by("id").first()
+        if customer is None:
+            customer = Customer.objects.create(email=self.email, name=self.name, phone=self.phone or "")
+        self.api_customer = customer
+        self.save(update_fields=["api_customer", "updated_at"])
+        return customer
+
     @property
     def is_authenticated(self):
         # Allows DRF permission checks (IsAuthenticated) to treat CustomerAccount as an authenticated user.
@@ -76,10 +97,14 @@ class WishlistItem(Timestamped):
 class CartItem(Timestamped):
     customer = models.ForeignKey(CustomerAccount, on_delete=models.CASCADE, related_name="cart")
     product = models.ForeignKey("api.Product", on_delete=models.CASCADE, related_name="storefront_cart_items")
+    # The variant the customer picked; checkout needs one for products with several.
+    variant = models.ForeignKey(
+        "api.ProductVariant", on_delete=models.SET_NULL, null=True, blank=True, related_name="storefront_cart_items"
+    )
     quantity = models.PositiveIntegerField(default=1)
 
     class Meta:
-        unique_together = ("customer", "product")
+        unique_together = ("customer", "product", "variant")
 
 
 class ProductReview(Timestamped):
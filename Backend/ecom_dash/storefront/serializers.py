@@ -2,12 +2,28 @@ from rest_framework import serializers
 from django.db import models
 from decimal import Decimal
 from api.models import Product, ProductVariant, Discount, RPDProductLink, RichProductDescription, Order, OrderItem
+from api.models import normalize_order_status
+from api.serializers import ImageRecordsListSerializer
+from api.utils.image_derivatives import IMAGE_RECORDS_CONTEXT, image_metadata, srcsets
 from .models import CustomerAccount, Address, WishlistItem, CartItem, ProductReview
 
+# "delivered" predates the fixed status choices and still appears on old orders.
+REVIEWABLE_ORDER_STATUSES = (Order.COMPLETED, "delivered")
+
+
+def order_reviewable(order) -> bool:
+    """Whether the order has reached a status its products can be reviewed in."""
+    return normalize_order_status(order.status) in REVIEWABLE_ORDER_STATUSES
+
 class ProductVariantMiniSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
         fields = ["id", "name", "sku", "mrp", "selling_price", "stock", "images", "tags", "colors", "sizes", "created_at", "updated_at"]
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return instance.images or []
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -17,6 +33,9 @@ class ProductVariantMiniSerializer(serializers.ModelSerializer):
                 img if isinstance(img, str) and img.startswith("http") else request.build_absolute_uri(img)
                 for img in data.get("images") or []
             ]
+        records = self.context.get(IMAGE_RECORDS_CONTEXT)
+        data["srcset"] = srcsets(instance.images, request, records)
+        data["image_meta"] = image_metadata(instance.images, records)
         return data
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -38,6 +57,11 @@ class ProductListSerializer(serializers.ModelSerializer):
             "materials", "colors", "sizes", "occasions", "crystal_name",
             "rating_summary",
         ]
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return [*(instance.images or []), *(url for v in instance.variants.all() for url in v.images or [])]
 
     def _rating_summary(self, obj):
         agg = obj.product_reviews.aggregate(
@@ -69,6 +93,10 @@ class ProductListSerializer(serializers.ModelSerializer):
                         img if isinstance(img, str) and img.startswith("http") else request.build_absolute_uri(img)
                         for img in variant.get("images") or []
                     ]
+        # Width ladders for <img srcset> and placeholder metadata (api.utils.image_derivatives), aligned with "images".
+        records = self.context.get(IMAGE_RECORDS_CONTEXT)
+        data["srcset"] = srcsets(instance.images, request, records)
+        data["image_meta"] = image_metadata(instance.images, records)
         return data
 
 class RPDBlockSerializer(serializers.Serializer):
@@ -224,6 +252,10 @@ class ProductDetailSerializer(serializers.ModelSerializer):
                         img if isinstance(img, str) and img.startswith("http") else request.build_absolute_uri(img)
                         for img in variant.get("images") or []
                     ]
+        # Width ladders for <img srcset> and placeholder metadata (api.utils.image_derivatives), aligned with "images".
+        records = self.context.get(IMAGE_RECORDS_CONTEXT)
+        data["srcset"] = srcsets(instance.images, request, records)
+        data["image_meta"] = image_metadata(instance.images, records)
         return data
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -279,6 +311,11 @@ class WishlistItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = WishlistItem
         fields = ["id", "product", "product_id", "created_at"] # product_id is write-only
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return ProductListSerializer.image_urls(instance.product)
 
     def create(self, validated_data):
         # ✅ Attach product & customer correctly
@@ -305,9 +342,17 @@ class CartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), source="product", write_only=True
     )
+    variant_id = serializers.PrimaryKeyRelatedField(
+        queryset=ProductVariant.objects.all(), source="variant", required=False, allow_null=True
+    )
     class Meta:
         model = CartItem
-        fields = ["id", "product", "product_id", "quantity", "created_at"]
+        fields = ["id", "product", "product_id", "variant_id", "quantity", "created_at"]
+        list_serializer_class = ImageRecordsListSerializer
+
+    @staticmethod
+    def image_urls(instance):
+        return ProductListSerializer.image_urls(instance.product)
 
 
 class ProductReviewSerializer(serializers.ModelSerializer):
@@ -363,8 +408,7 @@ class ProductReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("This order does not belong to the signed-in customer.")
 
         # Only allow reviews once the order is completed/delivered
-        status_value = (order.status or "").strip().lower()
-        if status_value not in ("completed", "delivered"):
+        if not order_reviewable(order):
             raise serializers.ValidationError("You can review a product only after the order is completed.")
 
         order_item = order.items.filter(product_id=product_id).first()
@@ -407,13 +451,54 @@ class StorefrontOrderItemSerializer(serializers.ModelSerializer):
 class StorefrontOrderSerializer(serializers.ModelSerializer):
     items = StorefrontOrderItemSerializer(many=True, read_only=True)
     total = serializers.DecimalField(source="total_amount", max_digits=10, decimal_places=2, coerce_to_string=False)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False)
+    gst_amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False)
+    delivery_charge = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False)
     date = serializers.DateTimeField(source="created_at")
 
     class Meta:
         model = Order
-        fields = ["id", "status", "payment_method", "total", "date", "items"]
+        fields = ["id", "status", "payment_method", "subtotal", "gst_amount", "delivery_charge", "total", "date", "items"]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         data["status"] = (getattr(instance, "status", "") or "").lower()
         return data
+
+
+class CustomerOrderItemSerializer(StorefrontOrderItemSerializer):
+    """
+    Order history line with a thumbnail and review state. Expects the items
+    prefetched from their orders with the product joined, and
+    ``context["reviews"]`` mapping (order_id, product_id) -> review id for the
+    page (see customer_orders).
+    """
+    image = serializers.SerializerMethodField()
+    review_id = serializers.SerializerMethodField()
+    can_review = serializers.SerializerMethodField()
+
+    class Meta(StorefrontOrderItemSerializer.Meta):
+        fields = StorefrontOrderItemSerializer.Meta.fields + ["image", "review_id", "can_review"]
+
+    def get_image(self, obj):
+        images = (obj.product.images or []) if obj.product_id and obj.product else []
+        image = images[0] if images else None
+        request = self.context.get("request")
+        if image and request and isinstance(image, str) and not image.startswith("http"):
+            return request.build_absolute_uri(image)
+        return image
+
+    def get_review_id(self, obj):
+        return self.context.get("reviews", {}).get((obj.order_id, obj.product_id))
+
+    def get_can_review(self, obj):
+        # Same rule ProductReviewSerializer.validate enforces: completed order, linked product, one review each.
+        return (
+            bool(obj.product_id)
+            and order_reviewable(obj.order)
+            and self.get_review_id(obj) is None
+        )
+
+
+class CustomerOrderSerializer(StorefrontOrderSerializer):
+    items = CustomerOrderItemSerializer(many=True, read_only=True)
@@ -1,3 +1,508 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import (
+    Banner, Customer, Discount, HomeCollageItem, IdempotencyKey, Order, OrderItem, Product, ProductVariant, ResponsiveImage,
+)
+from api.serializers import CustomerAccountSerializer
+from api.utils import pricing
+
+from .auth import issue_customer_token
+from .models import CartItem, CustomerAccount, ProductReview
+
+
+def _account(n):
+    account = CustomerAccount.objects.create(name=f"Buyer {n}", email=f"buyer{n}@example.com")
+    account.ensure_api_customer()
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {issue_customer_token(account).key}")
+    return account, client
+
+
+class ApiCustomerLinkTests(TestCase):
+    def test_adopts_unlinked_record_with_same_email(self):
+        customer = Customer.objects.create(name="Walk-in", email="Ann@Example.com", phone="")
+        account = CustomerAccount.objects.create(name="Ann", email="ann@example.com")
+
+        self.assertEqual(account.ensure_api_customer(), customer)
+
+    def test_never_takes_over_another_accounts_record(self):
+        first = CustomerAccount.objects.create(name="Ann", email="ann@example.com")
+        taken = first.ensure_api_customer()
+        serializer = CustomerAccountSerializer(first, data={"email": "ann@new.example.com"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        second = CustomerAccount.objects.create(name="Other Ann", email="ann@example.com")
+
+        customer = second.ensure_api_customer()
+
+        self.assertNotEqual(customer, taken)
+        self.assertEqual(customer.email, "ann@example.com")
+        taken.refresh_from_db()
+        self.assertEqual(taken.email, "ann@new.example.com")
+
+
+class CheckoutStockTests(TestCase):
+    def setUp(self):
+        self.account, self.client = _account(0)
+        self.ring = Product.objects.create(name="Ring", mrp=500, selling_price=400, stock=5)
+        self.chain = Product.objects.create(name="Chain", mrp=900, selling_price=800, stock=1)
+
+    def test_checkout_decrements_stock_and_clears_cart(self):
+        CartItem.objects.create(customer=self.account, product=self.ring, quantity=2)
+        CartItem.objects.create(customer=self.account, product=self.chain, quantity=1)
+
+        res = self.client.post("/storefront/checkout/", {"payment_method": "cod"}, format="json")
+
+        self.assertEqual(res.status_code, 201)
+        self.ring.refresh_from_db()
+        self.chain.refresh_from_db()
+        self.assertEqual(self.ring.stock, 3)
+        self.assertEqual((self.chain.stock, self.chain.status), (0, "out_of_stock"))
+        self.assertEqual(OrderItem.objects.count(), 2)
+        self.assertFalse(CartItem.objects.filter(customer=self.account).exists())
+
+    def test_shortage_rolls_back_whole_order(self):
+        items = [{"product_id": self.ring.id, "quantity": 1}, {"product_id": self.chain.id, "quantity": 2}]
+
+        res = self.client.post("/storefront/checkout/", {"items": items}, format="json")
+
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.json()["items"], [{"productId": self.chain.id, "requested": 2, "available": 1}])
+        self.ring.refresh_from_db()
+        self.assertEqual(self.ring.stock, 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_variant_product_line_uses_variant_stock(self):
+        pendant = Product.objects.create(name="Pendant", stock=0)
+        variant = ProductVariant.objects.create(product=pendant, name="Gold", mrp=300, selling_price=250, stock=2)
+
+        res = self.client.post(
+            "/storefront/checkout/", {"items": [{"product_id": pendant.id, "quantity": 2}]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, 201)
+        variant.refresh_from_db()
+        self.assertEqual(variant.stock, 0)
+        self.assertEqual(OrderItem.objects.get().price, 250)
+
+    def test_line_for_product_with_several_variants_needs_variant_id(self):
+        pendant = Product.objects.create(name="Pendant", stock=0)
+        gold = ProductVariant.objects.create(product=pendant, name="Gold", mrp=300, selling_price=250, stock=2)
+        silver = ProductVariant.objects.create(product=pendant, name="Silver", mrp=200, selling_price=150, stock=2)
+
+        res = self.client.post(
+            "/storefront/checkout/", {"items": [{"product_id": pendant.id, "quantity": 1}]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()["items"], [{"productId": pendant.id, "variantIds": sorted([gold.id, silver.id])}])
+        self.assertFalse(Order.objects.exists())
+
+        res = self.client.post(
+            "/storefront/checkout/",
+            {"items": [{"product_id": pendant.id, "variant_id": gold.id, "quantity": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(OrderItem.objects.get().price, 250)
+
+    def test_cart_remembers_the_chosen_variant(self):
+        pendant = Product.objects.create(name="Pendant", stock=0)
+        gold = ProductVariant.objects.create(product=pendant, name="Gold", mrp=300, selling_price=250, stock=2)
+        silver = ProductVariant.objects.create(product=pendant, name="Silver", mrp=200, selling_price=150, stock=2)
+        for variant in (gold, silver, gold):
+            res = self.client.post("/storefront/cart/", {"product_id": pendant.id, "variant_id": variant.id}, format="json")
+            self.assertIn(res.status_code, (200, 201))
+            self.assertEqual(res.json()["variantId"], variant.id)
+
+        res = self.client.post("/storefront/checkout/", {"payment_method": "cod"}, format="json")
+
+        self.assertEqual(res.status_code, 201)
+        lines = {item.name: (item.price, item.quantity) for item in OrderItem.objects.all()}
+        self.assertEqual(lines, {"Pendant - Gold": (250, 2), "Pendant - Silver": (150, 1)})
+        gold.refresh_from_db()
+        silver.refresh_from_db()
+        self.assertEqual((gold.stock, silver.stock), (0, 1))
+
+    def test_cart_rejects_variant_of_another_product(self):
+        other = ProductVariant.objects.create(product=self.chain, name="Long", mrp=900, selling_price=850, stock=1)
+
+        res = self.client.post("/storefront/cart/", {"product_id": self.ring.id, "variant_id": other.id}, format="json")
+
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_query_count_does_not_grow_with_lines(self):
+        products = [Product.objects.create(name=f"Bead {i}", mrp=10, selling_price=10, stock=10) for i in range(12)]
+
+        def checkout(lines):
+            items = [{"product_id": p.id, "quantity": 1} for p in lines]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.post("/storefront/checkout/", {"items": items}, format="json").status_code, 201)
+            return queries
+
+        self.assertEqual(len(checkout(products[:2])), len(checkout(products)))
+
+
+class CheckoutIdempotencyTests(TestCase):
+    def setUp(self):
+        self.account, self.client = _account(0)
+        self.ring = Product.objects.create(name="Ring", mrp=500, selling_price=400, stock=5)
+        self.body = {"items": [{"product_id": self.ring.id, "quantity": 1}]}
+
+    def post(self, body, key="retry-1"):
+        return self.client.post("/storefront/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response_without_new_order(self):
+        first = self.post(self.body)
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post(self.body)
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.ring.refresh_from_db()
+        self.assertEqual(self.ring.stock, 4)
+        # Token auth plus the key lookup; nothing else runs.
+        self.assertEqual(len(queries), 2)
+
+    def test_key_reused_with_other_body_is_rejected(self):
+        self.post(self.body)
+
+        res = self.post({"items": [{"product_id": self.ring.id, "quantity": 2}]})
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_new_key_places_new_order(self):
+        self.post(self.body, key="a")
+        self.post(self.body, key="b")
+
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_order_rolls_back_when_response_cannot_be_stored(self):
+        with mock.patch.object(IdempotencyKey, "save", side_effect=DatabaseError("disk full")):
+            with self.assertRaises(DatabaseError):
+                self.post(self.body)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.ring.refresh_from_db()
+        self.assertEqual(self.ring.stock, 5)
+        self.assertEqual(self.post(self.body).status_code, 201)
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account, self.client = _account(0)
+        self.ring = Product.objects.create(name="Ring", mrp=500, selling_price=400, stock=5, gst="3", delivery_charges=50)
+        self.chain = Product.objects.create(name="Chain", mrp=900, selling_price=800, stock=1, gst="3")
+        CartItem.objects.create(customer=self.account, product=self.ring, quantity=2)
+        CartItem.objects.create(customer=self.account, product=self.chain, quantity=1)
+
+    def summary(self):
+        res = self.client.get("/storefront/cart/summary/")
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def test_totals_match_checkout_pricing(self):
+        data = self.summary()
+
+        self.assertEqual(data["itemCount"], 3)
+        self.assertEqual(data["subtotal"], 1600)
+        self.assertEqual(data["gstAmount"], 48)
+        self.assertEqual(data["deliveryCharge"], 100)
+        self.assertEqual(data["total"], 1748)
+        self.assertIsNone(data["discount"])
+
+        body = {"payment_method": "cod", "delivery_charge": data["deliveryCharge"]}
+        order = self.client.post("/storefront/checkout/", body, format="json").json()["order"]
+        self.assertEqual(order["total"], data["total"])
+
+    def test_best_coupon_across_cart(self):
+        store_wide = Discount.objects.create(name="Ten", code="TEN", type="percentage", value=10, status="active")
+        flat = Discount.objects.create(
+            name="Ring flat", code="RING", type="fixed", value=150, status="active", applies_to_type="specific_products"
+        )
+        flat.applies_to_products.add(self.ring)
+
+        data = self.summary()
+
+        # RING saves 300 on two rings; TEN only reaches the chain once RING claims the ring line.
+        self.assertEqual(data["discount"]["code"], "RING")
+        self.assertEqual(data["discount"]["amount"], 300)
+        lines = {line["productId"]: line for line in data["lines"]}
+        self.assertEqual(lines[self.chain.id]["bestDiscount"]["code"], store_wide.code)
+
+    def test_cached_until_cart_changes(self):
+        first = self.summary()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.summary(), first)
+        # Token auth plus the two version queries.
+        self.assertEqual(len(queries), 3)
+
+        item = CartItem.objects.get(product=self.chain)
+        self.client.patch(f"/storefront/cart/{item.id}/", {"quantity": 2}, format="json")
+
+        changed = self.summary()
+        self.assertNotEqual(changed["version"], first["version"])
+        self.assertEqual(changed["subtotal"], 2400)
+
+    def test_summary_total_is_what_checkout_charges_for_variant_lines(self):
+        ProductVariant.objects.create(product=self.ring, name="Silver", mrp=300, selling_price=200, stock=5)
+        gold = ProductVariant.objects.create(product=self.ring, name="Gold", mrp=500, selling_price=450, stock=5)
+        CartItem.objects.filter(product=self.ring).update(variant=gold)
+
+        data = self.summary()
+
+        self.assertFalse(data["needsVariant"])
+        lines = {line["productId"]: line for line in data["lines"]}
+        self.assertEqual((lines[self.ring.id]["variantId"], lines[self.ring.id]["unitPrice"]), (gold.id, 450))
+        body = {"payment_method": "cod", "delivery_charge": data["deliveryCharge"]}
+        res = self.client.post("/storefront/checkout/", body, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.json()["order"]["total"], data["total"])
+
+    def test_line_without_variant_is_flagged_not_priced(self):
+        silver = ProductVariant.objects.create(product=self.ring, name="Silver", mrp=300, selling_price=200, stock=5)
+        gold = ProductVariant.objects.create(product=self.ring, name="Gold", mrp=500, selling_price=450, stock=5)
+
+        data = self.summary()
+
+        self.assertTrue(data["needsVariant"])
+        lines = {line["productId"]: line for line in data["lines"]}
+        self.assertTrue(lines[self.ring.id]["needsVariant"])
+        self.assertEqual(lines[self.ring.id]["variantIds"], sorted([silver.id, gold.id]))
+        self.assertNotIn("unitPrice", lines[self.ring.id])
+        self.assertEqual((data["subtotal"], data["total"]), (800, 824))
+        res = self.client.post("/storefront/checkout/", {"payment_method": "cod"}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+    def test_deleted_variant_changes_version(self):
+        cheap = ProductVariant.objects.create(product=self.ring, name="Silver", mrp=300, selling_price=200, stock=5)
+        ProductVariant.objects.create(product=self.ring, name="Gold", mrp=500, selling_price=450, stock=5)
+        first = self.summary()
+
+        cheap.delete()
+
+        changed = self.summary()
+        self.assertNotEqual(changed["version"], first["version"])
+        # The ring line was waiting for a variant; with one left it is priced at Gold.
+        self.assertEqual((first["needsVariant"], changed["needsVariant"]), (True, False))
+        self.assertEqual(changed["subtotal"], first["subtotal"] + 900)
+
+    def test_discount_schedule_change_changes_version(self):
+        discount = Discount.objects.create(name="Ten", code="TEN", type="percentage", value=10, status="active")
+        first = self.summary()
+
+        Discount.objects.filter(pk=discount.pk).update(start_date=timezone.localdate())
+
+        self.assertNotEqual(self.summary()["version"], first["version"])
+
+    def test_query_count_does_not_grow_with_lines(self):
+        def count():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.summary()
+            return len(queries)
+
+        few = count()
+        for i in range(10):
+            product = Product.objects.create(name=f"Bead {i}", mrp=10, selling_price=10, stock=10)
+            ProductVariant.objects.create(product=product, name="Silver", mrp=12, selling_price=11, stock=3)
+            CartItem.objects.create(customer=self.account, product=product, quantity=1)
+        self.assertEqual(count(), few)
+
+
+class ProductListImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def product(self, n):
+        product = Product.objects.create(name=f"Ring {n}", mrp=10, selling_price=10, stock=1, images=[f"/media/products/p{n}.avif"])
+        ProductVariant.objects.create(
+            product=product, name="Gold", mrp=12, selling_price=11, stock=1, images=[f"/media/products/v{n}.avif"]
+        )
+        for path in (f"products/p{n}.avif", f"products/v{n}.avif"):
+            ResponsiveImage.objects.create(
+                source=path, status=ResponsiveImage.DONE, width=640, height=480, placeholder="data:image/webp;base64,AA",
+                renditions=[{"width": 320, "height": 240, "avif": f"derivatives/{path}.avif", "webp": f"derivatives/{path}.webp"}],
+            )
+
+    def test_one_image_lookup_per_page(self):
+        for n in range(4):
+            self.product(n)
+
+        # Products, their variants, a rating aggregate per product, and one
+        # ResponsiveImage query for every product and variant image on the page.
+        with self.assertNumQueries(3 + 4):
+            res = self.client.get("/storefront/products/")
+
+        self.assertEqual(res.status_code, 200)
+        for item in res.json():
+            self.assertIn("320w", item["srcset"][0]["avif"])
+            self.assertEqual(item["imageMeta"][0]["width"], 640)
+            self.assertIn("320w", item["variants"][0]["srcset"][0]["webp"])
+
+
+class HomeImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def derivatives(self, path):
+        ResponsiveImage.objects.update_or_create(source=path, defaults={
+            "status": ResponsiveImage.DONE, "width": 640, "height": 480, "placeholder": "data:image/webp;base64,AA",
+            "renditions": [{"width": 320, "height": 240, "avif": f"derivatives/{path}.avif", "webp": f"derivatives/{path}.webp"}],
+        })
+
+    def test_banners_share_one_image_lookup(self):
+        for n in range(3):
+            Banner.objects.create(title=f"Sale {n}", image=f"banners/b{n}.avif", status="Active", start_date=timezone.localdate())
+            self.derivatives(f"banners/b{n}.avif")
+
+        with self.assertNumQueries(2):
+            res = self.client.get("/storefront/banners/")
+
+        self.assertEqual([b["imageMeta"]["width"] for b in res.json()], [640] * 3)
+
+    def test_collage_tiles_share_one_image_lookup(self):
+        for n in range(3):
+            HomeCollageItem.objects.create(name=f"Tile {n}", item_type="occasion", image=f"collages/c{n}.avif")
+            self.derivatives(f"collages/c{n}.avif")
+
+        with self.assertNumQueries(2):
+            res = self.client.get("/storefront/collage-items/")
+
+        self.assertEqual([t["imageSrcset"]["width"] for t in res.json()["occasion"]], [640] * 3)
+
+
+class CustomerOrdersTests(TestCase):
+    def setUp(self):
+        self.account, self.client = _account(0)
+        self.customer = self.account.api_customer
+        self.ring = Product.objects.create(name="Ring", mrp=500, selling_price=400, stock=5, images=["/media/ring.avif"])
+
+    def order(self, status="completed", lines=1):
+        order = Order.objects.create(customer=self.customer, total_amount=400 * lines, status=status)
+        for _ in range(lines):
+            OrderItem.objects.create(order=order, product=self.ring, name="Ring", price=400, quantity=1)
+        return order
+
+    def test_pages_newest_first(self):
+        orders = [self.order() for _ in range(3)]
+
+        first = self.client.get("/storefront/orders/", {"page_size": 2}).json()
+        second = self.client.get(first["next"]).json()
+
+        self.assertEqual([o["id"] for o in first["results"]], [orders[2].id, orders[1].id])
+        self.assertEqual([o["id"] for o in second["results"]], [orders[0].id])
+        self.assertIsNone(second["next"])
+
+    def test_items_carry_review_state(self):
+        reviewed, open_, pending = self.order(), self.order(), self.order(status="pending")
+        review = ProductReview.objects.create(
+            customer=self.account, order=reviewed, product=self.ring, order_item=reviewed.items.get(), rating=5
+        )
+
+        results = {o["id"]: o["items"][0] for o in self.client.get("/storefront/orders/").json()["results"]}
+
+        self.assertEqual((results[reviewed.id]["reviewId"], results[reviewed.id]["canReview"]), (review.id, False))
+        self.assertEqual((results[open_.id]["reviewId"], results[open_.id]["canReview"]), (None, True))
+        self.assertFalse(results[pending.id]["canReview"])
+        self.assertTrue(results[open_.id]["image"].endswith("/media/ring.avif"))
+
+    def test_legacy_delivered_orders_can_be_reviewed(self):
+        delivered = self.order()
+        Order.objects.filter(pk=delivered.pk).update(status="delivered")
+
+        item = self.client.get("/storefront/orders/").json()["results"][0]["items"][0]
+
+        self.assertTrue(item["canReview"])
+
+    def test_query_count_does_not_grow_with_orders(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get("/storefront/orders/").status_code, 200)
+            return len(queries)
+
+        self.order(lines=1)
+        few = count()
+        for _ in range(6):
+            self.order(lines=3)
+        self.assertEqual(count(), few)
+
+
+class InterleavedCheckoutTests(TestCase):
+    """
+    Runs anywhere (SQLite included): a second checkout is slipped in after the
+    first one has loaded the product (stock 1) and before it reserves, the
+    window where a read-then-write stock check would oversell.
+    """
+
+    def test_only_one_checkout_gets_the_last_unit(self):
+        product = Product.objects.create(name="Last one", mrp=100, selling_price=100, stock=1)
+        body = {"items": [{"product_id": product.id, "quantity": 1}]}
+        (_, first), (_, second) = _account(0), _account(1)
+        waiting, cut_in = [second], []
+
+        def price_order(*args, **kwargs):
+            if waiting:
+                cut_in.append(waiting.pop().post("/storefront/checkout/", body, format="json"))
+            return pricing.price_order(*args, **kwargs)
+
+        with mock.patch("storefront.views.price_order", side_effect=price_order):
+            res = first.post("/storefront/checkout/", body, format="json")
+
+        self.assertEqual(cut_in[0].status_code, 201)
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.json()["items"], [{"productId": product.id, "requested": 1, "available": 0}])
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.status), (0, "out_of_stock"))
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Needs a server database (PostgreSQL/MySQL); the SQLite test database is shared-cache in-memory and locks whole tables."""
+
+    buyers = 8
+    stock = 3
+
+    def test_concurrent_checkouts_never_oversell(self):
+        product = Product.objects.create(name="Last few", mrp=100, selling_price=100, stock=self.stock)
+        clients = [_account(n)[1] for n in range(self.buyers)]
+        barrier = threading.Barrier(self.buyers)
+        statuses = []
+
+        def buy(client):
+            try:
+                barrier.wait()
+                res = client.post(
+                    "/storefront/checkout/", {"items": [{"product_id": product.id, "quantity": 1}]}, format="json"
+                )
+                statuses.append(res.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(c,)) for c in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        product.refresh_from_db()
+        self.assertEqual(sorted(statuses), [201] * self.stock + [409] * (self.buyers - self.stock))
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(OrderItem.objects.filter(product=product).count(), self.stock)
@@ -2,10 +2,11 @@ from django.shortcuts import render
 import logging
 
 # Create your views here.
-from django.db.models import Q, F
+from django.db.models import F, Max, Prefetch, Q
 from django.utils import timezone
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 
 from api.models import Product, ProductVariant, Order, OrderItem, HomeCollageItem, Customer
@@ -22,7 +23,12 @@ from .permissions import IsCustomerAuthenticated
 from api.models import Banner
 from api.serializers import BannerSerializer
 from datetime import date
-from api.utils.email_utils import send_order_status_email
+from api.utils.outbox import enqueue_order_status_emails
+from api.utils.inventory import InsufficientStock, reserve_stock
+from api.utils.idempotency import run_idempotent
+from api.utils.pricing import Line, price_order, to_decimal
+from .cart import cart_summary, resolve_variant, unit_price
+from django.db import transaction
 
 TAG_SYNONYMS = {
     "Limited Deal": ["Limited Deal", "Limited Offer", "Limited Offer Deals", "Limited Deals"],
@@ -245,6 +251,8 @@ def products_by_tag(request):
             "imageUrl": image,
             "category": p.main_category or "",
             "badge": map_badge(canonical_tag),
+            # The variant the card's price belongs to; add-to-cart sends it along.
+            "selectedVariantId": v.id if v else None,
             "inStock": (getattr(p, "status", None) != "out_of_stock") or (v.stock > 0 if v else (p.stock or 0) > 0),
             "dealEndsAt": p.limited_deal_ends_at.isoformat() if getattr(p, "limited_deal_ends_at", None) else None,
         })
@@ -321,6 +329,7 @@ class CustomerAuthViewSet(viewsets.ViewSet):
         if not s.is_valid():
             return Response(s.errors, status=400)
         customer = s.save()
+        customer.ensure_api_customer()
         token_obj = issue_customer_token(customer)
         return Response({"token": token_obj.key, "customer": {"id": customer.id, "name": customer.name, "email": customer.email}}, status=201)
 
@@ -373,7 +382,7 @@ class WishlistViewSet(viewsets.ModelViewSet):
         # print(f"🔍 DEBUG: [WishlistViewSet.get_queryset] Fetching wishlist for customer: {self.request.customer.id}")
         qs = WishlistItem.objects.filter(
             customer=self.request.customer
-        ).select_related("product")
+        ).select_related("product").prefetch_related("product__variants")
         # 🔍 DEBUG: [views.py] Found wishlist items.
         # print(f"🔍 DEBUG: [WishlistViewSet.get_queryset] Found {qs.count()} items.")
         return qs
@@ -428,6 +437,7 @@ class CartViewSet(viewsets.ModelViewSet):
         return (CartItem.objects
                 .filter(customer=self.request.customer)
                 .select_related("product")
+                .prefetch_related("product__variants")
                 .order_by("-created_at"))
 
     def perform_create(self, serializer):
@@ -442,6 +452,7 @@ class CartViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Auth required"}, status=401)
 
         product_id = request.data.get("product_id") or request.data.get("product")
+        variant_id = request.data.get("variant_id") or request.data.get("variant")
         quantity = request.data.get("quantity") or 1
 
         if not product_id:
@@ -452,10 +463,17 @@ class CartViewSet(viewsets.ModelViewSet):
         except Product.DoesNotExist:
             return Response({"detail": "Product not found"}, status=404)
 
+        variant = None
+        if variant_id:
+            variant = ProductVariant.objects.filter(id=variant_id, product=product).first()
+            if variant is None:
+                return Response({"detail": "Variant not found"}, status=404)
+
         try:
             cart_item, created = CartItem.objects.get_or_create(
                 customer=customer,
                 product=product,
+                variant=variant,
                 defaults={"quantity": quantity},
             )
             if not created:
@@ -466,6 +484,11 @@ class CartViewSet(viewsets.ModelViewSet):
         except Exception as exc:
             return Response({"detail": "Could not add to cart", "error": str(exc)}, status=500)
 
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request):
+        """Priced cart (line totals, GST, delivery, best coupon, total) without the product payloads."""
+        return Response(cart_summary(request.customer))
+
 
 class ProductReviewViewSet(viewsets.ModelViewSet):
     """
@@ -519,13 +542,13 @@ def checkout(request):
     {
       "payment_method": "cod" | "prepaid",
       "address_id": 123 (optional; if omitted, use default),
-      "items": [ { "product_id": 1, "quantity": 2 }, ... ]  // optional; if omitted, use cart
+      "items": [ { "product_id": 1, "variant_id": 7, "quantity": 2 }, ... ]  // optional; if omitted, use cart
     }
-    Creates api.Order + api.OrderItem with computed totals.
+    Creates api.Order + api.OrderItem with computed totals. Lines for a product
+    with more than one variant need a variant_id (400 otherwise).
+    Send an ``Idempotency-Key`` header to make retries safe.
     """
-    from decimal import Decimal
     from .auth import CustomerTokenAuthentication
-    from .serializers import StorefrontOrderSerializer
 
     auth = CustomerTokenAuthentication()
     auth_pair = auth.authenticate(request)
@@ -533,24 +556,27 @@ def checkout(request):
         return Response({"detail": "Auth required"}, status=401)
     sf_customer = request.customer
 
-    # Ensure the FK to api.Customer is populated (required field on Order)
-    api_customer, created = Customer.objects.get_or_create(
-        email=sf_customer.email,
-        defaults={
-            "name": sf_customer.name,
-            "phone": sf_customer.phone or "",
-        },
+    # Retries carrying the same Idempotency-Key get the first response back.
+    return run_idempotent(
+        request, "storefront.checkout", f"customer:{sf_customer.pk}", lambda: _place_order(request, sf_customer)
     )
-    if not created:
-        updated_fields = []
-        if sf_customer.name and api_customer.name != sf_customer.name:
-            api_customer.name = sf_customer.name
-            updated_fields.append("name")
-        if sf_customer.phone and api_customer.phone != sf_customer.phone:
-            api_customer.phone = sf_customer.phone
-            updated_fields.append("phone")
-        if updated_fields:
-            api_customer.save(update_fields=updated_fields)
+
+
+def _place_order(request, sf_customer):
+    from decimal import Decimal
+    from .serializers import StorefrontOrderSerializer
+
+    # Linked api.Customer (required FK on Order); created once and persisted on the account
+    api_customer = sf_customer.ensure_api_customer()
+    updated_fields = []
+    if sf_customer.name and api_customer.name != sf_customer.name:
+        api_customer.name = sf_customer.name
+        updated_fields.append("name")
+    if sf_customer.phone and api_customer.phone != sf_customer.phone:
+        api_customer.phone = sf_customer.phone
+        updated_fields.append("phone")
+    if updated_fields:
+        api_customer.save(update_fields=updated_fields)
 
     payload = request.data or {}
     pay_method_raw = payload.get("payment_method") or "cod"
@@ -567,135 +593,123 @@ def checkout(request):
     else:
         addr = Address.objects.filter(customer=sf_customer, is_default=True).first() or Address.objects.filter(customer=sf_customer).first()
 
-    # Items: use provided list OR fall back to cart
+    # Items: use provided list OR fall back to cart. Quantities are merged per
+    # (product, variant) so the stock check sees the real demand for each row.
     items = payload.get("items")
+    requested = {}
     if items and isinstance(items, list):
         # ad-hoc items
-        cart_lines = []
         for it in items:
             try:
-                p = Product.objects.get(id=it["product_id"])
+                pid = int(it["product_id"])
+                vid = int(it["variant_id"]) if it.get("variant_id") else None
                 qty = int(it.get("quantity", 1))
-                if qty <= 0:
-                    continue
-                cart_lines.append((p, qty))
             except Exception:
                 continue
+            if qty > 0:
+                requested[(pid, vid)] = requested.get((pid, vid), 0) + qty
     else:
         # use full cart
-        cart_qs = CartItem.objects.filter(customer=sf_customer).select_related("product")
-        cart_lines = [(ci.product, ci.quantity) for ci in cart_qs]
-
+        rows = CartItem.objects.filter(customer=sf_customer).values_list("product_id", "variant_id", "quantity")
+        for pid, vid, qty in rows:
+            if qty > 0:
+                requested[(pid, vid)] = requested.get((pid, vid), 0) + qty
+
+    products = Product.objects.prefetch_related("variants").in_bulk({pid for pid, _ in requested})
+    cart_lines, ambiguous = [], []
+    for (pid, vid), qty in requested.items():
+        p = products.get(pid)
+        if p is None:
+            continue
+        product_variants = list(p.variants.all())
+        # Variant products keep their stock on the variants; a single one is unambiguous,
+        # but with several (differing in price and stock) never pick one on the customer's behalf.
+        v, ok = resolve_variant(product_variants, vid)
+        if not ok:
+            if not vid:
+                ambiguous.append({"product_id": p.id, "variant_ids": sorted(pv.id for pv in product_variants)})
+            continue
+        cart_lines.append((p, v, qty))
+
+    if ambiguous:
+        return Response({"detail": "variant_id is required for these products", "items": ambiguous}, status=400)
     if not cart_lines:
         return Response({"detail": "No items to checkout"}, status=400)
 
-    # Compute totals
-    subtotal = Decimal("0")
-    for p, qty in cart_lines:
-        price = p.selling_price or p.mrp or 0
-        subtotal += (Decimal(str(price)) * Decimal(str(qty)))
-
-    # Charges: accept optional overrides from client (Total Payable flow). Fall back to 0.
-    # We still compute a safe subtotal and guard against negative/underflow totals.
-    def _parse_pct(val):
-        if val in (None, ""):
-            return Decimal("0")
-        try:
-            sval = str(val).replace("%", "").strip()
-            return Decimal(sval)
-        except Exception:
-            return Decimal("0")
-
-    raw_gst_percent = payload.get("gst_percent", None)
-    gst_percent = _parse_pct(raw_gst_percent)
-    delivery_charge = Decimal(str(payload.get("delivery_charge", "0") or "0"))
-    client_total = payload.get("total")
-    client_total_dec = None
-    try:
-        if client_total is not None:
-            client_total_dec = Decimal(str(client_total))
-    except Exception:
-        client_total_dec = None
-
-    # Compute GST amount from selling price and GST% (payload overrides product.gst)
-    gst_amount = Decimal("0")
-    for p, qty in cart_lines:
-        line_total = Decimal(str(p.selling_price or p.mrp or 0)) * Decimal(str(qty))
-        item_gst_percent = gst_percent
-        # fallback to product.gst if provided and global gst_percent is 0
-        if item_gst_percent in (None, "", Decimal("0")):
-            item_gst_percent = _parse_pct(getattr(p, "gst", None))
-        if item_gst_percent not in (None, "", Decimal("0")):
-            gst_amount += (line_total * item_gst_percent) / Decimal("100")
-            # If global gst_percent is empty, adopt the first non-zero item percent
-            if gst_percent in (None, "", Decimal("0")) and item_gst_percent not in (None, "", Decimal("0")):
-                gst_percent = item_gst_percent
-
-    # If the client sent a total and GST is still zero, derive GST from the remaining delta after delivery.
-    if client_total_dec is not None and gst_amount == 0:
-        delta = client_total_dec - subtotal - delivery_charge
-        if delta > 0:
-            gst_amount = delta
-            if subtotal > 0 and gst_percent in (None, "", Decimal("0")):
-                gst_percent = (gst_amount / subtotal) * Decimal("100")
-
-    order = Order.objects.create(
-        customer=api_customer,
-        total_amount=subtotal,  # will adjust below if gst/delivery needed
-        status="pending",  # new orders start as pending until accepted in admin
-        payment_method=pay_method,
-        address_line1=getattr(addr, "line1", None) if addr else None,
-        address_line2=getattr(addr, "line2", None) if addr else None,
-        city=getattr(addr, "city", None) if addr else None,
-        state=getattr(addr, "state", None) if addr else None,
-        pincode=getattr(addr, "pincode", None) if addr else None,
-        gst_percent=gst_percent,
-        delivery_charge=delivery_charge,
+    # Charges: the client may send a GST rate, delivery charge and the Total Payable it showed;
+    # api.utils.pricing reconciles them with the server-side prices.
+    breakdown = price_order(
+        [Line(unit_price(p, v), qty, to_decimal(getattr(p, "gst", None))) for p, v, qty in cart_lines],
+        gst_percent=payload.get("gst_percent"),
+        delivery=payload.get("delivery_charge"),
+        client_total=payload.get("total"),
     )
 
-    for p, qty in cart_lines:
-        safe_name = (getattr(p, "name", None) or getattr(p, "unique_code", None) or f"Product #{p.id}")
-        safe_sku = getattr(p, "unique_code", None) or getattr(p, "sku", None)
-        OrderItem.objects.create(
-            order=order,
-            product=p,
-            name=safe_name,
-            sku=safe_sku,
-            price=p.selling_price or p.mrp or 0,
-            quantity=qty,
-        )
-
-    # Re-total (your api serializer already re-totals; do it here too)
-    computed_total = subtotal + gst_amount + delivery_charge
+    product_qty, variant_qty = {}, {}
+    for p, v, qty in cart_lines:
+        if v is not None:
+            variant_qty[v.id] = variant_qty.get(v.id, 0) + qty
+        else:
+            product_qty[p.id] = product_qty.get(p.id, 0) + qty
 
-    # If client sent Total Payable, trust it when it is >= computed subtotal (to match what user saw)
-    if client_total_dec is not None and client_total_dec >= subtotal:
-        order.total_amount = client_total_dec
-    else:
-        order.total_amount = computed_total
-    order.gst_percent = gst_percent
-    order.delivery_charge = delivery_charge
-    order.save()
+    # Stock, order, lines and cart clean-up commit together or not at all.
     try:
-        send_order_status_email(order)
-    except Exception:
-        pass
-
-    # Clear cart (order placed). Removes all cart lines for this customer.
-    CartItem.objects.filter(customer=sf_customer).delete()
+        with transaction.atomic():
+            reserve_stock(product_qty, variant_qty)
+            order = Order(
+                customer=api_customer,
+                status="pending",  # new orders start as pending until accepted in admin
+                payment_method=pay_method,
+                address_line1=getattr(addr, "line1", None) if addr else None,
+                address_line2=getattr(addr, "line2", None) if addr else None,
+                city=getattr(addr, "city", None) if addr else None,
+                state=getattr(addr, "state", None) if addr else None,
+                pincode=getattr(addr, "pincode", None) if addr else None,
+            )
+            breakdown.apply(order)
+            order.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=p,
+                    name=(getattr(p, "name", None) or getattr(p, "unique_code", None) or f"Product #{p.id}")
+                    + (f" - {v.name}" if v is not None and v.name else ""),
+                    sku=(v.sku if v is not None and v.sku else None)
+                    or getattr(p, "unique_code", None) or getattr(p, "sku", None),
+                    price=unit_price(p, v),
+                    quantity=qty,
+                )
+                for p, v, qty in cart_lines
+            ])
+            # Clear cart (order placed). Removes all cart lines for this customer.
+            CartItem.objects.filter(customer=sf_customer).delete()
+            enqueue_order_status_emails([order])
+    except InsufficientStock as exc:
+        return Response({"detail": "Insufficient stock", "items": exc.shortages}, status=409)
 
     serialized = StorefrontOrderSerializer(order)
     return Response({"order": serialized.data}, status=201)
 
 
+class CustomerOrderPagination(CursorPagination):
+    """Keyset pages of a customer's orders, newest first."""
+    ordering = ("-created_at", "-id")
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+
 @api_view(["GET"])
 @permission_classes([])  # Auth handled manually for customer token
 def customer_orders(request):
     """
-    Return orders for the authenticated storefront customer.
+    Paginated order history for the authenticated storefront customer:
+    {"next", "previous", "results"}. Each item carries a thumbnail and its
+    review state (review_id / can_review), so the profile page needs no
+    separate reviews call. Four queries per page whatever its size.
     """
     from .auth import CustomerTokenAuthentication
-    from .serializers import StorefrontOrderSerializer
+    from .serializers import CustomerOrderSerializer
 
     auth = CustomerTokenAuthentication()
     auth_pair = auth.authenticate(request)
@@ -703,20 +717,28 @@ def customer_orders(request):
         return Response({"detail": "Auth required"}, status=401)
 
     sf_customer = request.customer
-    api_customer, _ = Customer.objects.get_or_create(
-        email=sf_customer.email,
-        defaults={
-            "name": sf_customer.name,
-            "phone": sf_customer.phone or "",
-        },
-    )
-    qs = (
-        Order.objects.filter(customer=api_customer)
-        .prefetch_related("items")
-        .order_by("-created_at")
+    if not sf_customer.api_customer_id:
+        return Response({"next": None, "previous": None, "results": []}, status=200)
+    paginator = CustomerOrderPagination()
+    qs = Order.objects.filter(customer_id=sf_customer.api_customer_id).prefetch_related(
+        Prefetch(
+            "items",
+            queryset=OrderItem.objects.select_related("product").only(
+                "id", "order_id", "name", "sku", "price", "quantity", "product_id",
+                "product__id", "product__images",
+            ),
+        )
     )
-    data = StorefrontOrderSerializer(qs, many=True).data
-    return Response(data, status=200)
+    page = paginator.paginate_queryset(qs, request)
+    reviews = {
+        (row["order_id"], row["product_id"]): row["review_id"]
+        for row in ProductReview.objects.filter(customer=sf_customer, order_id__in=[o.id for o in page])
+        .values("order_id", "product_id")
+        .annotate(review_id=Max("id"))
+        .order_by()
+    }
+    data = CustomerOrderSerializer(page, many=True, context={"request": request, "reviews": reviews}).data
+    return paginator.get_paginated_response(data)
 
 class PublicBannerViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -18,7 +18,6 @@ import {
   fetchOrders,
   fetchCollageTiles,
   submitProductReview,
-  fetchMyReviews,
   fetchProductReviews,
   fetchCustomerProfile,
   updateCustomerProfile,
@@ -26,7 +25,7 @@ import {
   type StorefrontOrder,
 } from './services/apiService';
 import { fetchNotifications } from './services/notificationService';
-import type { Product, WishlistItem, CartItem, Notification, User, Address, Order, MegaMenuLink, Occasion, Crystal, ProductType, ProductReview } from './types';
+import type { Product, WishlistItem, CartItem, Notification, User, Address, Order, MegaMenuLink, Occasion, Crystal, ProductType } from './types';
 
 // Lazy load pages for code splitting
 const HomePage = React.lazy(() => import('./pages/HomePage'));
@@ -45,9 +44,9 @@ const CheckoutPage = React.lazy(() => import('./pages/CheckoutPage'));
 type Page = 'home' | 'product' | 'all-products' | 'about-us' | 'wishlist' | 'cart' | 'profile' | 'login' | 'forgot-password' | 'signup' | 'checkout';
 type PostLoginAction =
   | { type: 'wishlist'; productId: number }
-  | { type: 'cart'; productId: number }
+  | { type: 'cart'; productId: number; variantId?: number }
   | { type: 'checkout' }
-  | { type: 'buyNow'; productId: number }
+  | { type: 'buyNow'; productId: number; variantId?: number }
   | null;
 type ProfileTab = 'account' | 'orders' | 'address';
 type Filter = MegaMenuLink['filter'];
@@ -79,6 +78,9 @@ const mapOrderFromApi = (order: StorefrontOrder): Order => {
       name: (it as any).name,
       price: Number((it as any).price || 0),
       sku: (it as any).sku,
+      image: it.image ?? null,
+      reviewId: it.reviewId ?? null,
+      canReview: Boolean(it.canReview),
     })),
   };
 };
@@ -102,7 +104,7 @@ const App: React.FC = () => {
   const [user, setUser] = useState<User>(sampleUser);
   const [addresses, setAddresses] = useState<Address[]>([]);
   const [orders, setOrders] = useState<Order[]>([]);
-  const [myReviews, setMyReviews] = useState<ProductReview[]>([]);
+  const [ordersNext, setOrdersNext] = useState<string | null>(null);
   const [returnRequestOrder, setReturnRequestOrder] = useState<Order | null>(null);
   const [reviewTarget, setReviewTarget] = useState<{ orderId: number; productId: number; productName: string } | null>(null);
   const [isSubmittingReview, setIsSubmittingReview] = useState(false);
@@ -119,7 +121,7 @@ const App: React.FC = () => {
     setUser(sampleUser);
     setAddresses([]);
     setOrders([]);
-    setMyReviews([]);
+    setOrdersNext(null);
     setCheckoutItems([]);
     setWishlistItems([]);
     setCartItems([]);
@@ -135,24 +137,30 @@ const App: React.FC = () => {
     }
   }, []);
 
+  // Order history pages embed review state per item, so no separate reviews call is needed.
   const loadOrders = useCallback(async () => {
     try {
-      const fetched = await fetchOrders();
-      const normalized = (Array.isArray(fetched) ? fetched : []).map(mapOrderFromApi);
-      setOrders(normalized);
+      const page = await fetchOrders();
+      setOrders(page.results.map(mapOrderFromApi));
+      setOrdersNext(page.next);
     } catch (error) {
       console.error('Failed to load orders', error);
     }
   }, []);
 
-  const loadCustomerReviews = useCallback(async () => {
+  const loadMoreOrders = useCallback(async () => {
+    if (!ordersNext) return;
     try {
-      const fetched = await fetchMyReviews();
-      setMyReviews(fetched || []);
+      const page = await fetchOrders(ordersNext);
+      setOrders(prev => {
+        const seen = new Set(prev.map(o => o.id));
+        return [...prev, ...page.results.map(mapOrderFromApi).filter(o => !seen.has(o.id))];
+      });
+      setOrdersNext(page.next);
     } catch (error) {
-      console.error('Failed to load reviews', error);
+      console.error('Failed to load more orders', error);
     }
-  }, []);
+  }, [ordersNext]);
 
   const getDetailedProductData = (basicProduct: Product): Product => {
     // Dynamically create the specifications array based on available product data
@@ -453,12 +461,11 @@ const App: React.FC = () => {
   useEffect(() => {
     if (isLoggedIn) {
       loadOrders();
-      loadCustomerReviews();
     } else {
       setOrders([]);
-      setMyReviews([]);
+      setOrdersNext(null);
     }
-  }, [isLoggedIn, loadOrders, loadCustomerReviews]);
+  }, [isLoggedIn, loadOrders]);
 
   const handleToggleWishlist = async (productId: number, force = false) => {
   if (!isLoggedIn && !force) {
@@ -491,9 +498,9 @@ const App: React.FC = () => {
   }
 };
 
-  const handleToggleCart = async (productId: number) => {
+  const handleToggleCart = async (productId: number, variantId?: number) => {
   if (!isLoggedIn) {
-    setPostLoginAction({ type: 'cart', productId });
+    setPostLoginAction({ type: 'cart', productId, variantId });
     setLoginPrompt('Please log in to add items to your cart.');
     navigate('login');
     return;
@@ -501,13 +508,15 @@ const App: React.FC = () => {
 
   try {
     // ✅ Correctly find item by looking inside the nested product object.
-    const existing = cartItems.find(item => item.product.id === productId);
+    const existing = cartItems.find(
+      item => item.product.id === productId && (variantId === undefined || item.variantId === variantId)
+    );
     console.log('Found existing cart item:', existing);
 
     if (existing) {
       await removeFromCart(existing.id); // ✅ Remove from Django
     } else {
-      await addToCart(productId, 1); // ✅ Add new item
+      await addToCart(productId, 1, variantId); // ✅ Add new item
     }
 
     // ✅ Refresh cart from Django after update
@@ -540,9 +549,9 @@ const App: React.FC = () => {
     }
   };
 
-  const handleBuyNow = async (productId: number) => {
+  const handleBuyNow = async (productId: number, variantId?: number) => {
     if (!isLoggedIn) {
-      setPostLoginAction({ type: 'buyNow', productId });
+      setPostLoginAction({ type: 'buyNow', productId, variantId });
       setLoginPrompt('Please log in to buy this item now.');
       navigate('login');
       return;
@@ -551,7 +560,7 @@ const App: React.FC = () => {
     try {
       // Add the item to the cart on the backend first.
       // This ensures we have a valid cart item with full product details.
-      await addToCart(productId, 1);
+      await addToCart(productId, 1, variantId);
       
       // Fetch the updated cart to find the item we just added.
       const updatedCart = await fetchCart();
@@ -561,9 +570,10 @@ const App: React.FC = () => {
       const itemForCheckout =
         updatedCart.find(
           (item: any) =>
-            item?.product?.id === productId ||
-            item?.productId === productId ||
-            item?.product_id === productId
+            (item?.product?.id === productId ||
+              item?.productId === productId ||
+              item?.product_id === productId) &&
+            (variantId === undefined || item?.variantId === variantId)
         ) || updatedCart[0];
 
       if (itemForCheckout) {
@@ -611,7 +621,7 @@ const App: React.FC = () => {
       // If quantity is zero or less, treat it as a removal.
       const itemToRemove = cartItems.find(item => item.id === cartItemId);
       if (itemToRemove) {
-        await handleToggleCart(itemToRemove.product.id);
+        await handleToggleCart(itemToRemove.product.id, itemToRemove.variantId ?? undefined);
       }
       return;
     }
@@ -784,7 +794,7 @@ const App: React.FC = () => {
 
         case 'cart': {
           try {
-            await addToCart(action.productId, 1);
+            await addToCart(action.productId, 1, action.variantId);
             const refreshedCart = await fetchCart();
             latestCart = refreshedCart;
             setCartItems(refreshedCart);
@@ -800,7 +810,7 @@ const App: React.FC = () => {
           // After logging in, perform the full "Buy Now" logic which fetches
           // the complete cart item, ensuring the price is included for checkout.
           if (productToBuy) { 
-            await handleBuyNow(action.productId);
+            await handleBuyNow(action.productId, action.variantId);
             navigate('checkout');
           } else {
             navigate('home');
@@ -839,14 +849,27 @@ const App: React.FC = () => {
     try {
       setIsSubmittingReview(true);
       setReviewError(null);
-      await submitProductReview({
+      const created = await submitProductReview({
         orderId: reviewTarget.orderId,
         productId: reviewTarget.productId,
         rating: payload.rating,
         title: payload.title,
         comment: payload.comment,
       });
-      await loadCustomerReviews();
+      setOrders(prev =>
+        prev.map(o =>
+          o.id !== reviewTarget.orderId
+            ? o
+            : {
+                ...o,
+                items: o.items.map(it =>
+                  it.productId === reviewTarget.productId
+                    ? { ...it, reviewId: Number(created?.id) || -1, canReview: false }
+                    : it
+                ),
+              }
+        )
+      );
       addNotification({
         type: 'welcome',
         title: 'Review submitted',
@@ -965,8 +988,8 @@ const App: React.FC = () => {
               onNavigateToAllProducts={handleNavigateToAllProducts}
               onInitiateReturn={handleInitiateReturn}
               onRefreshOrders={loadOrders}
+              onLoadMoreOrders={ordersNext ? loadMoreOrders : undefined}
               onAddReview={handleStartReview}
-              reviews={myReviews}
           />;
       case 'checkout':
         return <CheckoutPage
@@ -95,12 +95,19 @@ const BannerCarousel: React.FC<BannerCarouselProps> = ({ banners }) => {
           target={banner.redirect_url ? "_blank" : "_self"}
           rel="noopener noreferrer"
           className="relative w-full flex-shrink-0 block"
+          style={banner.imageMeta ? { backgroundColor: banner.imageMeta.color, backgroundImage: `url("${banner.imageMeta.placeholder}")`, backgroundSize: "cover" } : undefined}
         >
-          <img
-            src={banner.imageUrl}
-            alt={banner.title || "Banner"}
-            className="w-full h-auto object-contain md:object-cover max-h-[calc(100vh-160px)]"
-          />
+          <picture>
+            {banner.imageSrcset && <source type="image/avif" srcSet={banner.imageSrcset.avif} sizes="100vw" />}
+            {banner.imageSrcset && <source type="image/webp" srcSet={banner.imageSrcset.webp} sizes="100vw" />}
+            <img
+              src={banner.imageUrl}
+              alt={banner.title || "Banner"}
+              width={banner.imageMeta?.width ?? banner.imageSrcset?.width}
+              height={banner.imageMeta?.height ?? banner.imageSrcset?.height}
+              className="w-full h-auto object-contain md:object-cover max-h-[calc(100vh-160px)]"
+            />
+          </picture>
           <div className="absolute inset-0 bg-black/20"></div>
         </a>
       ))}
@@ -1,5 +1,5 @@
 import React, { useState, useMemo } from 'react';
-import type { Order, OrderItemSummary, ProductReview } from '../types';
+import type { Order, OrderItemSummary } from '../types';
 import { products } from '../constants';
 
 interface MyOrdersTabProps {
@@ -7,8 +7,9 @@ interface MyOrdersTabProps {
   onNavigateToAllProducts: () => void;
   onInitiateReturn: (order: Order) => void;
   onRefresh?: () => void;
+  // Present while the server has older orders to page in.
+  onLoadMore?: () => void;
   onAddReview?: (order: Order, item: OrderItemSummary) => void;
-  reviews?: ProductReview[];
 }
 
 const MyOrdersTab: React.FC<MyOrdersTabProps> = ({
@@ -16,8 +17,8 @@ const MyOrdersTab: React.FC<MyOrdersTabProps> = ({
   onNavigateToAllProducts,
   onInitiateReturn,
   onRefresh,
+  onLoadMore,
   onAddReview,
-  reviews = [],
 }) => {
   const [sortOption, setSortOption] = useState('date-desc');
 
@@ -137,13 +138,9 @@ const MyOrdersTab: React.FC<MyOrdersTabProps> = ({
                     const product = products.find((p) => p.id === item.productId);
                     const lineName = item.name || product?.name || 'Unknown Product';
                     const linePrice = (product?.price ?? item.price ?? 0) * item.quantity;
-                    const existingReview = reviews.find(
-                      (r) => r.product_id === item.productId && r.order_id === order.id
-                    );
-                    const showReviewCta =
-                      (order.status === 'completed' || order.status === 'delivered') &&
-                      !!item.productId &&
-                      !existingReview;
+                    // Review state comes with the order page from the server.
+                    const existingReview = item.reviewId != null;
+                    const showReviewCta = Boolean(item.canReview) && !existingReview;
 
                     return (
                       <div
@@ -187,6 +184,16 @@ const MyOrdersTab: React.FC<MyOrdersTabProps> = ({
         ) : (
           <p className="text-center text-gray-500 py-8">You have not placed any orders yet.</p>
         )}
+        {onLoadMore && sortedOrders.length > 0 && (
+          <div className="text-center pt-2">
+            <button
+              onClick={onLoadMore}
+              className="bg-white border border-gray-300 text-gray-800 font-semibold py-2 px-4 rounded-md hover:border-gray-400 text-sm"
+            >
+              Load Older Orders
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
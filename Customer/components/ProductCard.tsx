@@ -7,9 +7,9 @@ interface ProductCardProps {
   isWishlisted: boolean;
   isInCart: boolean;
   onToggleWishlist: (id: number, force?: boolean) => void;
-  onToggleCart: (id: number) => void;
+  onToggleCart: (id: number, variantId?: number) => void;
   onSelectProduct: (selection: { product: Product; variantId?: number }) => void;
-  onBuyNow: (id: number) => void;
+  onBuyNow: (id: number, variantId?: number) => void;
   size?: 'default' | 'small';
 }
 
@@ -67,6 +67,9 @@ const badgeColorClasses: Record<string, string> = {
   'Festive Sale': 'bg-yellow-500 text-white',
 };
 
+// Cards sit in 2-4 column grids; let the browser pick a width from the srcset.
+const CARD_IMAGE_SIZES = '(min-width: 1024px) 25vw, (min-width: 640px) 33vw, 50vw';
+
 
 const ProductCard: React.FC<ProductCardProps> = ({ product, isWishlisted, isInCart, onToggleWishlist, onToggleCart, onSelectProduct, onBuyNow, size = 'default' }) => {
   const [animateHeart, setAnimateHeart] = useState(false);
@@ -84,6 +87,15 @@ const ProductCard: React.FC<ProductCardProps> = ({ product, isWishlisted, isInCa
     }
   };
   
+  // srcset is parallel to images; the card may show any of them (e.g. a variant's).
+  const imageIndex = product.images ? product.images.indexOf(product.imageUrl) : -1;
+  const responsive = imageIndex >= 0 ? product.srcset?.[imageIndex] ?? null : null;
+  const meta = imageIndex >= 0 ? product.imageMeta?.[imageIndex] ?? null : null;
+  // Blurred placeholder painted behind the image until it loads
+  const placeholderStyle: React.CSSProperties | undefined = meta
+    ? { backgroundColor: meta.color, backgroundImage: `url("${meta.placeholder}")`, backgroundSize: 'cover', backgroundPosition: 'center' }
+    : undefined;
+
   const badgeClass = product.badge ? badgeColorClasses[product.badge] || 'bg-gray-500 text-white' : '';
   
   const sizeClass = isSmall ? 'size-small' : 'size-default';
@@ -107,14 +119,20 @@ const ProductCard: React.FC<ProductCardProps> = ({ product, isWishlisted, isInCa
         </div>
 
         {/* Image */}
-         <button onClick={() => onSelectProduct({ product, variantId: product.selectedVariantId })} className="w-full aspect-square bg-gray-100 block">
-          <img
-            src={product.imageUrl}
-            alt={product.name}
-            className="w-full h-full object-cover"
-            loading="lazy"
-            decoding="async"
-          />
+         <button onClick={() => onSelectProduct({ product, variantId: product.selectedVariantId })} className="w-full aspect-square bg-gray-100 block" style={placeholderStyle}>
+          <picture>
+            {responsive && <source type="image/avif" srcSet={responsive.avif} sizes={CARD_IMAGE_SIZES} />}
+            {responsive && <source type="image/webp" srcSet={responsive.webp} sizes={CARD_IMAGE_SIZES} />}
+            <img
+              src={product.imageUrl}
+              alt={product.name}
+              width={meta?.width}
+              height={meta?.height}
+              className="w-full h-full object-cover"
+              loading="lazy"
+              decoding="async"
+            />
+          </picture>
         </button>
 
         {/* Wishlist Button */}
@@ -167,7 +185,7 @@ const ProductCard: React.FC<ProductCardProps> = ({ product, isWishlisted, isInCa
         {product.inStock ? (
           <div className="flex items-stretch space-x-2">
             <button
-              onClick={() => onToggleCart(product.id)}
+              onClick={() => onToggleCart(product.id, product.selectedVariantId)}
               aria-label={isInCart ? 'Remove from Cart' : 'Add to Cart'}
               className={`font-bold rounded-md transition-colors duration-300 flex items-center justify-center
               ${isSmall ? 'text-xs' : ''} 
@@ -182,7 +200,7 @@ const ProductCard: React.FC<ProductCardProps> = ({ product, isWishlisted, isInCa
               <span className="hidden sm:inline text-xs sm:text-sm">{isInCart ? 'Remove' : 'Add to Cart'}</span>
             </button>
             <button
-              onClick={() => onBuyNow(product.id)}
+              onClick={() => onBuyNow(product.id, product.selectedVariantId)}
               className={`flex-1 font-bold rounded-md transition-all duration-300 hover:shadow-lg transform hover:-translate-y-px ${isSmall ? 'text-xs py-2 px-2' : 'text-xs sm:text-sm py-2.5 px-2 sm:px-3'}
               bg-gradient-to-r from-amber-500 to-yellow-400 text-white hover:from-amber-600 hover:to-yellow-500`}
             >
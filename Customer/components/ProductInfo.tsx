@@ -10,8 +10,8 @@ interface ProductInfoProps {
   activeVariantId?: number;
   onVariantSelect?: (variantId: number | undefined) => void;
   onToggleWishlist: (id: number) => void;
-  onToggleCart: (id: number) => void;
-  onBuyNow: (id: number) => void;
+  onToggleCart: (id: number, variantId?: number) => void;
+  onBuyNow: (id: number, variantId?: number) => void;
 }
 
 const badgeColorClasses: Record<string, string> = {
@@ -449,7 +449,7 @@ const ProductInfo: React.FC<ProductInfoProps> = ({ product, isWishlisted, isInCa
       
       <div className="flex items-stretch space-x-4 pt-4 border-t border-gray-200">
         <button
-          onClick={() => onToggleCart(product.id)}
+          onClick={() => onToggleCart(product.id, currentVariantId)}
           disabled={isOutOfStock}
           className={`flex-1 text-sm md:text-base font-bold py-4 px-4 rounded-md transition-colors duration-300 disabled:bg-gray-300 disabled:cursor-not-allowed ${
             isInCart
@@ -459,7 +459,7 @@ const ProductInfo: React.FC<ProductInfoProps> = ({ product, isWishlisted, isInCa
         >
           {isInCart ? 'Remove from Cart' : 'Add to Cart'}
         </button>
-        <button onClick={() => onBuyNow(product.id)} disabled={isOutOfStock} className="flex-1 bg-gradient-to-r from-amber-500 to-yellow-400 text-white text-sm md:text-base font-bold py-4 px-4 rounded-md transition-all duration-300 hover:from-amber-600 hover:to-yellow-500 hover:shadow-lg transform hover:-translate-y-px disabled:from-gray-400 disabled:to-gray-300 disabled:cursor-not-allowed">
+        <button onClick={() => onBuyNow(product.id, currentVariantId)} disabled={isOutOfStock} className="flex-1 bg-gradient-to-r from-amber-500 to-yellow-400 text-white text-sm md:text-base font-bold py-4 px-4 rounded-md transition-all duration-300 hover:from-amber-600 hover:to-yellow-500 hover:shadow-lg transform hover:-translate-y-px disabled:from-gray-400 disabled:to-gray-300 disabled:cursor-not-allowed">
           Buy Now
         </button>
         <button
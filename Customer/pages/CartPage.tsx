@@ -1,13 +1,14 @@
-import React, { useState, useMemo } from 'react';
-import type { Product, CartItem, WishlistItem } from '../types';
+import React, { useState, useMemo, useEffect } from 'react';
+import type { Product, CartItem, CartSummary, WishlistItem } from '../types';
 import { TrashIcon, HeartIcon, SearchIcon } from '../components/Icon';
 import { calculateCartTotals, formatInr, getDiscountPercent, getMrp, getUnitPrice } from '../utils/pricing';
+import { fetchCartSummary } from '../services/apiService';
 
 interface CartPageProps {
   cartItems: CartItem[];
   wishlistItems: WishlistItem[];
   onToggleWishlist: (id: number) => void;
-  onToggleCart: (id: number) => void;
+  onToggleCart: (id: number, variantId?: number) => void;
   onUpdateCartQuantity: (id: number, quantity: number) => void;
   onSelectProduct: (product: Product) => void;
   onNavigateToAllProducts: () => void;
@@ -34,10 +35,11 @@ const CartPage: React.FC<CartPageProps> = ({
       .map(item => ({
         ...item.product, // ✅ Use the nested product object from the cart item
         cartItemId: item.id, // Keep the cart item's own ID for updates/deletions
+        cartVariantId: item.variantId ?? undefined,
         quantity: item.quantity,
         addedAt: item.created_at || new Date().toISOString(), // ✅ Use backend timestamp or fallback to now
       }))
-      .filter((p): p is Product & { cartItemId: number; quantity: number; addedAt: string } => p !== null)
+      .filter((p): p is Product & { cartItemId: number; cartVariantId?: number; quantity: number; addedAt: string } => p !== null)
       .filter(p => p.name.toLowerCase().includes(searchQuery.toLowerCase())) // Search works as before
       .sort((a, b) => {
         switch (sortOption) {
@@ -58,10 +60,37 @@ const CartPage: React.FC<CartPageProps> = ({
   console.log("🔍 DEBUG: [CartPage.tsx] Computed cartProducts to render:", cartProducts);
 
   const totalItems = cartItems.reduce((sum, item) => sum + item.quantity, 0);
-  const { subtotal, gstAmount, shippingTotal, total, effectiveGstPercent, gstPercentsUsed } = useMemo(
-    () => calculateCartTotals(cartItems),
-    [cartItems]
-  );
+  const localTotals = useMemo(() => calculateCartTotals(cartItems), [cartItems]);
+
+  // Prefer the server's priced summary; keep the local calculation while it loads or if it fails.
+  const [summary, setSummary] = useState<CartSummary | null>(null);
+  useEffect(() => {
+    let cancelled = false;
+    if (!cartItems.length) {
+      setSummary(null);
+      return;
+    }
+    fetchCartSummary()
+      .then((data) => { if (!cancelled) setSummary(data); })
+      .catch(() => { if (!cancelled) setSummary(null); });
+    return () => { cancelled = true; };
+  }, [cartItems]);
+
+  const { subtotal, gstAmount, shippingTotal, total, effectiveGstPercent, gstPercentsUsed } = useMemo(() => {
+    if (!summary) return localTotals;
+    const rates = Array.from(new Set(summary.lines.map((l) => Number(l.gstPercent)).filter((p) => p > 0)));
+    const sub = Number(summary.subtotal) || 0;
+    const gst = Number(summary.gstAmount) || 0;
+    return {
+      subtotal: sub,
+      gstAmount: gst,
+      shippingTotal: Number(summary.deliveryCharge) || 0,
+      total: Number(summary.total) || 0,
+      effectiveGstPercent: sub > 0 ? Math.round((gst / sub) * 10000) / 100 : 0,
+      gstPercentsUsed: rates,
+    };
+  }, [summary, localTotals]);
+  const bestDiscount = summary?.discount ?? null;
   const gstLabel = useMemo(() => {
     if (gstPercentsUsed.length === 1) return `GST (${gstPercentsUsed[0]}%)`;
     if (gstPercentsUsed.length > 1 && effectiveGstPercent > 0) return `GST (~${effectiveGstPercent.toFixed(2)}%)`;
@@ -179,7 +208,7 @@ const CartPage: React.FC<CartPageProps> = ({
                             </button>
                             <button
                               type="button"
-                              onClick={() => onToggleCart(product.id)} // Toggling cart still uses product.id
+                              onClick={() => onToggleCart(product.id, product.cartVariantId)} // Toggling cart still uses product.id
                               className="font-medium text-gray-400 hover:text-red-500 p-2"
                               aria-label="Remove from cart"
                             >
@@ -208,6 +237,17 @@ const CartPage: React.FC<CartPageProps> = ({
                    <span>Shipping</span>
                    <span>{shippingTotal === 0 ? 'FREE' : formatInr(shippingTotal)}</span>
                  </div>
+                 {bestDiscount && (
+                   <div className="flex justify-between text-green-700 text-sm">
+                     <span>Save with {bestDiscount.code}</span>
+                     <span>-{formatInr(Number(bestDiscount.amount))}</span>
+                   </div>
+                 )}
+                 {summary?.needsVariant && (
+                   <p className="text-sm text-red-600">
+                     Choose an option for {summary.lines.filter((l) => l.needsVariant).map((l) => l.name).join(', ')} before checkout.
+                   </p>
+                 )}
                  <div className="flex justify-between font-bold text-lg border-t pt-4">
                    <span>Order Total</span>
                    <span>{formatInr(Number(total))}</span>
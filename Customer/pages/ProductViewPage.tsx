@@ -14,9 +14,9 @@ interface ProductViewPageProps {
   wishlistItems: WishlistItem[];
   cartItems: CartItem[];
   onToggleWishlist: (id: number) => void;
-  onToggleCart: (id: number) => void;
+  onToggleCart: (id: number, variantId?: number) => void;
   onSelectProduct: (selection: { product: Product; variantId?: number }) => void;
-  onBuyNow: (id: number) => void;
+  onBuyNow: (id: number, variantId?: number) => void;
 }
 
 const FALLBACK_FEATURE_ICON = '';
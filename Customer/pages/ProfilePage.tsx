@@ -1,5 +1,5 @@
 import React from 'react';
-import type { User, Address, Order, ProductReview } from '../types';
+import type { User, Address, Order } from '../types';
 import MyAccountTab from '../components/MyAccountTab';
 import MyOrdersTab from '../components/MyOrdersTab';
 import MyAddressTab from '../components/MyAddressTab';
@@ -19,8 +19,8 @@ interface ProfilePageProps {
   onNavigateToAllProducts: () => void;
   onInitiateReturn: (order: Order) => void;
   onRefreshOrders?: () => void;
+  onLoadMoreOrders?: () => void;
   onAddReview?: (order: Order, item: Order['items'][number]) => void;
-  reviews?: ProductReview[];
 }
 
 const ProfilePage: React.FC<ProfilePageProps> = ({
@@ -35,8 +35,8 @@ const ProfilePage: React.FC<ProfilePageProps> = ({
   onNavigateToAllProducts,
   onInitiateReturn,
   onRefreshOrders,
+  onLoadMoreOrders,
   onAddReview,
-  reviews,
 }) => {
   const tabs = [
     { id: 'account', label: 'My Account', icon: UserIcon },
@@ -55,7 +55,7 @@ const ProfilePage: React.FC<ProfilePageProps> = ({
           />
         );
       case 'orders':
-        return <MyOrdersTab orders={orders} onNavigateToAllProducts={onNavigateToAllProducts} onInitiateReturn={onInitiateReturn} onRefresh={onRefreshOrders} onAddReview={onAddReview} reviews={reviews} />;
+        return <MyOrdersTab orders={orders} onNavigateToAllProducts={onNavigateToAllProducts} onInitiateReturn={onInitiateReturn} onRefresh={onRefreshOrders} onLoadMore={onLoadMoreOrders} onAddReview={onAddReview} />;
       case 'address':
         return <MyAddressTab addresses={addresses} onUpdateAddresses={onUpdateAddresses} />;
       default:
@@ -1,5 +1,5 @@
 import axios from "axios";
-import type { CartItem, Banner, Occasion, Crystal, ProductReview } from "../types";
+import type { CartItem, CartSummary, Banner, Occasion, Crystal, ProductReview } from "../types";
 
 /* Base Axios Setup */
 const api = axios.create({
@@ -102,6 +102,8 @@ export const fetchBanners = async (): Promise<Banner[]> => {
         id: banner?.id ?? 0,
         title: banner?.title ?? "",
         imageUrl,
+        imageSrcset: banner?.imageSrcset ?? banner?.image_srcset ?? null,
+        imageMeta: banner?.imageMeta ?? banner?.image_meta ?? null,
         redirect_url: banner?.redirect_url ?? banner?.redirectUrl ?? null,
         display_order: banner?.display_order ?? banner?.displayOrder ?? null,
         device_type: banner?.device_type ?? banner?.deviceType ?? "All",
@@ -310,8 +312,15 @@ export const fetchCart = async () => {
   return res.data;
 };
 
-export const addToCart = async (productId: number, quantity = 1) => {
-  const res = await api.post("/cart/", { product_id: productId, quantity });
+// Server-priced totals for the cart (GST, delivery, best coupon); cached per cart version server-side.
+export const fetchCartSummary = async (): Promise<CartSummary> => {
+  const res = await api.get("/cart/summary/");
+  return res.data;
+};
+
+export const addToCart = async (productId: number, quantity = 1, variantId?: number) => {
+  // The variant is stored on the cart line; checkout needs it for products with several.
+  const res = await api.post("/cart/", { product_id: productId, quantity, ...(variantId ? { variant_id: variantId } : {}) });
   return res.data;
 };
 
@@ -335,6 +344,10 @@ interface StorefrontOrderItem {
   price: number | string;
   quantity: number;
   productId: number | null;
+  // Order history only (GET /orders/)
+  image?: string | null;
+  reviewId?: number | null;
+  canReview?: boolean;
 }
 
 export interface StorefrontOrder {
@@ -352,27 +365,55 @@ interface CreateOrderResponse {
   error?: string;
 }
 
+const newIdempotencyKey = (): string =>
+  typeof crypto !== "undefined" && typeof crypto.randomUUID === "function"
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+const CHECKOUT_ATTEMPTS = 3;
+
 export const createOrder = async (
   items: CartItem[],
   addressId: number | null,
   paymentMethod: "cod" | "prepaid" = "cod",
   totalPayable?: number
 ): Promise<CreateOrderResponse> => {
+  // One key per checkout: retries after a timeout/network drop replay the
+  // server's first answer instead of placing a second order.
+  const idempotencyKey = newIdempotencyKey();
+  const body = {
+    payment_method: paymentMethod,
+    address_id: addressId,
+    total: totalPayable,
+    items: items
+      .map((i) => {
+        const productId = (i as any).productId ?? (i as any).product_id ?? (i as any).product?.id;
+        // Required by the server for products with more than one variant.
+        const variantId = (i as any).variantId ?? (i as any).variant_id ?? (i as any).product?.selectedVariantId;
+        return {
+          product_id: productId,
+          ...(variantId ? { variant_id: variantId } : {}),
+          quantity: i.quantity,
+        };
+      })
+      .filter((i) => i.product_id),
+  };
+  const post = async (attempt: number): Promise<any> => {
+    try {
+      return await api.post("/checkout/", body, { headers: { "Idempotency-Key": idempotencyKey } });
+    } catch (err: any) {
+      // Only retry when no response came back (or the first attempt is still in flight).
+      const retryable = !err.response || (err.response.status === 409 && !err.response.data?.items);
+      if (retryable && attempt < CHECKOUT_ATTEMPTS) {
+        await new Promise((r) => setTimeout(r, 500 * attempt));
+        return post(attempt + 1);
+      }
+      throw err;
+    }
+  };
+
   try {
-    const res = await api.post("/checkout/", {
-      payment_method: paymentMethod,
-      address_id: addressId,
-      total: totalPayable,
-      items: items
-        .map((i) => {
-          const productId = (i as any).productId ?? (i as any).product_id ?? (i as any).product?.id;
-          return {
-            product_id: productId,
-            quantity: i.quantity,
-          };
-        })
-        .filter((i) => i.product_id),
-    });
+    const res = await post(1);
 
     const order: StorefrontOrder | undefined = res.data?.order;
     if (!order) {
@@ -394,9 +435,19 @@ export const createOrder = async (
   }
 };
 
-export const fetchOrders = async (): Promise<StorefrontOrder[]> => {
-  const res = await api.get("/orders/");
-  return Array.isArray(res.data) ? res.data : [];
+export interface StorefrontOrderPage {
+  results: StorefrontOrder[];
+  next: string | null;
+}
+
+// Newest orders first, one page at a time; pass the previous page's `next` to continue.
+export const fetchOrders = async (next?: string | null): Promise<StorefrontOrderPage> => {
+  const res = next ? await api.get(next) : await api.get("/orders/");
+  const data = res.data || {};
+  return {
+    results: Array.isArray(data.results) ? data.results : Array.isArray(data) ? data : [],
+    next: data.next ?? null,
+  };
 };
 
 /* ---------------------------------------------
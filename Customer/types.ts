@@ -13,6 +13,23 @@ export interface ProductVariant {
   sizes?: string[];
 }
 
+/** Responsive AVIF/WebP widths generated by the backend for one stored image. */
+export interface ImageSrcset {
+  width: number;
+  height: number;
+  avif: string;
+  webp: string;
+}
+
+/** Known before the image loads: lay out at the right aspect ratio and paint the placeholder. */
+export interface ImageMeta {
+  width: number;
+  height: number;
+  bytes: number | null;
+  color: string;
+  placeholder: string; // tiny blurred WebP data URI
+}
+
 export interface Product {
   id: number;
   /** Optional synthetic id used only for UI (e.g., variant card identity) */
@@ -38,6 +55,10 @@ export interface Product {
   // Backend-synced fields
   stock?: number;
   images?: string[];
+  /** Parallel to `images`; null until an image's derivatives are built */
+  srcset?: (ImageSrcset | null)[];
+  /** Parallel to `images`; null until computed */
+  imageMeta?: (ImageMeta | null)[];
   description?: string;
   tags?: string[];
   materials?: string[];
@@ -176,6 +197,8 @@ export interface Banner {
   id: number;
   title: string;
   imageUrl: string;
+  imageSrcset?: ImageSrcset | null;
+  imageMeta?: ImageMeta | null;
   redirect_url?: string | null;
   display_order?: number | null;
   device_type?: 'All' | 'Mobile' | 'Desktop';
@@ -232,10 +255,52 @@ export interface WishlistItem {
 export interface CartItem {
   id:number;
   product: Product;
+  variantId?: number | null;
   quantity: number;
   addedAt: string;
 }
 
+export interface CartSummaryDiscount {
+  id: number;
+  code: string;
+  name: string;
+  type: 'percentage' | 'fixed';
+  value: number;
+  appliesTo: string;
+  amount: number;
+}
+
+export interface CartSummaryLine {
+  id: number;
+  productId: number;
+  variantId: number | null;
+  name: string;
+  quantity: number;
+  /** True when the product has several variants and none is chosen; such lines carry no prices. */
+  needsVariant: boolean;
+  variantIds?: number[];
+  mrp?: number;
+  unitPrice?: number;
+  lineTotal?: number;
+  gstPercent?: number;
+  gstAmount?: number;
+  deliveryCharge?: number;
+  bestDiscount?: CartSummaryDiscount | null;
+}
+
+export interface CartSummary {
+  lines: CartSummaryLine[];
+  itemCount: number;
+  needsVariant: boolean;
+  subtotal: number;
+  gstPercent: number;
+  gstAmount: number;
+  deliveryCharge: number;
+  discount: CartSummaryDiscount | null;
+  total: number;
+  version: string;
+}
+
 export interface Notification {
   id: number;
   type: 'sale' | 'shipping' | 'welcome' | 'new_arrival';
@@ -284,6 +349,9 @@ export interface OrderItemSummary {
   name?: string;
   price?: number;
   sku?: string | null;
+  image?: string | null;
+  reviewId?: number | null;
+  canReview?: boolean;
 }
 
 export interface Order {
@@ -109,7 +109,8 @@ const App: React.FC = () => {
 
     try {
       const savedLog = await api.createLog(newLog); // ✅ Save to Django
-      setLogs(prev => [savedLog, ...prev]);
+      // The server buffers log writes and answers before the row has an id; key it locally.
+      setLogs(prev => [{ ...savedLog, id: savedLog.id ?? `log_${Date.now()}` }, ...prev]);
     } catch (error) {
       console.error("❌ Failed to save log:", error);
       // fallback: keep in memory
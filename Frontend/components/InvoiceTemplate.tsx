@@ -34,14 +34,15 @@ const InvoiceTemplate: React.FC<InvoiceTemplateProps> = ({ order, business }) =>
     pdf.save(`Invoice-${order.id}.pdf`);
   };
 
-  const subtotal = order.items.reduce((sum, item) => sum + item.price * item.quantity, 0);
+  // Prefer the breakdown the backend stored when it priced the order; derive only for older payloads.
+  const subtotal = order.subtotal ?? order.items.reduce((sum, item) => sum + item.price * item.quantity, 0);
   const delivery = Number(order.deliveryCharge ?? 0) || 0;
   const gstRate = Number(order.gstPercent ?? 0) || 0;
   const computedGst = gstRate > 0 ? subtotal * (gstRate / 100) : 0;
   // If backend sent a total amount, trust it; otherwise derive.
   const total = Number.isFinite(order.amount) ? Number(order.amount) : subtotal + computedGst + delivery;
   // If gst rate not provided, backfill gst by difference to keep totals aligned.
-  const gstAmount = gstRate > 0 ? computedGst : Math.max(total - subtotal - delivery, 0);
+  const gstAmount = order.gstAmount ?? (gstRate > 0 ? computedGst : Math.max(total - subtotal - delivery, 0));
   const fmtMoney = (val: number) => `Rs. ${val.toFixed(2)}`;
 
   // Resolve address from normalized object or any raw fields that may be present.
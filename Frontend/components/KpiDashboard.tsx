@@ -1,7 +1,8 @@
-import React, { useState, useMemo } from "react";
+import React, { useState, useMemo, useEffect } from "react";
 import { LineChart, Line, ResponsiveContainer } from "recharts";
 import { ICONS, formatCurrency } from "../constants";
 import { KpiData, Order, OrderStatus } from "../types";
+import { getDashboardKpis, DashboardKpis } from "../services/apiService";
 
 type Period = "30d" | "7d" | "24h";
 
@@ -69,8 +70,41 @@ const KpiDashboard: React.FC<KpiDashboardProps> = ({
   }, [orders]);
 
   const [selectedPeriod, setSelectedPeriod] = useState<Period>("30d");
+  const [serverKpis, setServerKpis] = useState<DashboardKpis | null>(null);
+
+  // Totals come from the server-side rollup; the order list is only a fallback.
+  useEffect(() => {
+    let cancelled = false;
+    getDashboardKpis(["30d", "7d", "24h"])
+      .then((res) => {
+        if (!cancelled) setServerKpis(res);
+      })
+      .catch(() => {
+        if (!cancelled) setServerKpis(null);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [safeOrders.length]);
 
   const data: KpiData = useMemo(() => {
+    const fromServer = serverKpis?.periods?.[selectedPeriod];
+    if (fromServer) {
+      const totalVisitors = visitorData > 0 ? visitorData : fromServer.orders * 3; // fallback
+      return {
+        totalRevenue: Number(fromServer.revenue),
+        revenueChange: fromServer.revenueChange,
+        totalOrders: fromServer.placedOrders,
+        ordersChange: fromServer.placedOrdersChange,
+        averageOrderValue: Number(fromServer.aov),
+        aovChange: fromServer.aovChange,
+        conversionRate: totalVisitors > 0 ? (fromServer.placedOrders / totalVisitors) * 100 : 0,
+        conversionRateGoal: 3.0,
+        revenueTrend: fromServer.trend.map((d, i) => ({ name: `Day ${i + 1}`, value: Number(d.revenue) })),
+        ordersTrend: fromServer.trend.map((d, i) => ({ name: `Day ${i + 1}`, value: d.placedOrders })),
+      };
+    }
+
     const now = new Date();
     const periodInDays =
       selectedPeriod === "30d" ? 30 : selectedPeriod === "7d" ? 7 : 1;
@@ -182,7 +216,7 @@ const KpiDashboard: React.FC<KpiDashboardProps> = ({
       revenueTrend,
       ordersTrend,
     };
-  }, [safeOrders, selectedPeriod, visitorData]);
+  }, [safeOrders, selectedPeriod, visitorData, serverKpis]);
 
   const periodOptions: { key: Period; label: string }[] = [
     { key: "30d", label: "Last 30 days" },
@@ -9,7 +9,6 @@ import { createNotification } from "../services/apiService";
 import OrderFormModal from "../components/OrderFormModal";
 import InvoiceHistoryTable from "../components/InvoiceHistoryTable";
 import { InitialPageProps } from "../App";
-import InvoiceTemplate from "../components/InvoiceTemplate";
 
 
 interface OrdersPageProps {
@@ -103,6 +102,22 @@ const OrdersPage: React.FC<OrdersPageProps> = ({
   const [isWorking, setIsWorking] = useState(false);
   const prevOrderIdsRef = useRef<Set<number>>(new Set());
   const firstLoadRef = useRef<boolean>(true);
+  const [statusCounts, setStatusCounts] = useState<api.OrderStatusCounts | null>(null);
+
+  // Badge counts come from the server counters; refetch whenever the order list changes.
+  useEffect(() => {
+    let cancelled = false;
+    api.getOrderStatusCounts()
+      .then((counts) => { if (!cancelled) setStatusCounts(counts); })
+      .catch(() => { if (!cancelled) setStatusCounts(null); });
+    return () => { cancelled = true; };
+  }, [orders]);
+
+  const countLabel = (label: string, ...keys: (keyof api.OrderStatusCounts)[]) => {
+    if (!statusCounts) return label;
+    const n = keys.reduce((sum, key) => sum + (statusCounts[key] || 0), 0);
+    return `${label} (${n})`;
+  };
 
   useEffect(() => {
     if (initialProps) {
@@ -386,36 +401,8 @@ const OrdersPage: React.FC<OrdersPageProps> = ({
       order = updatedOrder;
     }
 
-    // ✅ Generate the invoice dynamically using the new template
-    const container = document.createElement("div");
-    document.body.appendChild(container);
-
-    const root = React.createElement(InvoiceTemplate, {
-      order,
-      business: {
-        name: "Aura Jewels",
-        logoUrl: "/logo.png",
-        tagline: "Design & Branding",
-        address: "3, Aishbagh, Lucknow, Uttar Pradesh",
-        gst: "09EDGPS0111B1Z1",
-        email: "info@aurajewels.com",
-        phone: "+91 98765 43210",
-      },
-    });
-
-    // Temporarily render the invoice offscreen and trigger its built-in PDF generator
-    import("react-dom/client").then(({ createRoot }) => {
-      const rootInstance = createRoot(container);
-      rootInstance.render(root);
-      setTimeout(() => {
-        const btn = container.querySelector("button");
-        if (btn) (btn as HTMLButtonElement).click(); // triggers DownloadInvoicePDF
-        setTimeout(() => {
-          rootInstance.unmount();
-          document.body.removeChild(container);
-        }, 3000);
-      }, 800);
-    });
+    // The backend renders a vector PDF and caches it per order version
+    await generatePDFInvoice(order);
 
     addLog(`Invoice for Order #${order.id} generated.`);
     setToast({ message: `Invoice #${order.id} generated successfully.`, type: "success" });
@@ -456,36 +443,20 @@ const OrdersPage: React.FC<OrdersPageProps> = ({
 
 
 
-const generatePDFInvoice = async (order: Order) => {
-  const container = document.createElement("div");
-  document.body.appendChild(container);
-
-  const root = React.createElement(InvoiceTemplate, {
-    order,
-    business: {
-      name: "Aura Jewels",
-      logoUrl: "/logo.png",
-      tagline: "Design & Branding",
-      address: "3, Aishbagh, Lucknow, Uttar Pradesh",
-      gst: "09EDGPS0111B1Z1",
-      email: "info@aurajewels.com",
-      phone: "+91 98765 43210",
-    },
-  });
+const saveBlob = (blob: Blob, filename: string) => {
+  const url = window.URL.createObjectURL(blob);
+  const a = document.createElement("a");
+  a.href = url;
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  window.URL.revokeObjectURL(url);
+};
 
-  const { createRoot } = await import("react-dom/client");
-  const rootInstance = createRoot(container);
-  rootInstance.render(root);
-
-  // Wait a bit for render
-  setTimeout(() => {
-    const btn = container.querySelector("button");
-    if (btn) (btn as HTMLButtonElement).click(); // Triggers PDF download
-    setTimeout(() => {
-      rootInstance.unmount();
-      document.body.removeChild(container);
-    }, 3000);
-  }, 800);
+const generatePDFInvoice = async (order: Order) => {
+  const blob = await api.downloadOrderInvoice(order.id);
+  saveBlob(blob, `Invoice-${String(order.id).padStart(5, "0")}.pdf`);
 };
 
 
@@ -535,11 +506,9 @@ const generatePDFInvoice = async (order: Order) => {
       });
       setOrders(newOrders);
 
-      for (const order of updatedOrdersResults) {
-        await generatePDFInvoice(order);
-
-        await new Promise((resolve) => setTimeout(resolve, 300));
-      }
+      // One zip for the whole selection instead of a PDF download per order
+      const archive = await api.downloadOrderInvoices(updatedOrdersResults.map((o) => o.id));
+      saveBlob(archive, `invoices-${new Date().toISOString().slice(0, 10)}.zip`);
 
       addLog(
         `${processableOrders.length} orders have been dispatched in bulk.`,
@@ -806,12 +775,12 @@ const generatePDFInvoice = async (order: Order) => {
               }
               className="px-4 py-2 rounded-full border bg-background focus:outline-none focus:ring-2 focus:ring-primary w-44 md:w-56"
             >
-              <option value="All">All Statuses</option>
-              <option value="In Progress">In Progress</option>
-              <option value={OrderStatus.Pending}>Pending</option>
-              <option value={OrderStatus.Dispatched}>Dispatched</option>
-              <option value={OrderStatus.Completed}>Completed</option>
-              <option value={OrderStatus.Cancelled}>Cancelled</option>
+              <option value="All">{countLabel("All Statuses", "all")}</option>
+              <option value="In Progress">{countLabel("In Progress", "pending", "accepted")}</option>
+              <option value={OrderStatus.Pending}>{countLabel("Pending", "pending")}</option>
+              <option value={OrderStatus.Dispatched}>{countLabel("Dispatched", "dispatched")}</option>
+              <option value={OrderStatus.Completed}>{countLabel("Completed", "completed")}</option>
+              <option value={OrderStatus.Cancelled}>{countLabel("Cancelled", "cancelled")}</option>
             </select>
           </div>
         )}
@@ -14,6 +14,7 @@ import ProductTagDropdown from "../components/ProductTagDropdown";
 import LimitedDealTimerModal from "../components/LimitedDealTimerModal";
 import { LIMITED_DEAL_TAG } from "../constants";
 import MultiSelectChipInput from "../components/MultiSelectChipInput";
+import { uploadProductImages } from "../services/apiService";
 
 /* ---------------------------------------------
    Helpers
@@ -21,13 +22,20 @@ import MultiSelectChipInput from "../components/MultiSelectChipInput";
 const generateSku = () =>
   `SKU-${Math.random().toString(36).substr(2, 9).toUpperCase()}`;
 
-const fileToBase64 = (file: File): Promise<string> =>
-  new Promise((resolve, reject) => {
-    const reader = new FileReader();
-    reader.readAsDataURL(file);
-    reader.onload = () => resolve(reader.result as string);
-    reader.onerror = (err) => reject(err);
-  });
+// Images go to the server as multipart uploads; the form only keeps their URLs.
+const uploadImageFiles = async (files: FileList): Promise<string[]> => {
+  try {
+    const { images, errors } = await uploadProductImages(Array.from(files));
+    if (errors.length > 0) {
+      alert(errors.map((e) => `${e.name}: ${e.error}`).join("\n"));
+    }
+    return images.map((img) => img.url);
+  } catch (err) {
+    console.error("Image upload failed", err);
+    alert("Image upload failed. Please try again.");
+    return [];
+  }
+};
 
 // Parse numerics robustly, ignoring currency/commas and empty strings
 const parseNumberSafe = (value: any): number => {
@@ -398,7 +406,7 @@ const ProductFormPage: React.FC<ProductFormPageProps> = ({
 
   const handleBaseImageUpload = async (files: FileList | null) => {
     if (!files) return;
-    const imgs = await Promise.all(Array.from(files).map(fileToBase64));
+    const imgs = await uploadImageFiles(files);
     setProductData((p) => ({ ...p, images: [...p.images, ...imgs] }));
   };
 
@@ -491,7 +499,7 @@ const ProductFormPage: React.FC<ProductFormPageProps> = ({
     files: FileList | null
   ) => {
     if (!files) return;
-    const imgs = await Promise.all(Array.from(files).map(fileToBase64));
+    const imgs = await uploadImageFiles(files);
     setProductData((p) => {
       const variants = [...p.variants];
       variants[index] = {
@@ -5,7 +5,7 @@ import { MainCategory, Material, SubCategory, Color, Occasion, Log, HomeCollageI
 import CategoryManagerModal from '../components/CategoryManagerModal';
 import HomeCollageManagerModal from '../components/HomeCollageManagerModal';
 import Toast from '../components/Toast';
-import { backupDatabase, listBackups, restoreDatabase, createNotification } from '../services/apiService';
+import { backupDatabase, listBackups, restoreDatabase, downloadBackup, createNotification } from '../services/apiService';
 import { NotificationType } from '../types';
 
 interface SettingsPageProps {
@@ -98,8 +98,8 @@ const SettingsPage: React.FC<SettingsPageProps> = (props) => {
                                 try { await createNotification({ title: 'Database Backup', message: `Backup created: ${res?.filename || ''}`, type: NotificationType.Info }); } catch {}
                                 sessionStorage.setItem('pendingToast', JSON.stringify({ message: 'Backup created successfully', type: 'success' }));
                                 sessionStorage.setItem('refreshNotifications', '1');
-                                // Optional: open download URL
-                                if (res?.backupUrl) { window.open(res.backupUrl, '_blank'); }
+                                // Download the new backup
+                                if (res?.filename) { try { await downloadBackup(res.filename); } catch {} }
                                 props.addLog?.('Database backup created', 'info');
                             } catch (e: any) {
                                 const msg = e?.response?.data?.error || 'Failed to create backup';
@@ -161,14 +161,20 @@ const SettingsPage: React.FC<SettingsPageProps> = (props) => {
                                 >
                                     Restore
                                 </button>
-                                <a
-                                    href={backups.find(b => b.filename === selectedBackup)?.url}
-                                    target="_blank"
-                                    rel="noreferrer"
+                                <button
+                                    type="button"
+                                    disabled={!selectedBackup}
+                                    onClick={async () => {
+                                        try {
+                                            await downloadBackup(selectedBackup);
+                                        } catch {
+                                            setToast({ message: 'Failed to download backup', type: 'error' });
+                                        }
+                                    }}
                                     className="text-primary underline text-sm text-center sm:text-left"
                                 >
                                     Download
-                                </a>
+                                </button>
                             </div>
                         )}
                     </div>
@@ -26,9 +26,9 @@
  *     expand this to handle different HTTP status codes (e.g., 401 for unauthorized,
  *     403 for forbidden, 404 for not found) as needed for a robust user experience.
  *
- * 6. **Image Uploads**: For features like product image uploads, consider switching from
- *    base64 (as used in the mock data) to `multipart/form-data` for better performance. This would involve creating
- *    a `FormData` object in the API call and updating your Django view/serializer to handle file uploads.
+ * 6. **Image Uploads**: Product images are uploaded as `multipart/form-data` through
+ *    `uploadProductImages` (POST /products/images/); product payloads then carry the returned URLs
+ *    instead of base64 data URIs.
  */
 
 // Fix: Add Notification and NotificationType to imports
@@ -63,6 +63,7 @@ import {
   VisitorRegionData,
   OrderStatus,
   Notification,
+  ImageStatus,
 } from "../types";
 // Base URL of your Django API
 // const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://127.0.0.1:8000/api";
@@ -406,6 +407,19 @@ export const listBackups = async (): Promise<Array<{ filename: string; url: stri
   return res.data;
 };
 
+/** Download a DB backup (authenticated; backups are not served from /media/) */
+export const downloadBackup = async (filename: string): Promise<void> => {
+  const res = await api.get(`/backups/${encodeURIComponent(filename)}/`, { responseType: "blob" });
+  const url = URL.createObjectURL(res.data);
+  const a = document.createElement("a");
+  a.href = url;
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  URL.revokeObjectURL(url);
+};
+
 /** Restore database from a selected backup filename */
 export const restoreDatabase = async (filename: string): Promise<{ message: string; restoredFrom: string; safetyBackup: string }> => {
   const res = await api.post("/restore-db/", { filename });
@@ -461,6 +475,8 @@ export const getOrders = async (): Promise<Order[]> => {
     paymentMethod: order.payment_method || order.paymentMethod,
     gstPercent: order.gst_percent ?? order.gstPercent ?? undefined,
     deliveryCharge: order.delivery_charge ?? order.deliveryCharge ?? undefined,
+    subtotal: order.subtotal != null ? Number(order.subtotal) : undefined,
+    gstAmount: (order.gst_amount ?? order.gstAmount) != null ? Number(order.gst_amount ?? order.gstAmount) : undefined,
     items: (order.items || []).map((it: any) => ({
       id: (it.id?.toString?.() ?? it.id ?? `${it.name}-${Math.random()}`) as string,
       name: it.name,
@@ -512,7 +528,12 @@ export const createOrder = async (orderData: {
     items: orderData.items.map(i => ({ name: i.name, sku: i.sku, price: i.price, quantity: i.quantity })),
   };
 
-  const response = await api.post("/orders/", payload);
+  // Lets a retried submit replay the first result instead of creating a duplicate order.
+  const idempotencyKey =
+    typeof crypto !== "undefined" && typeof crypto.randomUUID === "function"
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  const response = await api.post("/orders/", payload, { headers: { "Idempotency-Key": idempotencyKey } });
   return response.data;
 };
 
@@ -523,6 +544,37 @@ export const updateOrderStatus = async (orderId: number, status: string) => {
   return response.data;
 };
 
+// Orders per status from the server-side counters (tab badges); one cheap request
+export type OrderStatusCounts = Record<"all" | "pending" | "accepted" | "dispatched" | "completed" | "cancelled", number>;
+
+export const getOrderStatusCounts = async (): Promise<OrderStatusCounts> => {
+  const response = await api.get(`/orders/status-counts/`);
+  return response.data;
+};
+
+// Invoice PDFs are rendered (and cached per order version) by the backend
+export const downloadOrderInvoice = async (orderId: number) => {
+  const res = await api.get(`/orders/${orderId}/invoice/`, { responseType: "blob" });
+  return res.data as Blob;
+};
+
+// Zip of invoices for the given orders; cancelled orders are skipped server-side
+export const downloadOrderInvoices = async (orderIds: number[]) => {
+  const res = await api.get(`/orders/invoices/`, { params: { ids: orderIds.join(",") }, responseType: "blob" });
+  return res.data as Blob;
+};
+
+// Move many orders to one status in a single request; emails are sent server-side in a batch
+export const bulkUpdateOrderStatus = async (orderIds: number[], status: string) => {
+  const response = await api.post(`/orders/bulk-status/`, { ids: orderIds, status });
+  return response.data as {
+    status: string;
+    updated: number;
+    results: { id: number; previousStatus: string; status: string; changed: boolean }[];
+    missing: number[];
+  };
+};
+
 // Update order details (orders app shape)
 export const updateOrderDetails = async (
   orderId: number,
@@ -758,6 +810,42 @@ export const updateProduct = async (
   }
 };
 
+// -----------------------------
+// Product image upload (multipart, streamed to storage server-side)
+// -----------------------------
+export interface UploadedProductImage {
+  id: number;
+  name: string;
+  url: string;
+  imageStatus: ImageStatus;
+}
+
+/** Upload image files once; put the returned URLs (or ids) in a product's `images` instead of base64. */
+export const uploadProductImages = async (
+  files: File[],
+  onUploadProgress?: (percent: number) => void
+): Promise<{ images: UploadedProductImage[]; errors: { name: string; error: string }[] }> => {
+  const formData = new FormData();
+  files.forEach((file) => formData.append("files", file));
+  try {
+    const res = await api.post("/products/images/", formData, {
+      headers: { "Content-Type": "multipart/form-data" },
+      onUploadProgress: (progressEvent) => {
+        if (progressEvent.total) {
+          onUploadProgress?.(Math.round((progressEvent.loaded * 100) / progressEvent.total));
+        }
+      },
+    });
+    return { images: res.data?.images || [], errors: res.data?.errors || [] };
+  } catch (error: any) {
+    // 400 still carries per-file errors when nothing could be stored
+    if (error.response?.status === 400 && Array.isArray(error.response?.data?.errors)) {
+      return { images: [], errors: error.response.data.errors };
+    }
+    throw error;
+  }
+};
+
 // -----------------------------
 // 4️⃣ DELETE Product
 // -----------------------------
@@ -1178,6 +1266,35 @@ export const getNotifications = async (): Promise<Notification[]> => {
 export const markAllNotificationsRead = async (): Promise<void> => {
   await api.post("/notifications/mark_all_read/");
 };
+
+// ✅ Cached unread badge count
+export const getUnreadNotificationCount = async (): Promise<number> => {
+  const res = await api.get("/notifications/unread_count/");
+  return Number(res.data?.unread ?? 0);
+};
+
+export type AdminStreamEvent =
+  | { type: "unread"; unread: number }
+  | { type: "notification"; id: number; unread?: number; data: any }
+  | { type: "order"; id: number; data: any };
+
+/**
+ * Subscribe to the server push channel (new notifications / new orders).
+ * EventSource reconnects on its own and resumes from the last event id.
+ * Returns an unsubscribe function.
+ */
+export const subscribeToAdminEvents = (onEvent: (event: AdminStreamEvent) => void): (() => void) => {
+  const token = getAccessToken();
+  if (!token || typeof EventSource === "undefined") return () => {};
+  const source = new EventSource(`${API_BASE_URL}/notifications/stream/?token=${encodeURIComponent(token)}`);
+  const handler = (e: MessageEvent) => {
+    try {
+      onEvent(JSON.parse(e.data));
+    } catch {}
+  };
+  ["unread", "notification", "order"].forEach((name) => source.addEventListener(name, handler as EventListener));
+  return () => source.close();
+};
 // export const getUserProfile = async () => {
 //   const res = await axios.get(`${API_BASE}profile/`, {
 //     headers: { Authorization: `Bearer ${localStorage.getItem("access")}` },
@@ -1563,6 +1680,44 @@ export const getAnalyticsSummary = async () => {
   };
 };
 
+export type DashboardPeriod = "24h" | "7d" | "30d" | "90d";
+
+export interface DashboardPeriodTotals {
+  revenue: number;
+  orders: number;
+  aov: number;
+  placedOrders: number;
+  grossRevenue: number;
+  cancelledOrders: number;
+  newCustomers: number;
+  wishlistAdds: number;
+  cartAdds: number;
+}
+
+export interface DashboardPeriodKpis extends DashboardPeriodTotals {
+  revenueChange: number;
+  ordersChange: number;
+  placedOrdersChange: number;
+  aovChange: number;
+  newCustomersChange: number;
+  previous: DashboardPeriodTotals;
+  trend: { date: string; revenue: number; orders: number; placedOrders: number }[];
+}
+
+export interface DashboardKpis {
+  periods: Partial<Record<DashboardPeriod, DashboardPeriodKpis>>;
+  current: { pendingOrders: number; lowStock: number; wishlisted: number; inCart: number };
+  asOf: string;
+}
+
+// All KPI card numbers for the requested periods in one round trip
+export const getDashboardKpis = async (
+  periods: DashboardPeriod[] = ["30d", "7d", "24h"]
+): Promise<DashboardKpis> => {
+  const res = await api.get("/dashboard/", { params: { period: periods.join(",") } });
+  return res.data;
+};
+
 // Top products by wishlist/cart counts
 export const getAnalyticsTopProducts = async (limit?: number) => {
   const res = await api.get("/analytics-top-products/", { params: limit ? { limit } : undefined });
@@ -1595,13 +1750,32 @@ export const getWishlistCartTimeseries = async (
 };
 
 // Fetch logs
-export const getLogs = async (): Promise<Log[]> => {
-  const res = await api.get("/logs/");
+export interface LogPage {
+  results: Log[];
+  next: string | null;
+  previous: string | null;
+}
+
+// Logs are cursor-paginated (newest first); pass the previous page's `next` URL to keep going.
+export const getLogsPage = async (
+  params: { type?: string; user?: string | number; pageSize?: number } = {},
+  cursorUrl?: string | null
+): Promise<LogPage> => {
+  const res = cursorUrl
+    ? await api.get(cursorUrl)
+    : await api.get("/logs/", {
+        params: { type: params.type, user: params.user, page_size: params.pageSize },
+      });
   return res.data;
 };
 
-// Create a log
-export const createLog = async (logData: Omit<Log, "id" | "timestamp">): Promise<Log> => {
+export const getLogs = async (): Promise<Log[]> => {
+  const page = await getLogsPage({ pageSize: 500 });
+  return page.results;
+};
+
+// Create a log (202: buffered server-side, so the response has no id yet)
+export const createLog = async (logData: Omit<Log, "id" | "timestamp">): Promise<Omit<Log, "id"> & { id?: Log["id"] }> => {
   const res = await api.post("/logs/", logData);
   return res.data;
 };
@@ -52,6 +52,8 @@ export interface Order {
   paymentMethod?: string;   // 👈 add this (optional if not always present)
   gstPercent?: number;
   deliveryCharge?: number;
+  subtotal?: number;   // stored by the backend when the order is priced
+  gstAmount?: number;
   address?: {
     line1: string;
     line2?: string;
@@ -157,6 +159,8 @@ export interface NavigationAction {
 
 // --- Core Data Models ---
 
+export type ImageStatus = "processing" | "ready" | "failed";
+
 export interface ProductVariant {
     id: number;
     name: string; // e.g., "Red, Large"
@@ -165,6 +169,7 @@ export interface ProductVariant {
     mrp: number; // Maximum Retail Price
     sellingPrice: number;
     images: string[]; // URLs or base64 strings
+    imageStatus?: ImageStatus[]; // per image; "processing" until the server finishes the AVIF
     tags: string[];
     materials?: string[];
     colors?: string[];
@@ -197,6 +202,7 @@ export interface Product {
     status: ProductStatus;
     gst: number; // in percentage
     images: string[]; // URLs or base64 strings
+    imageStatus?: ImageStatus[]; // per image; "processing" until the server finishes the AVIF
     specifications: string;
     crystalName?: string;
     colors: string[];